@@ -2,7 +2,9 @@ import datetime
 from entities.equity import Equity
 from dataaccess.equitymindao import EquityMinDAO
 from dataaccess.equity30mindao import Equity30MinDAO
-from dataaccess.yahooequitydao import YahooEquityDAO
+from dataaccess.equitydailydao import EquityDailyDAO
+from dataaccess.watermarkdao import WatermarkDAO
+from aggregation.barresampler import BarResampler
 
 
 class AGG30Min(object):
@@ -24,41 +26,106 @@ class AGG30Min(object):
             equity.volume = volume
         return equity
 
+    @staticmethod
+    def resample(symbols, interval, start_time=datetime.datetime(1971, 1, 1, 0, 0, 0), end_time=datetime.datetime(9999, 1, 1, 0, 0, 0), chunk_days=366):
+        """
+        resample the minute bars (start_time <= tradeTime <= end_time) of the symbols by BarResampler, one query per chunk_days days for all the symbols.
+        the start_time is moved back to the start of its date, so the first bar is never partial.
+        :param interval: minutes of the bars, or BarResampler.DAILY
+        :return: iterator of the DataFrames of BarResampler.resample
+        """
+        equity_min_dao = EquityMinDAO()
+        (first_time, last_time) = equity_min_dao.get_time_range(symbols)
+        if first_time is None:
+            return
+        start_date = max(start_time, first_time).date()
+        end_time = min(end_time, last_time) + datetime.timedelta(seconds=1)
+        chunk_start = datetime.datetime(start_date.year, start_date.month, start_date.day)
+        while chunk_start < end_time:
+            chunk_end = min(chunk_start + datetime.timedelta(days=chunk_days), end_time)
+            arrays = equity_min_dao.get_bar_arrays(symbols, chunk_start, chunk_end)
+            if len(arrays['symbol']) > 0:
+                yield BarResampler.resample(arrays, interval)
+            chunk_start = chunk_end
+
+    @staticmethod
+    def get_bar_writer(interval):
+        """
+        :return: the function to upsert the bars of the interval: 30 minutes bars into equity_30min, daily bars into equity_daily.
+        """
+        if interval == 30:
+            return Equity30MinDAO().save_bars
+        elif interval == BarResampler.DAILY:
+            return EquityDailyDAO().save_bars
+        else:
+            raise Exception('No table for the bars of {} minutes'.format(interval))
+
+    @staticmethod
+    def aggregate(symbols, interval, start_time=datetime.datetime(1971, 1, 1, 0, 0, 0), end_time=datetime.datetime(9999, 1, 1, 0, 0, 0)):
+        """
+        resample and upsert the bars of the symbols.
+        :return: count of the written bars
+        """
+        save = AGG30Min.get_bar_writer(interval)
+        count = 0
+        for df in AGG30Min.resample(symbols, interval, start_time, end_time):
+            save(df)
+            count += len(df)
+        return count
+
+    @staticmethod
+    def update_bars(symbols, interval, current_time=None):
+        """
+        aggregate only the minutes after the watermark of each symbol, with the minutes of the open bar of the watermark again,
+        upsert the bars and advance the watermarks to the last aggregated minutes. the symbols without a watermark are
+        aggregated from their first minute. the bars are written before the watermarks, so a failed run is repeated by the next one.
+        the daily bars are written only for the trade dates whose session is closed, the minutes of the open session wait for the next run.
+        the minutes inserted before the watermarks later (eg: the filled missing minutes) need a rebuild by aggregate.
+        :param current_time: naive datetime of new york to close the sessions at, now by default
+        :return: dict of symbol -> count of the written bars
+        """
+        save = AGG30Min.get_bar_writer(interval)
+        equity_min_dao = EquityMinDAO()
+        watermark_dao = WatermarkDAO()
+        counts = dict(map(lambda x: (x, 0), symbols))
+        end_time = datetime.datetime(9999, 1, 1, 0, 0, 0)
+        if interval == BarResampler.DAILY:
+            end_time = BarResampler.get_closed_end(current_time)
+            if end_time is None:
+                return counts
+        watermarks = watermark_dao.get_watermarks(interval, symbols)
+        new_watermarks = {}
+        for symbol in symbols:
+            if symbol not in watermarks:
+                last_time = equity_min_dao.get_time_range([symbol])[1]
+                if last_time is not None:
+                    last_time = min(last_time, end_time - datetime.timedelta(seconds=1))
+                    counts[symbol] = AGG30Min.aggregate([symbol], interval, end_time=last_time)
+                    new_watermarks[symbol] = last_time
+                continue
+            # each symbol is read from its own watermark, a lagging symbol never makes the others read its minutes.
+            start_time = BarResampler.get_open_bar_start(watermarks[symbol], interval)
+            arrays = equity_min_dao.get_bar_arrays([symbol], start_time, end_time)
+            if len(arrays['symbol']) > 0:
+                df = BarResampler.resample(arrays, interval)
+                save(df)
+                counts[symbol] = len(df)
+                new_watermarks[symbol] = arrays['tradeTime'][-1].tolist()
+        if len(new_watermarks) > 0:
+            watermark_dao.save_watermarks(interval, new_watermarks)
+        return counts
+
     @staticmethod
     def agg1to30(symbol, start_time=datetime.datetime(1971, 1, 1, 0, 0, 0), end_time=datetime.datetime(9999, 1, 1, 0, 0, 0)):
-        records = EquityMinDAO().get_records(symbol, start_time, end_time)
-        sub_records = []
-        combined_records = []
-        for record in records:
-            sub_records.append(record)
-            if record[0].minute%30 == 0:
-                sub_records.append(record)
-                combined_record = AGG30Min.combine_records(symbol, sub_records)
-                combined_records.append(combined_record)
-                sub_records = []
-        Equity30MinDAO().insert(combined_records)
+        return AGG30Min.aggregate([symbol], 30, start_time, end_time)
 
     @staticmethod
     def agg1mtodaily(symbol, start_time=datetime.datetime(1971, 1, 1, 0, 0, 0), end_time=datetime.datetime(9999, 1, 1, 0, 0, 0)):
-        records = EquityMinDAO().get_records(symbol, start_time, end_time)
-        sub_records = []
-        combined_records = []
-        for record in records:
-            sub_records.append(record)
-            if record[0].hour == 15:
-                sub_records.append(record)
-                combined_record = AGG30Min.combine_records(symbol, sub_records)
-                combined_records.append(combined_record)
-                sub_records = []
-        YahooEquityDAO().save_from_equities(combined_records)
+        return AGG30Min.aggregate([symbol], BarResampler.DAILY, start_time, end_time)
+
 
 if __name__ == '__main__':
     # AGG30Min.agg1to30('510050')
     # AGG30Min.agg1mtodaily('510050')
-    from common.tradetime import TradeTime
-    for trade_date in TradeTime.generate_dates(datetime.date(1999, 3, 10), TradeTime.get_latest_trade_date()):
-        from_datetime = datetime.datetime(trade_date.year, trade_date.month, trade_date.day, 0, 0, 0)
-        to_datetime = from_datetime + datetime.timedelta(days=1)
-        print 'Generate 30 min data for %s' % trade_date
-        AGG30Min.agg1to30('QQQ', from_datetime, to_datetime)
-
+    # print 'Generate 30 min data for QQQ, %s bars' % AGG30Min.agg1to30('QQQ', datetime.datetime(1999, 3, 10))
+    print AGG30Min.update_bars(['QQQ', 'SPY'], 30)
@@ -0,0 +1,77 @@
+import datetime
+import numpy as np
+import pandas as pd
+from utils.logger import Logger
+from common.pathmgr import PathMgr
+from common.tradetime import TradeTime, TradeCalendar
+from dataaccess.yahooequitydao import YahooEquityDAO
+from dataaccess.yahooequityliquiditydao import YahooEquityLiquidityDAO
+
+
+class AGGLiquidity(object):
+    """
+    fill yahoo_equity_liquidity from yahoo_equity. the liquidity of a window on a trade date is the average dollar volume
+    of the bars after TradeTime.get_from_date_by_window(window, date) and on or before the date, the same range as
+    YahooEquityDAO.filter_liquidity_symbols.
+    """
+
+    def __init__(self, start_date=datetime.date(2010, 1, 1)):
+        """
+        :param start_date: the first trade date of the table when it is empty
+        """
+        self.logger = Logger(__name__, PathMgr.get_log_path())
+        self.start_date = start_date
+        self.yahoo_dao = YahooEquityDAO()
+        self.liquidity_dao = YahooEquityLiquidityDAO()
+
+    def calculate(self, from_date, end_date=None):
+        """
+        :return: DataFrame of the liquidity rows of the trade dates >= from_date and <= end_date.
+        """
+        if end_date is None:
+            end_date = datetime.date.today()
+        max_window = max(YahooEquityLiquidityDAO.windows)
+        load_from_date = TradeTime.get_from_date_by_window(max_window, from_date)
+        calendar = TradeCalendar.get_instance()
+        trade_dates = calendar.get_trade_dates(load_from_date, end_date)
+        symbols = self.yahoo_dao.get_coverage_symbols()
+        panel = self.yahoo_dao.get_equity_panel(symbols, load_from_date, end_date + datetime.timedelta(days=1))
+        if len(panel.dates) == 0:
+            return pd.DataFrame(columns=YahooEquityLiquidityDAO.columns)
+        dates = trade_dates[(trade_dates >= np.datetime64(from_date, 'D')) & (trade_dates <= panel.dates[-1])]
+        dollar_volumes = panel.prices * panel.volumes
+        valid = ~np.isnan(dollar_volumes)
+        zeros = np.zeros((1, len(symbols)))
+        sums = np.vstack([zeros, np.cumsum(np.where(valid, dollar_volumes, 0), axis=0)])
+        counts = np.vstack([zeros, np.cumsum(valid, axis=0)])
+        end_indexes = np.searchsorted(panel.dates, dates, side='right')
+        liquidities = []
+        for window in YahooEquityLiquidityDAO.windows:
+            start_indexes = np.searchsorted(panel.dates, calendar.get_from_dates_by_window(window, dates), side='right')
+            with np.errstate(invalid='ignore', divide='ignore'):
+                liquidities.append((sums[end_indexes] - sums[start_indexes]) / (counts[end_indexes] - counts[start_indexes]))
+        df = pd.DataFrame({'symbol': np.tile(np.array(symbols, dtype=object), len(dates)),
+                           'tradeDate': np.repeat(dates, len(symbols)).astype('datetime64[ns]')},
+                          columns=YahooEquityLiquidityDAO.columns)
+        for i, window in enumerate(YahooEquityLiquidityDAO.windows):
+            df['liquidity%s' % window] = liquidities[i].ravel()
+        return df[df[YahooEquityLiquidityDAO.columns[2:]].notnull().any(axis=1)]
+
+    def save_to_db(self, refresh_days=10):
+        """
+        append the trade dates after the last date of the table, the last refresh_days trade dates are recalculated
+        for the bars caught up late.
+        """
+        last_date = self.liquidity_dao.get_last_date()
+        if last_date is None:
+            from_date = self.start_date
+        else:
+            from_date = TradeTime.get_from_date_by_window(refresh_days, last_date)
+        df = self.calculate(from_date)
+        counts = self.liquidity_dao.save(df)
+        self.logger.info('save liquidity from %s, %s rows: %s' % (from_date, len(df), counts))
+        return counts
+
+
+if __name__ == '__main__':
+    AGGLiquidity().save_to_db()
@@ -62,25 +62,24 @@ class AGGSPYVIXHedge(object):
                 return d
 
     def get_delta_records(self, equity_symbol, equity_records, days_to_current_date=10):
-        conn = BaseDAO.get_connection()
-        cursor = conn.cursor()
         delta_list = []
-        # hard code here, because the option was ingested from 20170724, and some vxx data may wrong before (or on) 20170824
-        filtered_equity_records = filter(lambda x: x[0] >= datetime.date(2017, 8, 24), equity_records)
-        all_unexpired_dates = self.option_dao.get_all_unexpired_dates(equity_symbol, filtered_equity_records[0][0],
-                                                                      cursor=cursor)
-        for date_price in filtered_equity_records:
-            expiration_date = self.find_following_expiration_date(all_unexpired_dates, date_price[0])
-            # print equity_symbol, date_price, expiration_date, days_to_current_date
-            # expiration_date = self.option_dao.get_following_expirationDate(equity_symbol, date_price[0])
-            option_symbol = self.option_dao.find_symbol(equity_symbol, expiration_date, date_price[1], imp_only=True, current_date=date_price[0],
-                                                        days_to_current_date=days_to_current_date, cursor=cursor)
-            delta = self.option_dao.get_delta_by_symbol_and_date(option_symbol, date_price[0], cursor)
-            #print [date_price[0], delta]
-            if delta is not None:
-                delta_list.append([date_price[0], delta])
-        conn.commit()
-        conn.close()
+        with BaseDAO.get_connection() as conn:
+            cursor = conn.cursor()
+            # hard code here, because the option was ingested from 20170724, and some vxx data may wrong before (or on) 20170824
+            filtered_equity_records = filter(lambda x: x[0] >= datetime.date(2017, 8, 24), equity_records)
+            all_unexpired_dates = self.option_dao.get_all_unexpired_dates(equity_symbol, filtered_equity_records[0][0],
+                                                                          cursor=cursor)
+            for date_price in filtered_equity_records:
+                expiration_date = self.find_following_expiration_date(all_unexpired_dates, date_price[0])
+                # print equity_symbol, date_price, expiration_date, days_to_current_date
+                # expiration_date = self.option_dao.get_following_expirationDate(equity_symbol, date_price[0])
+                option_symbol = self.option_dao.find_symbol(equity_symbol, expiration_date, date_price[1], imp_only=True, current_date=date_price[0],
+                                                            days_to_current_date=days_to_current_date, cursor=cursor)
+                delta = self.option_dao.get_delta_by_symbol_and_date(option_symbol, date_price[0], cursor)
+                #print [date_price[0], delta]
+                if delta is not None:
+                    delta_list.append([date_price[0], delta])
+            conn.commit()
         return delta_list
 
     def get_parameter_list(self, records, latest_date):
@@ -0,0 +1,108 @@
+import datetime
+import pytz
+import numpy as np
+import pandas as pd
+from common.tradetime import TradeTime
+
+
+class BarResampler(object):
+    """
+    resample the minute bars of many symbols into bars of any interval by grouped numpy reductions.
+    a bar of n minutes covers the minutes after the previous multiple of n (from midnight) up to its own time,
+    eg: 30 minutes bars are 09:30 (the open minute alone), 10:00 for 09:31 - 10:00, ... as AGG30Min.agg1to30.
+    the bars never cross a session: the last bar of each trade date ends at the close (13:00 on the half trade dates).
+    """
+
+    DAILY = 'daily'
+
+    @staticmethod
+    def get_bar_times(times, interval):
+        """
+        :param times: datetime64 array of the minute bars
+        :param interval: minutes of the bars, or BarResampler.DAILY
+        :return: the time (datetime64[m]) or the date (datetime64[D]) of the bar of each minute
+        """
+        minutes = np.asarray(times).astype('datetime64[m]')
+        days = minutes.astype('datetime64[D]')
+        if interval == BarResampler.DAILY:
+            return days
+        day_starts = days.astype('datetime64[m]')
+        offsets = (minutes - day_starts).astype(int)
+        bar_times = day_starts + (-(-offsets // interval)) * interval
+        if len(minutes) == 0:
+            return bar_times
+        (open_minutes, close_minutes) = TradeTime.get_sessions(days.min().tolist(), days.max().tolist())
+        if len(close_minutes) > 0:
+            close_days = close_minutes.astype('datetime64[D]')
+            indexes = np.minimum(np.searchsorted(close_days, days), len(close_days) - 1)
+            closes = close_minutes[indexes]
+            # the minutes after the close are left in their own bars.
+            clipped = (close_days[indexes] == days) & (minutes <= closes)
+            bar_times = np.where(clipped, np.minimum(bar_times, closes), bar_times)
+        return bar_times
+
+    @staticmethod
+    def get_open_bar_start(watermark, interval):
+        """
+        :param watermark: datetime of the last aggregated minute
+        :return: datetime of the first minute to aggregate again: the first minute of the bar of the watermark,
+                 or the minute after the watermark if it is the end of a bar.
+        """
+        day_start = datetime.datetime(watermark.year, watermark.month, watermark.day)
+        if interval == BarResampler.DAILY:
+            return day_start
+        offset = (watermark.hour * 60 + watermark.minute) // interval * interval
+        return day_start + datetime.timedelta(minutes=offset + 1)
+
+    @staticmethod
+    def get_closed_end(current_time=None):
+        """
+        :param current_time: naive datetime of new york, now by default
+        :return: datetime of the midnight after the last trade date whose session is closed, the daily bars end before it.
+        """
+        if current_time is None:
+            current_time = datetime.datetime.now(tz=pytz.timezone('US/Eastern')).replace(tzinfo=None)
+        (open_minutes, close_minutes) = TradeTime.get_sessions(current_time.date() - datetime.timedelta(days=10), current_time.date())
+        close_minutes = close_minutes[close_minutes <= np.datetime64(current_time, 'm')]
+        if len(close_minutes) == 0:
+            return None
+        return datetime.datetime.combine(close_minutes[-1].astype('datetime64[D]').tolist(), datetime.time()) + datetime.timedelta(days=1)
+
+    @staticmethod
+    def resample(arrays, interval):
+        """
+        :param arrays: symbol, tradeTime, openPrice, highPrice, lowPrice, closePrice and volume arrays of equity_min,
+                       ordered by symbol and tradeTime
+        :param interval: minutes of the bars, or BarResampler.DAILY
+        :return: DataFrame of symbol, tradeTime (tradeDate for the daily bars), openPrice, highPrice, lowPrice, closePrice and volume,
+                 the volume is nan if the minutes have no volume, as AGG30Min.combine_records.
+        """
+        symbols = arrays['symbol']
+        keys = BarResampler.get_bar_times(arrays['tradeTime'], interval)
+        time_column = 'tradeDate' if interval == BarResampler.DAILY else 'tradeTime'
+        columns = ['symbol', time_column, 'openPrice', 'highPrice', 'lowPrice', 'closePrice', 'volume']
+        if len(symbols) == 0:
+            return pd.DataFrame(columns=columns)
+        boundaries = np.flatnonzero((symbols[1:] != symbols[:-1]) | (keys[1:] != keys[:-1])) + 1
+        starts = np.append(0, boundaries)
+        ends = np.append(boundaries, len(symbols)) - 1
+        volumes = np.add.reduceat(np.nan_to_num(arrays['volume']), starts)
+        return pd.DataFrame({'symbol': symbols[starts],
+                             time_column: keys[starts].astype('datetime64[ns]'),
+                             'openPrice': arrays['openPrice'][starts],
+                             'highPrice': np.fmax.reduceat(arrays['highPrice'], starts),
+                             'lowPrice': np.fmin.reduceat(arrays['lowPrice'], starts),
+                             'closePrice': arrays['closePrice'][ends],
+                             'volume': np.where(volumes == 0, np.nan, volumes)}, columns=columns)
+
+
+if __name__ == '__main__':
+    times = np.array(['2017-11-24T09:30', '2017-11-24T09:31', '2017-11-24T09:59', '2017-11-24T10:00', '2017-11-24T12:46',
+                      '2017-11-24T13:00'], dtype='datetime64[s]')
+    print BarResampler.get_bar_times(times, 30)
+    print BarResampler.get_bar_times(times, 45)
+    arrays = {'symbol': np.array(['SPY'] * 6, dtype=object), 'tradeTime': times,
+              'openPrice': np.arange(6.0), 'highPrice': np.arange(6.0) + 1, 'lowPrice': np.arange(6.0) - 1,
+              'closePrice': np.arange(6.0) + 0.5, 'volume': np.ones(6)}
+    print BarResampler.resample(arrays, 30)
+    print BarResampler.resample(arrays, BarResampler.DAILY)
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+
+
+class EquityPanel(object):
+    """
+    daily bars of many symbols aligned into dates x symbols matrices (nan for the missing bars),
+    so the statistics of every symbol are computed at once along axis 0 instead of one symbol per loop.
+    """
+
+    def __init__(self, dates, symbols, prices, volumes=None):
+        """
+        :param dates: datetime64[D] array in ascending order, the rows of the matrices
+        :param symbols: the columns of the matrices
+        :param prices: float64 matrix of adjusted close prices
+        :param volumes: float64 matrix of volumes, optional
+        """
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.prices = prices
+        self.volumes = volumes
+
+    @staticmethod
+    def from_columns(symbols, symbol_column, date_column, price_column, volume_column=None):
+        """
+        pivot the long format columns (one row per symbol and date) into the panel.
+        :param symbols: the columns of the panel, the rows of the other symbols are dropped
+        """
+        symbols = list(symbols)
+        symbol_column = np.asarray(symbol_column, dtype=object)
+        date_column = np.asarray(date_column, dtype='datetime64[D]')
+        column_of_symbol = dict(map(lambda x: (x[1], x[0]), enumerate(symbols)))
+        columns = np.array(map(lambda x: column_of_symbol.get(x, -1), symbol_column), dtype=int)
+        kept = columns >= 0
+        dates, rows = np.unique(date_column[kept], return_inverse=True)
+        matrices = []
+        for column in (price_column, volume_column):
+            if column is None:
+                matrices.append(None)
+                continue
+            matrix = np.full((len(dates), len(symbols)), np.nan)
+            matrix[rows, columns[kept]] = np.asarray(column, dtype='float64')[kept]
+            matrices.append(matrix)
+        return EquityPanel(dates, symbols, matrices[0], matrices[1])
+
+    @staticmethod
+    def from_monthly_columns(symbols, symbol_column, last_date_column, price_column):
+        """
+        pivot the monthly bars into the panel, the rows are the first dates of the months,
+        so the bars of the same month are aligned even if their last dates differ.
+        """
+        months = np.asarray(last_date_column, dtype='datetime64[D]').astype('datetime64[M]').astype('datetime64[D]')
+        return EquityPanel.from_columns(symbols, symbol_column, months, price_column)
+
+    def take(self, rows):
+        return EquityPanel(self.dates[rows], self.symbols, self.prices[rows],
+                           None if self.volumes is None else self.volumes[rows])
+
+    def select(self, symbols):
+        """
+        :return: the panel of the symbols, without the dates none of them has a bar.
+        """
+        columns = map(self.symbols.index, symbols)
+        prices = self.prices[:, columns]
+        rows = ~np.all(np.isnan(prices), axis=1)
+        return EquityPanel(self.dates[rows], symbols, prices[rows],
+                           None if self.volumes is None else self.volumes[:, columns][rows])
+
+    def between(self, from_date, end_date):
+        """
+        :return: the panel of the dates >= from_date and < end_date.
+        """
+        start = np.searchsorted(self.dates, np.datetime64(from_date, 'D'))
+        end = np.searchsorted(self.dates, np.datetime64(end_date, 'D'))
+        return self.take(slice(start, end))
+
+    def tail(self, window):
+        """
+        :return: the panel of the last window dates.
+        """
+        return self.take(slice(max(len(self.dates) - window, 0), None))
+
+    @staticmethod
+    def forward_fill(matrix):
+        """
+        fill each nan with the last valid value above it in the same column, the leading nans stay nan.
+        """
+        index = np.where(np.isnan(matrix), 0, np.arange(matrix.shape[0])[:, None])
+        np.maximum.accumulate(index, axis=0, out=index)
+        return matrix[index, np.arange(matrix.shape[1])]
+
+    def get_price_changes(self, log=False):
+        """
+        the change from the previous valid price of the same symbol, nan on the dates the symbol has no bar,
+        so the gaps of one symbol do not shift the series of the others.
+        :return: matrix with one row less than the panel
+        """
+        prices = np.log(self.prices) if log else self.prices
+        return prices[1:] - EquityPanel.forward_fill(prices)[:-1]
+
+    def get_returns(self):
+        """
+        :return: matrix of simple returns, with one row less than the panel.
+        """
+        return self.prices[1:] / EquityPanel.forward_fill(self.prices)[:-1] - 1
+
+    def get_total_returns(self):
+        """
+        :return: return of each symbol from its first to its last valid price.
+        """
+        filled = EquityPanel.forward_fill(self.prices)
+        first = EquityPanel.forward_fill(self.prices[::-1])[::-1][0]
+        return filled[-1] / first - 1
+
+    def get_volatilities(self):
+        """
+        :return: daily volatility (std of the log price changes) of each symbol, the same as OptionCalculater.get_history_volatility2.
+        """
+        return np.nanstd(self.get_price_changes(log=True), axis=0)
+
+    def get_sharp_ratios(self, risk_free_rate=0.03, year_window=252):
+        """
+        :return: sharp ratio of each symbol, the same formula as utils.maths.get_sharp_ratio.
+        """
+        ave_return = np.nanmean(self.get_price_changes(), axis=0) * year_window
+        annual_vol = np.nanstd(self.prices, axis=0) * np.sqrt(year_window)
+        return (ave_return - risk_free_rate) / annual_vol
+
+    def get_liquidities(self):
+        """
+        :return: average dollar volume (price * volume) of each symbol.
+        """
+        return np.nanmean(self.prices * self.volumes, axis=0)
+
+    def get_monthly(self):
+        """
+        :return: the panel of the last date of each month, the prices are the last valid prices in the month.
+        """
+        if len(self.dates) == 0:
+            return self
+        months = self.dates.astype('datetime64[M]')
+        last_rows = np.append(np.flatnonzero(months[1:] != months[:-1]), len(months) - 1)
+        first_rows = np.append(0, last_rows[:-1] + 1)
+        filled = EquityPanel.forward_fill(self.prices)[last_rows]
+        # the price filled from a previous month means the symbol has no bar in the month.
+        filled_rows = EquityPanel.forward_fill(np.where(np.isnan(self.prices), np.nan, np.arange(len(self.dates))[:, None]))[last_rows]
+        with np.errstate(invalid='ignore'):
+            filled[~(filled_rows >= first_rows[:, None])] = np.nan
+        return EquityPanel(self.dates[last_rows], self.symbols, filled)
+
+    def get_correlation(self, changes=None):
+        """
+        :param changes: matrix of price changes or returns, default as the log price changes
+        :return: DataFrame of the pairwise correlation coefficients of the symbols
+        """
+        if changes is None:
+            changes = self.get_price_changes(log=True)
+        return pd.DataFrame(changes, columns=self.symbols).corr()
+
+    def to_records(self, values):
+        """
+        :return: [[symbol, value], ...] in the order of the symbols.
+        """
+        return map(list, zip(self.symbols, np.asarray(values).tolist()))
+
+
+if __name__ == '__main__':
+    dates = np.array(['2018-01-30', '2018-01-31', '2018-02-01', '2018-02-02'], dtype='datetime64[D]')
+    prices = np.array([[1.0, 2.0], [1.1, np.nan], [1.2, 2.2], [1.1, 2.4]])
+    panel = EquityPanel(dates, ['A', 'B'], prices, np.ones(prices.shape))
+    print panel.to_records(panel.get_volatilities())
+    print panel.get_monthly().prices
+    print panel.get_correlation()
@@ -28,25 +28,196 @@ class OptionCalculater(object):
         return math.sqrt(252) * OptionCalculater.get_history_volatility2(price_list)
 
     @staticmethod
-    def get_year_history_volatility_list(date_price_records, circle = 30):
-        length = len(date_price_records)
-        results = []
-        for i in range(length-circle):
-            price_list = map(lambda x: x[1], date_price_records[i:i+circle])
-            vol = OptionCalculater.get_year_history_volatility(price_list)
-            results.append([date_price_records[i+circle][0], vol])
+    def get_rolling_year_history_volatilities(prices, windows=(10, 20, 21, 30, 60)):
+        """
+        get_year_history_volatility of the sliding windows, from the cumulative sums of the log returns and their squares
+        in one pass for all the windows, instead of one std per window position.
+        :param prices: array of prices, or matrix of dates x symbols
+        :param windows: the counts of prices in a window
+        :return: dict of window -> array shaped as prices, the value of row j is the volatility of the window prices[j-window:j]
+                 (before the row j, as get_year_history_volatility_list), nan for the first window rows.
+        """
+        prices = np.asarray(prices, dtype='float64')
+        returns = np.diff(np.log(prices), axis=0)
+        # the missing returns are skipped as np.nanstd, each window is divided by its own count of valid returns.
+        valid = ~np.isnan(returns)
+        # centered by the mean to keep the precision of the sums of squares.
+        returns = returns - np.nanmean(returns, axis=0) if valid.any() else returns
+        zeros = np.zeros((1,) + returns.shape[1:])
+        sums = np.concatenate([zeros, np.nancumsum(returns, axis=0)])
+        square_sums = np.concatenate([zeros, np.nancumsum(returns * returns, axis=0)])
+        valid_counts = np.concatenate([zeros, np.cumsum(valid, axis=0)])
+        results = {}
+        for window in windows:
+            volatilities = np.full(prices.shape, np.nan)
+            if len(prices) > window:
+                count = window - 1
+                counts = valid_counts[count:-1] - valid_counts[:-count - 1]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    means = (sums[count:-1] - sums[:-count - 1]) / counts
+                    variances = (square_sums[count:-1] - square_sums[:-count - 1]) / counts - means * means
+                    # the differences of the sums leave the rounding of the whole cumulative sum, a flat window is 0.
+                    variances[variances <= 64 * np.finfo('float64').eps * square_sums[count:-1] / counts] = 0.0
+                volatilities[window:] = np.sqrt(variances * 252)
+            results[window] = volatilities
         return results
 
+    @staticmethod
+    def get_year_history_volatility_list(date_price_records, circle = 30):
+        if len(date_price_records) <= circle:
+            return []
+        prices = map(lambda x: x[1], date_price_records)
+        volatilities = OptionCalculater.get_rolling_year_history_volatilities(prices, [circle])[circle]
+        return map(lambda x, y: [x[0], y], date_price_records[circle:], volatilities[circle:].tolist())
+
     @staticmethod
     def get_black_scholes_option_price(underlying_price, strike_price, days_to_experiation, risk_free_interest_rate, sigma, flag='c'):
         price = vollib.black_scholes.black_scholes(flag, underlying_price, strike_price, days_to_experiation, risk_free_interest_rate, sigma)
         return price
 
+    @staticmethod
+    def norm_cdf(x):
+        """
+        vectorized standard normal cdf, the double precision algorithm of Hart (1968) as given by West (2005).
+        """
+        x = np.asarray(x, dtype='float64')
+        x_abs = np.abs(x)
+        exponential = np.exp(-x_abs * x_abs / 2.0)
+        build = ((((((0.0352624965998911 * x_abs + 0.700383064443688) * x_abs + 6.37396220353165) * x_abs
+                    + 33.912866078383) * x_abs + 112.079291497871) * x_abs + 221.213596169931) * x_abs + 220.206867912376)
+        denominator = (((((((0.0883883476483184 * x_abs + 1.75566716318264) * x_abs + 16.064177579207) * x_abs
+                           + 86.7807322029461) * x_abs + 296.564248779674) * x_abs + 637.333633378831) * x_abs
+                        + 793.826512519948) * x_abs + 440.413735824752)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            near = exponential * build / denominator
+            fraction = x_abs + 1.0 / (x_abs + 2.0 / (x_abs + 3.0 / (x_abs + 4.0 / (x_abs + 0.65))))
+            far = exponential / fraction / 2.506628274631
+        tail = np.where(x_abs < 7.07106781186547, near, np.where(x_abs > 37, 0.0, far))
+        return np.where(x > 0, 1.0 - tail, tail)
+
+    @staticmethod
+    def norm_pdf(x):
+        return np.exp(-0.5 * np.square(x)) / math.sqrt(2 * math.pi)
+
+    @staticmethod
+    def get_greeks(underlying_prices, strike_prices, left_days, risk_free_interest_rates, sigmas, flags='c', dividend_yields=0.0):
+        """
+        closed form black scholes (merton with the dividend yields) price and greeks of a whole chain at once,
+        the arguments are numpy arrays or scalars broadcast to each other.
+        the units are the same as vollib: theta and charm per day, vega, rho and vanna per 1% of sigma or rate, vomma per (1% of sigma)^2.
+        the options expired (left_days <= 0) are valued at the intrinsic values, with the greeks other than delta as 0.
+        :param flags: 'c' or 'p', scalar or array
+        :return: dict of price, delta, gamma, vega, theta, rho, vanna, vomma and charm arrays
+        """
+        s = np.asarray(underlying_prices, dtype='float64')
+        k = np.asarray(strike_prices, dtype='float64')
+        t = np.asarray(left_days, dtype='float64') / 365.0
+        r = np.asarray(risk_free_interest_rates, dtype='float64')
+        sigma = np.asarray(sigmas, dtype='float64')
+        q = np.asarray(dividend_yields, dtype='float64')
+        calls = np.char.lower(np.asarray(flags).astype(str)) == 'c'
+        live = t > 0
+        t = np.where(live, t, 1.0)
+        sign = np.where(calls, 1.0, -1.0)
+        sqrt_t = np.sqrt(t)
+        sigma_sqrt_t = sigma * sqrt_t
+        d1 = (np.log(s / k) + (r - q + 0.5 * sigma * sigma) * t) / sigma_sqrt_t
+        d2 = d1 - sigma_sqrt_t
+        discount = np.exp(-r * t)
+        dividend_discount = np.exp(-q * t)
+        pdf_d1 = OptionCalculater.norm_pdf(d1)
+        n_d1 = OptionCalculater.norm_cdf(sign * d1)
+        n_d2 = OptionCalculater.norm_cdf(sign * d2)
+        price = sign * (s * dividend_discount * n_d1 - k * discount * n_d2)
+        delta = sign * dividend_discount * n_d1
+        gamma = dividend_discount * pdf_d1 / (s * sigma_sqrt_t)
+        vega = s * dividend_discount * pdf_d1 * sqrt_t
+        theta = (-s * dividend_discount * pdf_d1 * sigma / (2 * sqrt_t)
+                 - sign * r * k * discount * n_d2 + sign * q * s * dividend_discount * n_d1)
+        rho = sign * k * t * discount * n_d2
+        vanna = -dividend_discount * pdf_d1 * d2 / sigma
+        vomma = vega * d1 * d2 / sigma
+        charm = sign * q * dividend_discount * n_d1 - dividend_discount * pdf_d1 * (2 * (r - q) * t - d2 * sigma_sqrt_t) / (2 * t * sigma_sqrt_t)
+        intrinsic = np.maximum(sign * (s - k), 0.0) + 0.0
+        expired_delta = np.where(s == k, 0.5 * sign, np.where(sign * (s - k) > 0, sign, 0.0))
+        zero = lambda x: np.where(live, x, 0.0)
+        return {'price': np.where(live, price, intrinsic),
+                'delta': np.where(live, delta, expired_delta),
+                'gamma': zero(gamma),
+                'vega': zero(vega) * 0.01,
+                'theta': zero(theta) / 365.0,
+                'rho': zero(rho) * 0.01,
+                'vanna': zero(vanna) * 0.01,
+                'vomma': zero(vomma) * 0.0001,
+                'charm': zero(charm) / 365.0}
+
+    @staticmethod
+    def get_black_scholes_option_prices(underlying_prices, strike_prices, left_days, risk_free_interest_rates, sigmas, flags='c', dividend_yields=0.0):
+        """
+        vectorized get_black_scholes_option_price, with the time in days as the greeks.
+        """
+        return OptionCalculater.get_greeks(underlying_prices, strike_prices, left_days, risk_free_interest_rates, sigmas, flags, dividend_yields)['price']
+
     @staticmethod
     def get_implied_volatility(current_price, underlying_price, strike_price, left_days, interest_rate, flag='c'):
         return vollib.black_scholes.implied_volatility.implied_volatility(current_price, underlying_price, strike_price,
                                                                    left_days / 365.0, interest_rate, flag)
 
+    @staticmethod
+    def get_implied_volatilities(current_prices, underlying_prices, strike_prices, left_days, interest_rates, flags='c',
+                                 dividend_yields=0.0, tolerance=1e-8, max_iterations=50):
+        """
+        vectorized get_implied_volatility of a whole chain: each quote is converted to the out of the money option by the put call parity,
+        started from the rational guess of Corrado and Miller, then refined by Halley steps kept inside a bisection bracket.
+        :param tolerance: the last step of sigma to stop at
+        :return: array of implied volatilities, 0 for the zero priced out of the money quotes as get_implied_volatility,
+                 nan for the quotes out of the no arbitrage bounds, expired or not converged.
+        """
+        (price, s, k, t, r, q) = np.broadcast_arrays(*map(lambda x: np.atleast_1d(np.asarray(x, dtype='float64')),
+                                                          [current_prices, underlying_prices, strike_prices,
+                                                           np.asarray(left_days, dtype='float64') / 365.0, interest_rates, dividend_yields]))
+        calls = np.broadcast_to(np.char.lower(np.asarray(flags).astype(str)) == 'c', price.shape)
+        forward = s * np.exp(-q * t)
+        strike = k * np.exp(-r * t)
+        # solve on the out of the money side of the parity, the in the money price loses the time value in the rounding.
+        otm_calls = forward <= strike
+        otm_price = price + np.where(calls, 0.0, forward - strike) - np.where(otm_calls, 0.0, forward - strike)
+        with np.errstate(invalid='ignore'):
+            valid = (t > 0) & (otm_price > 0) & (otm_price < np.where(otm_calls, forward, strike))
+        ivs = np.full(price.shape, np.nan)
+        ivs[(t > 0) & (otm_price == 0)] = 0.0
+        (c, f, x, t, sign) = map(lambda a: a[valid], [otm_price, forward, strike, t, np.where(otm_calls, 1.0, -1.0)])
+        sqrt_t = np.sqrt(t)
+        half_diff = (f - x) / 2.0
+        call_price = c + np.maximum(f - x, 0.0)
+        guess = math.sqrt(2 * math.pi) / (sqrt_t * (f + x)) * (call_price - half_diff + np.sqrt(np.maximum((call_price - half_diff) ** 2 - (f - x) ** 2 / math.pi, 0.0)))
+        lower = np.zeros(len(c))
+        upper = np.full(len(c), 10.0)
+        sigma = np.clip(guess, 0.01, 5.0)
+        converged = np.zeros(len(c), dtype=bool)
+        for i in range(max_iterations):
+            active = np.flatnonzero(~converged)
+            if len(active) == 0:
+                break
+            (sa, fa, xa, ta, sqrt_ta, sign_a) = (sigma[active], f[active], x[active], t[active], sqrt_t[active], sign[active])
+            d1 = (np.log(fa / xa) + 0.5 * sa * sa * ta) / (sa * sqrt_ta)
+            d2 = d1 - sa * sqrt_ta
+            diff = sign_a * (fa * OptionCalculater.norm_cdf(sign_a * d1) - xa * OptionCalculater.norm_cdf(sign_a * d2)) - c[active]
+            # the option price is increasing in sigma, so the sign of the difference narrows the bracket.
+            upper[active] = np.where(diff > 0, sa, upper[active])
+            lower[active] = np.where(diff < 0, sa, lower[active])
+            vega = fa * OptionCalculater.norm_pdf(d1) * sqrt_ta
+            volga = vega * d1 * d2 / sa
+            with np.errstate(divide='ignore', invalid='ignore'):
+                step = diff / vega / (1 - 0.5 * diff * volga / (vega * vega))
+                next_sigma = sa - step
+            inside = np.isfinite(next_sigma) & (next_sigma > lower[active]) & (next_sigma < upper[active])
+            next_sigma = np.where(inside, next_sigma, (lower[active] + upper[active]) / 2.0)
+            converged[active] = (diff == 0) | (np.abs(next_sigma - sa) < tolerance)
+            sigma[active] = np.where(diff == 0, sa, next_sigma)
+        ivs[np.flatnonzero(valid)[converged]] = sigma[converged]
+        return ivs
+
     @staticmethod
     def get_delta(underlying_price, strike_price, left_days, risk_free_interest_rate, sigma, flag='c'):
         delta = vollib.black_scholes.greeks.numerical.delta(flag, underlying_price, strike_price, left_days/365.0, risk_free_interest_rate, sigma)
@@ -136,9 +307,41 @@ def _test_vol():
     results = OptionCalculater.get_year_history_volatility_list(equity_records)
     print results
 
+def _benchmark_implied_volatilities(symbol='SPY', trade_date=None, interest_rate=0.01):
+    import time
+    from dataaccess.optiondao import OptionDAO
+    from dataaccess.pricehistorycache import PriceHistoryCache
+    option_dao = OptionDAO()
+    trade_date = trade_date or option_dao.query_scalar("""select max(tradeTime) from option_data where underlingSymbol = %s""", (symbol,))
+    arrays = option_dao.get_option_chain_arrays(symbol, trade_date)
+    underlying_price = PriceHistoryCache().get_price(symbol, trade_date, field='closePrice')
+    quoted = (arrays['bidPrice'] > 0) & (arrays['askPrice'] > 0)
+    prices = np.where(quoted, (arrays['bidPrice'] + arrays['askPrice']) / 2, arrays['lastPrice'])
+    flags = map(lambda x: x[0:1].lower(), arrays['optionType'])
+    start = time.time()
+    ivs = OptionCalculater.get_implied_volatilities(prices, underlying_price, arrays['strikePrice'], arrays['daysToExpiration'], interest_rate, flags)
+    vector_seconds = time.time() - start
+    start = time.time()
+    scalar_ivs = []
+    for i in range(len(prices)):
+        try:
+            scalar_ivs.append(OptionCalculater.get_implied_volatility(prices[i], underlying_price, arrays['strikePrice'][i], arrays['daysToExpiration'][i], interest_rate, flags[i]))
+        except Exception:
+            scalar_ivs.append(np.nan)
+    scalar_seconds = time.time() - start
+    scalar_ivs = np.array(scalar_ivs, dtype='float64')
+    print '%s options of %s on %s, underlying price %s' % (len(prices), symbol, trade_date, underlying_price)
+    print 'vectorized: %.4fs, %s solved' % (vector_seconds, np.count_nonzero(~np.isnan(ivs)))
+    print 'scalar: %.4fs, %s solved' % (scalar_seconds, np.count_nonzero(~np.isnan(scalar_ivs)))
+    print 'max difference: %s' % np.nanmax(np.abs(ivs - scalar_ivs))
+    # the scraped volatility is in percent.
+    print 'max difference to the scraped volatility: %s' % np.nanmax(np.abs(ivs - arrays['volatility'] / 100))
+
+
 if __name__ == '__main__':
     #spy_option()
     #_test_vol()
+    #_benchmark_implied_volatilities()
     print OptionCalculater.get_history_volatility([1.0, 2.0, 1.0, 2.0, 1.0, 2.0, 1.0, 2.0, 1.0, 2.0])
     print OptionCalculater.get_year_history_volatility([1.0, 2.0, 1.0, 2.0, 1.0, 2.0, 1.0, 2.0, 1.0, 2.0])
 
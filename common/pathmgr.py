@@ -55,6 +55,15 @@ class PathMgr(object):
             etf_path = os.path.join(historical_path, 'ETFS')
         return etf_path
 
+    @staticmethod
+    def get_yahoo_equity_store_path(symbol=None):
+        store_path = PathMgr.get_data_path('yahoo_equity')
+        ensure_dir_exists(store_path)
+        if symbol:
+            return os.path.join(store_path, symbol + '.npy')
+        else:
+            return store_path
+
     @staticmethod
     def get_yahoo_option_dir(sub_path = datetime.date.today().strftime('%Y-%m-%d')):
         raw_date_dir = PathMgr.get_raw_data_path(sub_path)
@@ -1,6 +1,10 @@
+import os
 import datetime
 import pytz
+import numpy as np
 
+from common.pathmgr import PathMgr
+from utils.iohelper import ensure_dir_exists
 from pandas.tseries.holiday import AbstractHolidayCalendar, Holiday, nearest_workday, USMartinLutherKingJr, USPresidentsDay, GoodFriday, USMemorialDay, USLaborDay, USThanksgivingDay
 
 
@@ -18,6 +22,144 @@ class USTradingCalendar(AbstractHolidayCalendar):
     ]
 
 
+class TradeCalendar(object):
+    """
+    the trade dates, half trade dates and the open/close minutes of the sessions from FROM_DATE to END_DATE as sorted
+    datetime64 arrays, built from the rules of TradeTime once per process or loaded from the cache file,
+    so the membership tests and the window arithmetic are searchsorted lookups instead of day by day loops.
+    the cache file is named by the date range, remove it after changing the rules.
+    """
+
+    FROM_DATE = datetime.date(1990, 1, 1)
+
+    END_DATE = datetime.date(2040, 12, 31)
+
+    _instance = None
+
+    def __init__(self, trade_dates, half_trade_dates):
+        """
+        :param trade_dates: datetime64[D] array of the trade dates
+        :param half_trade_dates: datetime64[D] array of TradeTime.get_half_trade_dates of the years
+        """
+        self.from_date64 = np.datetime64(TradeCalendar.FROM_DATE, 'D')
+        self.end_date64 = np.datetime64(TradeCalendar.END_DATE, 'D')
+        self.trade_dates = trade_dates
+        self.half_trade_dates = half_trade_dates
+        half_p = np.in1d(trade_dates, half_trade_dates)
+        self.full_trade_dates = trade_dates[~half_p]
+        self.open_minutes = trade_dates.astype('datetime64[m]') + 570
+        self.close_minutes = self.open_minutes + np.where(half_p, 210, 390)
+
+    @staticmethod
+    def build():
+        days = np.arange(np.datetime64(TradeCalendar.FROM_DATE, 'D'), np.datetime64(TradeCalendar.END_DATE, 'D') + 1)
+        # 1970-01-01 is a Thursday.
+        trade_p = (days.astype(int) + 3) % 7 < 5
+        trade_p &= ~np.in1d(days, np.array(TradeTime._special_no_trade_dates, dtype='datetime64[D]'))
+        half_trade_dates = []
+        for year in range(TradeCalendar.FROM_DATE.year, TradeCalendar.END_DATE.year + 1):
+            holidays = np.array(TradeTime.get_trading_close_holidays(year).date, dtype='datetime64[D]')
+            # the holidays of a year are only checked against the dates of the year, as TradeTime.is_trade_day does.
+            year_p = days.astype('datetime64[Y]') == np.datetime64(year - 1970, 'Y')
+            trade_p &= ~(year_p & np.in1d(days, holidays))
+            half_trade_dates.extend(TradeTime.get_half_trade_dates(year))
+        return TradeCalendar(days[trade_p], np.unique(np.array(half_trade_dates, dtype='datetime64[D]')))
+
+    @staticmethod
+    def get_cache_path():
+        return os.path.join(PathMgr.get_data_path('calendar'), 'trade_calendar_%s_%s.npz' % (TradeCalendar.FROM_DATE.year, TradeCalendar.END_DATE.year))
+
+    @staticmethod
+    def load():
+        path = TradeCalendar.get_cache_path()
+        if os.path.exists(path):
+            arrays = np.load(path)
+            return TradeCalendar(arrays['trade_dates'], arrays['half_trade_dates'])
+        calendar = TradeCalendar.build()
+        try:
+            ensure_dir_exists(os.path.dirname(path))
+            np.savez(path, trade_dates=calendar.trade_dates, half_trade_dates=calendar.half_trade_dates)
+        except (IOError, OSError):
+            pass
+        return calendar
+
+    @staticmethod
+    def get_instance():
+        if TradeCalendar._instance is None:
+            TradeCalendar._instance = TradeCalendar.load()
+        return TradeCalendar._instance
+
+    @staticmethod
+    def to_date64(dates):
+        """
+        :param dates: date, datetime or array like of them
+        """
+        if isinstance(dates, datetime.datetime):
+            dates = dates.date()
+        return np.asarray(dates, dtype='datetime64[D]') if isinstance(dates, (list, tuple, np.ndarray)) else np.datetime64(dates, 'D')
+
+    def covers(self, *dates):
+        return all(map(lambda x: self.from_date64 <= TradeCalendar.to_date64(x) <= self.end_date64, dates))
+
+    @staticmethod
+    def contains(sorted_dates, dates):
+        indexes = np.searchsorted(sorted_dates, dates)
+        return sorted_dates[np.minimum(indexes, len(sorted_dates) - 1)] == dates
+
+    def is_trade_day(self, dates):
+        """
+        :param dates: date, datetime or array of them
+        :return: bool, or bool array for the array input
+        """
+        return TradeCalendar.contains(self.trade_dates, TradeCalendar.to_date64(dates))
+
+    def is_half_trade_day(self, dates):
+        return TradeCalendar.contains(self.half_trade_dates, TradeCalendar.to_date64(dates))
+
+    def get_trade_dates(self, from_date, end_date):
+        """
+        :return: datetime64[D] array of the trade dates >= from_date and <= end_date.
+        """
+        start = np.searchsorted(self.trade_dates, TradeCalendar.to_date64(from_date))
+        end = np.searchsorted(self.trade_dates, TradeCalendar.to_date64(end_date), side='right')
+        return self.trade_dates[start:end]
+
+    def get_trade_dates_by_window(self, window, end_date):
+        """
+        :return: datetime64[D] array of the last window trade dates <= end_date.
+        """
+        end = np.searchsorted(self.trade_dates, TradeCalendar.to_date64(end_date), side='right')
+        return self.trade_dates[max(end - window, 0):end]
+
+    def get_from_dates_by_window(self, window, dates):
+        """
+        vectorized TradeTime.get_from_date_by_window: the (window - 1)th full trade date before each date.
+        :param dates: date or datetime64[D] array
+        :return: datetime64[D] array, NaT for the dates before the calendar
+        """
+        indexes = np.searchsorted(self.full_trade_dates, TradeCalendar.to_date64(dates)) - (window - 1)
+        return np.where(indexes >= 0, self.full_trade_dates[np.maximum(indexes, 0)], np.datetime64('NaT', 'D'))
+
+    def get_sessions(self, from_date, end_date):
+        """
+        :return: the open and close minutes (datetime64[m]) of the trade dates >= from_date and <= end_date.
+        """
+        start = np.searchsorted(self.trade_dates, TradeCalendar.to_date64(from_date))
+        end = np.searchsorted(self.trade_dates, TradeCalendar.to_date64(end_date), side='right')
+        return self.open_minutes[start:end], self.close_minutes[start:end]
+
+    @staticmethod
+    def get_minutes(open_minutes, close_minutes, include_open=True):
+        """
+        :param include_open: include the open minute of each session (9:30) or start from the minute after it (9:31)
+        :return: datetime64[m] array of the minutes of the sessions, up to the close minutes (inclusive).
+        """
+        starts = open_minutes if include_open else open_minutes + 1
+        counts = (close_minutes - starts).astype(int) + 1
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return np.repeat(starts, counts) + offsets
+
+
 class TradeTime(object):
 
     _holidays_cache = {}
@@ -47,6 +189,9 @@ class TradeTime(object):
 
     @staticmethod
     def is_trade_day(date):
+        calendar = TradeCalendar.get_instance()
+        if calendar.covers(date):
+            return bool(calendar.is_trade_day(date))
         if date in TradeTime._special_no_trade_dates:
             return False
         trading_close_holidays = TradeTime._holidays_cache.get(date.year)
@@ -60,6 +205,21 @@ class TradeTime(object):
         else:
             return True
 
+    @staticmethod
+    def is_trade_days(dates):
+        """
+        vectorized is_trade_day.
+        :param dates: list or array of dates
+        :return: bool array
+        """
+        calendar = TradeCalendar.get_instance()
+        dates = TradeCalendar.to_date64(list(dates))
+        trade_p = calendar.is_trade_day(dates)
+        outside = np.flatnonzero((dates < calendar.from_date64) | (dates > calendar.end_date64))
+        for i in outside:
+            trade_p[i] = TradeTime.is_trade_day(dates[i].tolist())
+        return trade_p
+
     @staticmethod
     def get_half_trade_dates(year):
         '''
@@ -92,6 +252,9 @@ class TradeTime(object):
 
     @staticmethod
     def is_half_trade_day(nydate):
+        calendar = TradeCalendar.get_instance()
+        if calendar.covers(nydate):
+            return bool(calendar.is_half_trade_day(nydate))
         half_trade_dates = list(TradeTime.get_half_trade_dates(nydate.year))
         return nydate in half_trade_dates
 
@@ -116,6 +279,13 @@ class TradeTime(object):
 
     @staticmethod
     def get_latest_trade_date():
+        calendar = TradeCalendar.get_instance()
+        today = datetime.date.today()
+        if calendar.covers(today):
+            trade_dates = calendar.get_trade_dates_by_window(1, today - datetime.timedelta(days=1))
+            if len(trade_dates) > 0 and (today - trade_dates[-1].tolist()).days <= 10:
+                return trade_dates[-1].tolist()
+            return None
         for i in range(10):
             trade_date = datetime.datetime.today() - datetime.timedelta(days=i+1)
             if TradeTime.is_trade_day(trade_date.date()):
@@ -125,6 +295,14 @@ class TradeTime(object):
     def get_from_date_by_window(window, current_date=None):
         if current_date is None:
             current_date = TradeTime.get_latest_trade_date()
+        calendar = TradeCalendar.get_instance()
+        if window > 1 and calendar.covers(current_date):
+            from_date = calendar.get_from_dates_by_window(window, current_date).tolist()
+            # the loop below gives up after 2*window+7 calendar days.
+            if from_date is not None and (TradeCalendar.to_date64(current_date) - np.datetime64(from_date, 'D')).astype(int) <= 2 * window + 7:
+                if isinstance(current_date, datetime.datetime):
+                    return datetime.datetime.combine(from_date, current_date.time())
+                return from_date
         count = 1
         for i in range(2*window+7):
             if count >= window:
@@ -138,6 +316,9 @@ class TradeTime(object):
 
     @staticmethod
     def generate_dates(from_date, end_date):
+        calendar = TradeCalendar.get_instance()
+        if calendar.covers(from_date, end_date):
+            return calendar.get_trade_dates(from_date, end_date).tolist()
         dates = []
         current_date = from_date
         while current_date <= end_date:
@@ -149,6 +330,13 @@ class TradeTime(object):
 
     @staticmethod
     def generate_trade_dates_by_window(window, end_date):
+        calendar = TradeCalendar.get_instance()
+        if calendar.covers(end_date):
+            dates = calendar.get_trade_dates_by_window(window, end_date)
+            if len(dates) == window:
+                if isinstance(end_date, datetime.datetime):
+                    return map(lambda x: datetime.datetime.combine(x, end_date.time()), dates.tolist())
+                return dates.tolist()
         count = 0
         dates = []
         current_date = end_date
@@ -160,41 +348,50 @@ class TradeTime(object):
         dates.reverse()
         return dates
 
+    @staticmethod
+    def get_sessions(from_date, end_date):
+        """
+        :return: the open and close minutes (datetime64[m]) of the trade dates from from_date to end_date.
+        """
+        calendar = TradeCalendar.get_instance()
+        if calendar.covers(from_date, end_date):
+            return calendar.get_sessions(from_date, end_date)
+        dates = TradeTime.generate_dates(from_date, end_date)
+        open_minutes = np.array(dates, dtype='datetime64[D]').astype('datetime64[m]') + 570
+        close_minutes = open_minutes + np.array(map(lambda x: 210 if TradeTime.is_half_trade_day(x) else 390, dates), dtype=int)
+        return open_minutes, close_minutes
+
+    @staticmethod
+    def get_trade_minutes(from_date, end_date, include_open=True):
+        """
+        the trading minute grid of the trade dates from from_date to end_date, 13:00 is the close of the half trade dates.
+        :param include_open: start each date from 9:30 as get_all_trade_min, or from 9:31 as generate_datetimes
+        :return: datetime64[m] array
+        """
+        (open_minutes, close_minutes) = TradeTime.get_sessions(from_date, end_date)
+        return TradeCalendar.get_minutes(open_minutes, close_minutes, include_open)
+
+    @staticmethod
+    def get_trade_minutes_by_window(window, end_datetime):
+        """
+        :return: datetime64[m] array of the last window + 1 trading minutes (from 9:31) on or before end_datetime.
+        """
+        dates = TradeTime.generate_trade_dates_by_window(window/390 + 2, end_datetime.date())
+        minutes = TradeTime.get_trade_minutes(dates[0], dates[-1], include_open=False)
+        minutes = minutes[:np.searchsorted(minutes, np.datetime64(end_datetime, 'm'), side='right')]
+        return minutes[-window-1:]
+
     @staticmethod
     def generate_datetimes(from_date, end_date):
-        datetimes = []
-        current_date = from_date
-        while current_date <= end_date:
-            if TradeTime.is_trade_day(current_date):
-                start_time = datetime.datetime(current_date.year, current_date.month, current_date.day, 9, 31, 0)
-                if TradeTime.is_half_trade_day(current_date):
-                    count = 180
-                else:
-                    count = 390
-                for i in range(count):
-                    datetimes.append(start_time + datetime.timedelta(minutes=i))
-            current_date += datetime.timedelta(days=1)
-        return datetimes
+        return TradeTime.get_trade_minutes(from_date, end_date, include_open=False).tolist()
 
     @staticmethod
     def generate_trade_datetimes_by_window(window, end_datetime):
-        end_date = end_datetime.date()
-        date_window = window/390 + 2
-        dates = TradeTime.generate_trade_dates_by_window(date_window, end_date)
-        datetimes = TradeTime.generate_datetimes(dates[0], dates[-1])
-        datetimes = filter(lambda x: x <= end_datetime, datetimes)
-        return datetimes[-window-1:]
+        return TradeTime.get_trade_minutes_by_window(window, end_datetime).tolist()
 
     @staticmethod
     def get_all_trade_min(date):
-        if TradeTime.is_trade_day(date):
-            start_time = datetime.datetime(date.year, date.month, date.day, 9, 30)
-            if TradeTime.is_half_trade_day(date):
-                return map(lambda x: start_time + datetime.timedelta(minutes=x), range(211))
-            else:
-                return map(lambda x: start_time + datetime.timedelta(minutes=x), range(391))
-        else:
-            return []
+        return TradeTime.get_trade_minutes(date, date).tolist()
 
 
 if __name__ == '__main__':
@@ -210,3 +407,4 @@ if __name__ == '__main__':
     print TradeTime.get_all_trade_min(datetime.date(2018, 1, 19))
     print TradeTime.get_all_trade_min(datetime.date(2017, 7, 3))
     print TradeTime.get_from_date_by_window(180)
+    print TradeTime.is_trade_days([datetime.date(2018, 1, 15), datetime.date(2018, 1, 16)])
@@ -1,20 +1,276 @@
+import os
+import time
+import tempfile
+import Queue
+import threading
 import traceback
 import datetime
+import decimal
+import collections
+import numpy as np
+import pandas as pd
 import mysql.connector
+from mysql.connector.constants import FieldType
 from utils.logger import Logger
 from common.pathmgr import PathMgr
 from common.configmgr import ConfigMgr
 
 
+class PooledConnection(object):
+    """
+    wrap the mysql connection checked out from the ConnectionPool,
+    close() hands it back to the pool instead of closing the socket.
+    the handle is shared by the nested checkouts of a thread: commit() and rollback() of a nested caller are deferred
+    to the outermost close(), so they never end the transaction of the outer caller halfway.
+    use it in a with statement, so it is closed (and rolled back on an error) even when the caller raises:
+        with BaseDAO.get_connection() as conn:
+            ...
+    """
+
+    def __init__(self, pool, conn, exclusive=False):
+        self.pool = pool
+        self.conn = conn
+        self.exclusive = exclusive
+        self.depth = 1
+        self.pending_commit = False
+        self.rollback_only = False
+
+    def commit(self):
+        if self.depth > 1:
+            self.pending_commit = True
+        elif self.rollback_only:
+            self.rollback()
+        else:
+            self.conn.commit()
+            self.pending_commit = False
+
+    def rollback(self):
+        if self.depth > 1:
+            self.rollback_only = True
+        else:
+            self.conn.rollback()
+            self.pending_commit = False
+            self.rollback_only = False
+
+    def close(self):
+        self.pool.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        try:
+            if exc_type is not None:
+                self.rollback()
+        finally:
+            self.close()
+        return False
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+class ConnectionPool(object):
+    """
+    a fixed size pool of mysql connections, each thread checks out one connection,
+    nested get_connection() calls in the same thread share it until the outermost close().
+    """
+
+    def __init__(self, size=5, timeout=30, idle_check_seconds=60, statement_cache_size=64):
+        self.size = size
+        self.timeout = timeout
+        self.idle_check_seconds = idle_check_seconds
+        self.statement_cache_size = statement_cache_size
+        self.statements = {}
+        self.pid = os.getpid()
+        self.idle = Queue.LifoQueue()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.created = 0
+        self.stats = {'checkouts': 0, 'reused': 0, 'created': 0, 'reconnects': 0, 'discarded': 0,
+                      'wait_seconds': 0.0, 'max_wait_seconds': 0.0, 'prepared': 0, 'prepared_hits': 0}
+
+    @staticmethod
+    def connect(allow_local_infile=False):
+        """
+        :param allow_local_infile: only for the dedicated connection of BaseDAO.bulk_load, never for the pooled connections.
+        """
+        db_config = ConfigMgr.get_db_config()
+        return mysql.connector.connect(host=db_config['host'], user=db_config['user'], password=db_config['password'], database=db_config['database'],
+                                       allow_local_infile=allow_local_infile)
+
+    def acquire(self, exclusive=False):
+        """
+        :param exclusive: check out a connection not shared with the other calls of current thread,
+                          eg: for streaming a result set while other queries run.
+        """
+        pooled = None if exclusive else getattr(self.local, 'connection', None)
+        if pooled is not None:
+            pooled.depth += 1
+            with self.lock:
+                self.stats['reused'] += 1
+            return pooled
+        start = time.time()
+        conn, last_used = self.checkout()
+        wait_seconds = time.time() - start
+        conn = self.ensure_alive(conn, last_used)
+        with self.lock:
+            self.stats['checkouts'] += 1
+            self.stats['wait_seconds'] += wait_seconds
+            self.stats['max_wait_seconds'] = max(self.stats['max_wait_seconds'], wait_seconds)
+        pooled = PooledConnection(self, conn, exclusive)
+        if not exclusive:
+            self.local.connection = pooled
+        return pooled
+
+    def checkout(self):
+        try:
+            return self.idle.get_nowait()
+        except Queue.Empty:
+            pass
+        with self.lock:
+            can_create = self.created < self.size
+            if can_create:
+                self.created += 1
+        if can_create:
+            try:
+                conn = ConnectionPool.connect()
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                raise
+            with self.lock:
+                self.stats['created'] += 1
+            return conn, time.time()
+        try:
+            return self.idle.get(True, self.timeout)
+        except Queue.Empty:
+            raise mysql.connector.errors.PoolError('No connection available in %s seconds, pool size is %s' % (self.timeout, self.size))
+
+    def ensure_alive(self, conn, last_used):
+        if time.time() - last_used < self.idle_check_seconds:
+            return conn
+        if conn.is_connected():
+            return conn
+        # the server side prepared statements are gone with the broken session.
+        self.statements.pop(id(conn), None)
+        try:
+            conn.reconnect(attempts=2, delay=1)
+        except Exception:
+            self.discard(conn)
+            conn = ConnectionPool.connect()
+            with self.lock:
+                self.created += 1
+                self.stats['created'] += 1
+        with self.lock:
+            self.stats['reconnects'] += 1
+        return conn
+
+    def release(self, pooled):
+        if pooled.depth <= 0:
+            # closed twice, the connection is in the pool already and must not be queued again.
+            return
+        pooled.depth -= 1
+        if pooled.depth > 0:
+            return
+        if not pooled.exclusive and getattr(self.local, 'connection', None) is pooled:
+            self.local.connection = None
+        conn = pooled.conn
+        (pending_commit, rollback_only) = (pooled.pending_commit, pooled.rollback_only)
+        (pooled.pending_commit, pooled.rollback_only) = (False, False)
+        try:
+            # the deferred commit of a nested caller is done here, otherwise the transaction is ended by a rollback,
+            # so the next user would not read from a stale snapshot.
+            if pending_commit and not rollback_only:
+                conn.commit()
+            else:
+                conn.rollback()
+        except Exception:
+            self.discard(conn)
+            return
+        self.idle.put((conn, time.time()))
+
+    def prepare(self, conn, query):
+        """
+        get the prepared cursor of the query for the raw connection, the least recently used statement is closed
+        when the cache of the connection is full.
+        :return: (cursor, statement), the same statement object must be passed to cursor.execute to skip re-preparing.
+        """
+        cache = self.statements.setdefault(id(conn), collections.OrderedDict())
+        entry = cache.pop(query, None)
+        if entry is None:
+            entry = (conn.cursor(prepared=True), query.replace('%s', '?'))
+            if len(cache) >= self.statement_cache_size:
+                (old_cursor, old_statement) = cache.popitem(last=False)[1]
+                try:
+                    old_cursor.close()
+                except Exception:
+                    pass
+            with self.lock:
+                self.stats['prepared'] += 1
+        else:
+            with self.lock:
+                self.stats['prepared_hits'] += 1
+        cache[query] = entry
+        return entry
+
+    def discard(self, conn):
+        self.statements.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self.lock:
+            self.created -= 1
+            self.stats['discarded'] += 1
+
+    def get_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+            stats['size'] = self.size
+            stats['open'] = self.created
+        stats['idle'] = self.idle.qsize()
+        if stats['checkouts'] > 0:
+            stats['avg_wait_seconds'] = stats['wait_seconds'] / stats['checkouts']
+        else:
+            stats['avg_wait_seconds'] = 0.0
+        return stats
+
+
 class BaseDAO(object):
 
+    _pool = None
+    _pool_lock = threading.Lock()
+
+    # the tables indexed in symbol_coverage, mapped to their date column.
+    coverage_date_columns = {'yahoo_equity': 'tradeDate', 'equity': 'tradeTime', 'equity_min': 'tradeTime', 'equity_30min': 'tradeTime'}
+
     def __init__(self):
         self.logger = Logger(self.__class__.__name__ or __name__, PathMgr.get_log_path())
 
+    @staticmethod
+    def get_pool():
+        pool = BaseDAO._pool
+        if pool is None or pool.pid != os.getpid():
+            with BaseDAO._pool_lock:
+                if BaseDAO._pool is None or BaseDAO._pool.pid != os.getpid():
+                    db_config = ConfigMgr.get_db_config()
+                    BaseDAO._pool = ConnectionPool(int(db_config.get('pool_size', 5)),
+                                                   int(db_config.get('pool_timeout', 30)),
+                                                   int(db_config.get('pool_idle_check_seconds', 60)))
+                pool = BaseDAO._pool
+        return pool
+
     @staticmethod
     def get_connection():
-        db_config = ConfigMgr.get_db_config()
-        return mysql.connector.connect(host=db_config['host'], user=db_config['user'], password=db_config['password'], database=db_config['database'])
+        return BaseDAO.get_pool().acquire()
+
+    @staticmethod
+    def get_pool_stats():
+        return BaseDAO.get_pool().get_stats()
+
+    def log_pool_stats(self):
+        self.logger.info('connection pool stats: %s' % BaseDAO.get_pool_stats())
 
     @staticmethod
     def python_value_to_sql_value(val):
@@ -31,6 +287,165 @@ class BaseDAO(object):
         mysql_args = map(BaseDAO.python_value_to_sql_value, args)
         return template.format(*mysql_args)
 
+    @staticmethod
+    def from_db_value(val, float_column_p=False):
+        """
+        convert the values of the binary protocol to what the text protocol returns.
+        """
+        if val is None:
+            return None
+        if float_column_p:
+            # mysql float is single precision, keep the shortest repr as the text protocol does.
+            return float(str(np.float32(val)))
+        if isinstance(val, bytearray):
+            return str(val)
+        if isinstance(val, decimal.Decimal):
+            return float(val)
+        return val
+
+    @staticmethod
+    def get_column_dtype(field_type):
+        if field_type in (FieldType.DATE, FieldType.NEWDATE):
+            return 'datetime64[D]'
+        if field_type in (FieldType.DATETIME, FieldType.TIMESTAMP):
+            return 'datetime64[s]'
+        if field_type in (FieldType.FLOAT, FieldType.DOUBLE, FieldType.DECIMAL, FieldType.NEWDECIMAL, FieldType.TINY,
+                          FieldType.SHORT, FieldType.LONG, FieldType.LONGLONG, FieldType.INT24):
+            return 'float64'
+        return object
+
+    def select_arrays(self, query, params=None, chunk_size=10000):
+        """
+        build one typed numpy array per column straight from the cursor, dates as datetime64, numbers as float64
+        (null as NaT/nan), the others as object.
+        :param query: sql, with %s placeholders if params is given
+        :param params: values of the placeholders
+        :return: OrderedDict of column name -> array, in the order of the select list
+        the error of the query is logged and raised, as select_iter.
+        """
+        conn = BaseDAO.get_connection()
+        try:
+            cursor = conn.cursor()
+            if params is None:
+                cursor.execute(query)
+            else:
+                cursor.execute(query, tuple(map(BaseDAO.to_db_value, params)))
+            names = map(lambda x: x[0], cursor.description)
+            dtypes = map(lambda x: BaseDAO.get_column_dtype(x[1]), cursor.description)
+            chunks = [[] for name in names]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for i, values in enumerate(zip(*rows)):
+                    chunks[i].append(np.array(values, dtype=dtypes[i]))
+            arrays = collections.OrderedDict()
+            for i, name in enumerate(names):
+                if len(chunks[i]) > 0:
+                    arrays[name] = np.concatenate(chunks[i])
+                else:
+                    arrays[name] = np.array([], dtype=dtypes[i])
+            return arrays
+        except Exception as e:
+            error_message = "Query:{}, error message: {}, Stack Trace: {}".format(query, str(e), traceback.format_exc())
+            self.logger.exception(error_message)
+            raise
+        finally:
+            conn.close()
+
+    def select_frame(self, query, params=None, columns=None):
+        """
+        :param columns: rename the columns of the DataFrame, default as the names in the select list
+        :return: DataFrame built from select_arrays
+        """
+        arrays = self.select_arrays(query, params)
+        df = pd.DataFrame(arrays, columns=arrays.keys())
+        if columns is not None:
+            df.columns = columns
+        return df
+
+    def select_iter(self, query, params=None, chunk_size=1000):
+        """
+        stream the rows of the query by fetchmany on an unbuffered cursor, so the memory does not grow with the result set.
+        it runs on its own pooled connection, other queries can be issued while iterating.
+        :param query: sql, with %s placeholders if params is given
+        :param params: values of the placeholders
+        :param chunk_size: rows fetched per round trip
+        """
+        conn = BaseDAO.get_pool().acquire(exclusive=True)
+        try:
+            cursor = conn.cursor(buffered=False)
+            if params is None:
+                cursor.execute(query)
+            else:
+                cursor.execute(query, tuple(map(BaseDAO.to_db_value, params)))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        except Exception as e:
+            error_message = "Query:{}, error message: {}, Stack Trace: {}".format(query, str(e), traceback.format_exc())
+            self.logger.exception(error_message)
+            raise
+        finally:
+            conn.close()
+
+    def query(self, query, params=()):
+        """
+        select with bound parameters, the statement is prepared once per pooled connection and reused.
+        :param query: sql with %s placeholders for values, eg: select closePrice from yahoo_equity where symbol = %s
+        :param params: values of the placeholders
+        :return: rows
+        """
+        conn = BaseDAO.get_connection()
+        try:
+            cursor, statement = BaseDAO.get_pool().prepare(conn.conn, query)
+            cursor.execute(statement, tuple(map(BaseDAO.to_db_value, params)))
+            float_indexes = [i for i, d in enumerate(cursor.description) if d[1] == FieldType.FLOAT]
+            rows = []
+            for row in cursor.fetchall():
+                row = list(row)
+                for i in range(len(row)):
+                    row[i] = BaseDAO.from_db_value(row[i], i in float_indexes)
+                rows.append(tuple(row))
+            return rows
+        except Exception as e:
+            error_message = "Query:{}, params: {}, error message: {}, Stack Trace: {}".format(query, params, str(e), traceback.format_exc())
+            self.logger.exception(error_message)
+        finally:
+            conn.close()
+
+    def query_scalar(self, query, params=()):
+        """
+        :return: the first column of the first row, None if there is no row.
+        """
+        rows = self.query(query, params)
+        if rows is None or len(rows) < 1:
+            return None
+        else:
+            return rows[0][0]
+
+    def execute(self, query, params=()):
+        """
+        insert/update/delete with bound parameters on a prepared statement, duplicated key is ignored as execute_query does.
+        :return: affected rows
+        """
+        conn = BaseDAO.get_connection()
+        try:
+            cursor, statement = BaseDAO.get_pool().prepare(conn.conn, query)
+            cursor.execute(statement, tuple(map(BaseDAO.to_db_value, params)))
+            conn.commit()
+            return cursor.rowcount
+        except mysql.connector.IntegrityError:
+            return 0
+        except Exception as e:
+            error_message = "Query:{}, params: {}, error message: {}, Stack Trace: {}".format(query, params, str(e), traceback.format_exc())
+            self.logger.exception(error_message)
+        finally:
+            conn.close()
+
     def select(self, query, cursor=None):
         #self.logger.info('query:%s' % query)
         conn = None
@@ -83,6 +498,287 @@ class BaseDAO(object):
         finally:
             conn.close()
 
+    @staticmethod
+    def to_db_value(val):
+        """
+        convert numpy/pandas scalars to the python types mysql.connector can bind, NaN/NaT to null.
+        """
+        if val is None or val is pd.NaT:
+            return None
+        if isinstance(val, pd.Timestamp):
+            return val.to_pydatetime()
+        if isinstance(val, np.generic):
+            val = val.item()
+        if isinstance(val, float) and val != val:
+            return None
+        return val
+
+    @staticmethod
+    def to_db_rows(records, fields):
+        """
+        :param records: DataFrame, entities or sequences
+        :param fields: DataFrame columns or entity attributes, in the order of the table columns
+        :return: list of tuples ready to be bound to the statement
+        """
+        if isinstance(records, pd.DataFrame):
+            rows = records[fields].values.tolist()
+        else:
+            rows = []
+            for record in records:
+                if isinstance(record, (list, tuple)):
+                    rows.append(record)
+                else:
+                    rows.append([getattr(record, field) for field in fields])
+        return [tuple(map(BaseDAO.to_db_value, row)) for row in rows]
+
+    @staticmethod
+    def get_write_counts(total, affected, upsert):
+        """
+        mysql reports 1 affected row per inserted row, 2 per updated row and 0 per unchanged or ignored row,
+        so the inserted rows of an upsert can not be told from the affected rows (eg: 2 updated and 2 unchanged rows
+        are 4 affected rows as 4 inserted rows), only insert ignore is split into the inserted and skipped rows.
+        :return: dict of affected count, and the inserted and skipped counts if not upsert
+        """
+        if upsert:
+            return {'affected': affected}
+        return {'affected': affected, 'inserted': affected, 'skipped': total - affected}
+
+    def update_coverage(self, table, symbols=None, cursor=None, chunk_size=500):
+        """
+        recompute the first date, last date and row count of the symbols in symbol_coverage from the table,
+        for the rebuilds and the data clean jobs, the bulk writers extend the coverage by add_coverage.
+        :param table: one of coverage_date_columns, other tables are ignored
+        :param symbols: the written symbols, None to rebuild the coverage of the whole table
+        :param cursor: if given, the caller commits the transaction
+        """
+        date_column = BaseDAO.coverage_date_columns.get(table)
+        if date_column is None:
+            return
+        query_template = """insert into symbol_coverage (tableName, symbol, firstDate, lastDate, rowCount)
+                            select %s, symbol, min({0}), max({0}), count(*) from {1}{2} group by symbol
+                            on duplicate key update firstDate=values(firstDate), lastDate=values(lastDate), rowCount=values(rowCount)"""
+        conn = None
+        if cursor is None:
+            conn = BaseDAO.get_connection()
+            cursor = conn.cursor()
+        try:
+            if symbols is None:
+                cursor.execute("""delete from symbol_coverage where tableName = %s""", (table,))
+                cursor.execute(query_template.format(date_column, table, ''), (table,))
+            else:
+                symbols = sorted(set(symbols))
+                for i in range(0, len(symbols), chunk_size):
+                    chunk = symbols[i:i + chunk_size]
+                    where_sql = ' where symbol in ({})'.format(','.join(['%s'] * len(chunk)))
+                    cursor.execute(query_template.format(date_column, table, where_sql), [table] + chunk)
+            if conn:
+                conn.commit()
+        except Exception as e:
+            error_message = "Update coverage of {} failed, error message: {}, Stack Trace: {}".format(table, str(e), traceback.format_exc())
+            self.logger.exception(error_message)
+        finally:
+            if conn:
+                conn.close()
+
+    def add_coverage(self, table, symbol_inserts, cursor):
+        """
+        extend the coverage of the symbols by the written rows, without scanning the table:
+        the dates are widened to the written dates and the row count grows by the inserted rows.
+        used only for the chunks whose rows were all inserted, the symbols with duplicated rows are recounted by update_coverage.
+        the symbols not in symbol_coverage yet are recounted from the table by update_coverage.
+        :param symbol_inserts: dict of symbol -> (first written date, last written date, inserted count)
+        :param cursor: the caller commits the transaction
+        """
+        symbols = sorted(symbol_inserts.keys())
+        if len(symbols) == 0:
+            return
+        try:
+            cursor.execute("""select symbol from symbol_coverage where tableName = %s and symbol in ({})""".format(','.join(['%s'] * len(symbols))),
+                           [table] + symbols)
+            covered = set(map(lambda x: x[0], cursor.fetchall()))
+            records = map(lambda x: (table, x) + tuple(symbol_inserts[x]), filter(lambda x: x in covered, symbols))
+            if len(records) > 0:
+                cursor.execute("""insert into symbol_coverage (tableName, symbol, firstDate, lastDate, rowCount) values {}
+                                  on duplicate key update firstDate=least(firstDate, values(firstDate)), lastDate=greatest(lastDate, values(lastDate)),
+                                  rowCount=rowCount+values(rowCount)""".format(','.join(['(%s,%s,%s,%s,%s)'] * len(records))),
+                               [value for record in records for value in record])
+        except Exception as e:
+            error_message = "Add coverage of {} failed, error message: {}, Stack Trace: {}".format(table, str(e), traceback.format_exc())
+            self.logger.exception(error_message)
+            return
+        uncovered = filter(lambda x: x not in covered, symbols)
+        if len(uncovered) > 0:
+            self.update_coverage(table, uncovered, cursor)
+
+    @staticmethod
+    def split_chunks(rows, chunk_size, symbol_index=None):
+        """
+        :param symbol_index: if given, each chunk holds the rows of one symbol, so the affected rows of a statement are counted per symbol.
+        :return: list of the chunks of rows
+        """
+        if symbol_index is None:
+            return [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+        symbol_rows = collections.OrderedDict()
+        for row in rows:
+            symbol_rows.setdefault(row[symbol_index], []).append(row)
+        return [group[i:i + chunk_size] for group in symbol_rows.values() for i in range(0, len(group), chunk_size)]
+
+    def bulk_write(self, table, columns, records, fields=None, update_columns=None, chunk_size=1000, cursor=None):
+        """
+        write records with multi-row parameterized statements, "insert ... on duplicate key update" when
+        update_columns is given, otherwise "insert ignore" so duplicated keys are skipped.
+        :param table: table name
+        :param columns: table columns
+        :param records: DataFrame, list of entities or list of sequences in the order of columns
+        :param fields: DataFrame columns or entity attributes mapped to columns, default as columns
+        :param update_columns: columns to update on duplicated key
+        :param chunk_size: rows per statement
+        :param cursor: if given, the caller commits the transaction
+        :return: dict of affected and failed counts, with the inserted and skipped counts of insert ignore, as get_write_counts
+        """
+        rows = BaseDAO.to_db_rows(records, fields or columns)
+        counts = {'affected': 0, 'failed': 0}
+        if not update_columns:
+            counts.update({'inserted': 0, 'skipped': 0})
+        if len(rows) == 0:
+            return counts
+        row_sql = '(%s)' % ','.join(['%s'] * len(columns))
+        if update_columns:
+            head = 'insert into {} ({}) values '.format(table, ','.join(columns))
+            tail = ' on duplicate key update ' + ','.join(map(lambda x: '{0}=values({0})'.format(x), update_columns))
+        else:
+            head = 'insert ignore into {} ({}) values '.format(table, ','.join(columns))
+            tail = ''
+        conn = None
+        if cursor is None:
+            conn = BaseDAO.get_connection()
+            cursor = conn.cursor()
+        date_column = BaseDAO.coverage_date_columns.get(table)
+        symbol_index = columns.index('symbol') if date_column in columns and 'symbol' in columns else None
+        symbol_inserts = {}
+        recounted_symbols = set()
+        try:
+            for chunk in BaseDAO.split_chunks(rows, chunk_size, symbol_index):
+                query = head + ','.join([row_sql] * len(chunk)) + tail
+                try:
+                    cursor.execute(query, [value for row in chunk for value in row])
+                    if conn:
+                        conn.commit()
+                except Exception as e:
+                    counts['failed'] += len(chunk)
+                    error_message = "Bulk write into {} failed for {} rows, error message: {}, Stack Trace: {}".format(table, len(chunk), str(e), traceback.format_exc())
+                    self.logger.exception(error_message)
+                    continue
+                chunk_counts = BaseDAO.get_write_counts(len(chunk), cursor.rowcount, bool(update_columns))
+                for (key, count) in chunk_counts.items():
+                    counts[key] += count
+                if symbol_index is None or chunk_counts['affected'] == 0:
+                    continue
+                symbol = chunk[0][symbol_index]
+                if update_columns or chunk_counts['skipped'] > 0 or symbol in recounted_symbols:
+                    # a chunk with any duplicated (updated or skipped) row, or an upsert whose inserted rows are unknown,
+                    # is never added to the row count, the symbol is recounted from the table.
+                    recounted_symbols.add(symbol)
+                    symbol_inserts.pop(symbol, None)
+                else:
+                    dates = map(lambda x: x[columns.index(date_column)], chunk)
+                    (first_date, last_date, count) = symbol_inserts.get(symbol, (min(dates), max(dates), 0))
+                    symbol_inserts[symbol] = (min(first_date, min(dates)), max(last_date, max(dates)), count + chunk_counts['inserted'])
+            if len(symbol_inserts) > 0 or len(recounted_symbols) > 0:
+                self.add_coverage(table, symbol_inserts, cursor)
+                if len(recounted_symbols) > 0:
+                    self.update_coverage(table, recounted_symbols, cursor)
+                if conn:
+                    conn.commit()
+        finally:
+            if conn:
+                conn.close()
+        return counts
+
+    @staticmethod
+    def to_tsv_value(val):
+        if val is None:
+            return '\\N'
+        if isinstance(val, datetime.datetime):
+            return val.strftime('%Y-%m-%d %H:%M:%S')
+        if isinstance(val, datetime.date):
+            return val.strftime('%Y-%m-%d')
+        if isinstance(val, float):
+            return repr(val)
+        if isinstance(val, unicode):
+            val = val.encode('utf-8')
+        return str(val).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+    def bulk_load(self, table, columns, records, fields=None, update_columns=None, date_columns=()):
+        """
+        load records through "load data local infile" into a temporary staging table,
+        then merge the staging table into the target table with one "insert ... select".
+        :param date_columns: date (not datetime) columns, the time part is dropped in the tsv file.
+        :return: dict of the counts of get_write_counts and the seconds spent on write, load and merge.
+        """
+        result = BaseDAO.get_write_counts(0, 0, bool(update_columns))
+        start = time.time()
+        rows = BaseDAO.to_db_rows(records, fields or columns)
+        date_indexes = [i for i, column in enumerate(columns) if column in date_columns]
+        tsv_file = tempfile.NamedTemporaryFile(prefix='%s_' % table, suffix='.tsv', delete=False)
+        try:
+            with tsv_file:
+                for row in rows:
+                    values = list(row)
+                    for i in date_indexes:
+                        if isinstance(values[i], datetime.datetime):
+                            values[i] = values[i].date()
+                    tsv_file.write('\t'.join(map(BaseDAO.to_tsv_value, values)))
+                    tsv_file.write('\n')
+            result['write_seconds'] = time.time() - start
+
+            staging_table = '%s_staging' % table
+            columns_sql = ','.join(columns)
+            if update_columns:
+                merge_sql = 'insert into {0} ({1}) select {1} from {2} on duplicate key update {3}'.format(
+                    table, columns_sql, staging_table, ','.join(map(lambda x: '{0}=values({0})'.format(x), update_columns)))
+            else:
+                merge_sql = 'insert ignore into {0} ({1}) select {1} from {2}'.format(table, columns_sql, staging_table)
+            # load data local infile is allowed only on a connection of its own, never on the pooled ones.
+            conn = ConnectionPool.connect(allow_local_infile=True)
+            cursor = conn.cursor()
+            try:
+                cursor.execute('drop temporary table if exists {}'.format(staging_table))
+                cursor.execute('create temporary table {} like {}'.format(staging_table, table))
+                start = time.time()
+                cursor.execute("load data local infile '{}' into table {} fields terminated by '\\t' lines terminated by '\\n' ({})".format(
+                    tsv_file.name.replace('\\', '/'), staging_table, columns_sql))
+                result['load_seconds'] = time.time() - start
+                start = time.time()
+                cursor.execute(merge_sql)
+                counts = BaseDAO.get_write_counts(len(rows), cursor.rowcount, bool(update_columns))
+                date_column = BaseDAO.coverage_date_columns.get(table)
+                if date_column in columns and 'symbol' in columns and counts['affected'] > 0:
+                    symbols = zip(*rows)[columns.index('symbol')]
+                    if counts.get('inserted') == len(rows):
+                        # all the rows are new, they are counted per symbol without scanning the table.
+                        symbol_inserts = {}
+                        for row in rows:
+                            (symbol, the_date) = (row[columns.index('symbol')], row[columns.index(date_column)])
+                            (first_date, last_date, count) = symbol_inserts.get(symbol, (the_date, the_date, 0))
+                            symbol_inserts[symbol] = (min(first_date, the_date), max(last_date, the_date), count + 1)
+                        self.add_coverage(table, symbol_inserts, cursor)
+                    else:
+                        self.update_coverage(table, symbols, cursor)
+                conn.commit()
+                result['merge_seconds'] = time.time() - start
+                result.update(counts)
+                cursor.execute('drop temporary table if exists {}'.format(staging_table))
+            except Exception as e:
+                error_message = "Bulk load into {} failed, error message: {}, Stack Trace: {}".format(table, str(e), traceback.format_exc())
+                self.logger.exception(error_message)
+            finally:
+                conn.close()
+        finally:
+            os.remove(tsv_file.name)
+        self.logger.info('bulk load %s rows into %s: %s' % (len(rows), table, result))
+        return result
+
 if __name__ == '__main__':
     #print BaseDAO.mysql_format('insert into table (field1, field2) values ({}, {})', None, None)
     print BaseDAO.python_value_to_sql_value(0.0)
@@ -20,8 +20,8 @@ class DBProvider(object):
         price_field = fields_dic[field]
         yahoo_symbol = Symbols.get_mapped_symbol(symbol)
         from_date = TradeTime.get_from_date_by_window(window)
-        rows = YahooEquityDAO().get_all_equity_price_by_symbol(yahoo_symbol, from_date.strftime('%Y-%m-%d'), price_field)
-        return rows
+        df = YahooEquityDAO(use_store=True).get_equity_price_frame(yahoo_symbol, from_date.strftime('%Y-%m-%d'), price_field)
+        return pd.Series(df['price'].values, index=df['date'].values)
 
 
 class Data(object):
@@ -41,22 +41,19 @@ class Data(object):
         """
         frequency = '1d'
         if hasattr(assets, '__iter__'):
-            results = None
-            columns = ['date']
+            series_list = []
             for symbol in assets:
                 print symbol
-                columns.append(symbol)
-                rows = self.historical_data_provider.history(symbol, field, window)
-                if results is None:
-                    results = map(list, rows)
-                else:
-                    map(lambda x, y: x.append(y[1]), results, rows)
-            df = pd.DataFrame(map(lambda x: x[1:], results), index=map(lambda x: x[0], results), columns=columns[1:])
+                series = self.historical_data_provider.history(symbol, field, window)
+                series.name = symbol
+                series_list.append(series)
+            # align on the dates of the first symbol.
+            df = pd.concat(series_list, axis=1).reindex(series_list[0].index)
             return df
         else:
             symbol = str(assets)
-            rows = self.historical_data_provider.history(symbol, field, window)
-            df = pd.DataFrame(map(lambda x: x[1:], rows), index=map(lambda x: x[0], rows), columns = ['price'])
+            series = self.historical_data_provider.history(symbol, field, window)
+            df = series.to_frame('price')
             return df
 
 if __name__ == '__main__':
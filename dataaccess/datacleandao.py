@@ -17,6 +17,7 @@ class DataCleanDAO(BaseDAO):
     def clean_equity_data(self):
         query = """delete from equity where tradeTime = str_to_date('2017-09-23', '%Y-%m-%d')"""
         self.execute_query(query)
+        self.update_coverage('equity')
 
     # found the trade time error in database, fix it...
     def fix_option_date_error1(self):
@@ -86,6 +87,12 @@ class DataCleanDAO(BaseDAO):
                 print date
                 print query
                 self.execute_query(query)
+        self.update_coverage('yahoo_equity')
+
+    # fill symbol_coverage for the records written before the table was created.
+    def rebuild_symbol_coverage(self):
+        for table in BaseDAO.coverage_date_columns.keys():
+            self.update_coverage(table)
 
 
 
@@ -100,4 +107,5 @@ if __name__ == '__main__':
     # DataCleanDAO().clean_equity_data()
     # DataCleanDAO().add_missing_data_to_realtime_from_min(datetime.date(2018, 8, 3), 'SPY')
     # DataCleanDAO().add_missing_date_for_option(datetime.date(2018, 5, 18), datetime.date(2018, 5, 17))
+    # DataCleanDAO().rebuild_symbol_coverage()
     DataCleanDAO().clear_invalid_date_records()
\ No newline at end of file
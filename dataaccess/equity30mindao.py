@@ -8,19 +8,16 @@ class Equity30MinDAO(BaseDAO):
         BaseDAO.__init__(self)
 
     def insert(self, records):
-        query_template = """insert into equity_30min (symbol,tradeTime,openPrice,highPrice,lowPrice,closePrice,volume)
-                            values ('{}','{}',{},{},{},{},{})
-                            on duplicate key update openPrice={},highPrice={},lowPrice={},closePrice={},volume={}
-                         """
-        conn = BaseDAO.get_connection()
-        cursor = conn.cursor()
-        for equity in records:
-            query = BaseDAO.mysql_format(query_template, equity.symbol, equity.tradeTime, equity.openPrice, equity.highPrice,
-                                         equity.lowPrice, equity.lastPrice, equity.volume, equity.openPrice, equity.highPrice,
-                                         equity.lowPrice, equity.lastPrice, equity.volume)
-            self.execute_query(query, cursor)
-        conn.commit()
-        conn.close()
+        columns = ['symbol', 'tradeTime', 'openPrice', 'highPrice', 'lowPrice', 'closePrice', 'volume']
+        fields = ['symbol', 'tradeTime', 'openPrice', 'highPrice', 'lowPrice', 'lastPrice', 'volume']
+        return self.bulk_write('equity_30min', columns, records, fields, update_columns=columns[2:])
+
+    def save_bars(self, df):
+        """
+        :param df: DataFrame in the columns of the table, as BarResampler.resample
+        """
+        columns = ['symbol', 'tradeTime', 'openPrice', 'highPrice', 'lowPrice', 'closePrice', 'volume']
+        return self.bulk_write('equity_30min', columns, df, update_columns=columns[2:])
 
     def get_time_and_price(self, symbol='SPY', start_time=datetime.datetime(1971, 1, 1, 0, 0, 0), end_time=datetime.datetime(9999, 1, 1, 0, 0, 0)):
         query = """select tradeTime, closePrice from equity_30min where tradeTime >= '{}' and tradeTime <= '{}' and symbol = '{}' and tradeTime not like '%09:30:00' order by tradeTime""".format(start_time, end_time, symbol)
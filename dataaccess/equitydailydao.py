@@ -0,0 +1,25 @@
+from dataaccess.basedao import BaseDAO
+
+
+class EquityDailyDAO(BaseDAO):
+    """
+    the daily bars rolled up from equity_min, kept apart from the adjusted daily prices of yahoo_equity.
+    """
+
+    def __init__(self):
+        BaseDAO.__init__(self)
+
+    def save_bars(self, df):
+        """
+        :param df: DataFrame in the columns of the table, as BarResampler.resample
+        """
+        columns = ['symbol', 'tradeDate', 'openPrice', 'highPrice', 'lowPrice', 'closePrice', 'volume']
+        return self.bulk_write('equity_daily', columns, df, update_columns=columns[2:])
+
+    def get_time_and_price(self, symbol='SPY', start_date='1971-01-01', end_date='9999-01-01'):
+        query = """select tradeDate, closePrice from equity_daily where tradeDate >= %s and tradeDate <= %s and symbol = %s order by tradeDate"""
+        return self.query(query, (start_date, end_date, symbol))
+
+
+if __name__ == '__main__':
+    print EquityDailyDAO().get_time_and_price(start_date='2018-01-01')
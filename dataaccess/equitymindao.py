@@ -1,9 +1,11 @@
 import datetime
 import pytz
 import os
+import numpy as np
+import pandas as pd
 from utils.iohelper import write_to_file, ensure_dir_exists
+from utils.timeserieshelper import get_missing_minutes, split_by_key
 from common.pathmgr import PathMgr
-from entities.equity import Equity
 from dataaccess.basedao import BaseDAO
 from common.tradetime import TradeTime
 
@@ -14,20 +16,37 @@ class EquityMinDAO(BaseDAO):
         BaseDAO.__init__(self)
 
     def insert(self, records):
-        query_template = """insert into equity_min (symbol,tradeTime,openPrice,highPrice,lowPrice,closePrice,volume) values ('{}','{}',{},{},{},{},{})"""
-        conn = BaseDAO.get_connection()
-        cursor = conn.cursor()
-        for equity in records:
-            query = BaseDAO.mysql_format(query_template, equity.symbol, equity.tradeTime, equity.openPrice, equity.highPrice,
-                                         equity.lowPrice, equity.lastPrice, equity.volume)
-            self.execute_query(query, cursor)
-        conn.commit()
-        conn.close()
+        columns = ['symbol', 'tradeTime', 'openPrice', 'highPrice', 'lowPrice', 'closePrice', 'volume']
+        fields = ['symbol', 'tradeTime', 'openPrice', 'highPrice', 'lowPrice', 'lastPrice', 'volume']
+        return self.bulk_write('equity_min', columns, records, fields)
 
     def get_records(self, symbol, start_time=datetime.datetime(1971, 1, 1, 0, 0, 0), end_time=datetime.datetime(9999, 1, 1, 0, 0, 0)):
         query = """select tradeTime, openPrice, highPrice, lowPrice, closePrice, volume from equity_min where tradeTime >= '{}' and tradeTime <= '{}' and symbol = '{}' order by tradeTime""".format(start_time, end_time, symbol)
         return self.select(query)
 
+    def iter_records(self, symbol, start_time=datetime.datetime(1971, 1, 1, 0, 0, 0), end_time=datetime.datetime(9999, 1, 1, 0, 0, 0), chunk_size=5000):
+        """
+        the same rows as get_records, streamed by chunk_size rows rather than loaded at once.
+        """
+        query = """select tradeTime, openPrice, highPrice, lowPrice, closePrice, volume from equity_min where tradeTime >= %s and tradeTime <= %s and symbol = %s order by tradeTime"""
+        return self.select_iter(query, (start_time, end_time, symbol), chunk_size)
+
+    def get_time_range(self, symbols):
+        """
+        :return: (first tradeTime, last tradeTime) of the symbols, (None, None) without any bar.
+        """
+        query = """select min(tradeTime), max(tradeTime) from equity_min where symbol in ({})""".format(','.join(['%s'] * len(symbols)))
+        rows = self.query(query, list(symbols))
+        return rows[0] if rows else (None, None)
+
+    def get_bar_arrays(self, symbols, start_time, end_time):
+        """
+        :return: the columns of the bars of the symbols with start_time <= tradeTime < end_time, ordered by symbol and tradeTime.
+        """
+        query = """select symbol, tradeTime, openPrice, highPrice, lowPrice, closePrice, volume from equity_min
+                   where symbol in ({}) and tradeTime >= %s and tradeTime < %s order by symbol, tradeTime"""
+        return self.select_arrays(query.format(','.join(['%s'] * len(symbols))), list(symbols) + [start_time, end_time])
+
     def get_time_and_price(self, symbol='SVXY', start_time=datetime.datetime(1971, 1, 1, 0, 0, 0), end_time=datetime.datetime(9999, 1, 1, 0, 0, 0)):
         query = """select tradeTime, closePrice from equity_min where tradeTime >= '{}' and tradeTime <= '{}' and symbol = '{}' order by tradeTime""".format(start_time, end_time, symbol)
         return self.select(query)
@@ -49,26 +68,40 @@ class EquityMinDAO(BaseDAO):
             write_to_file(file_path, content)
 
 
+    @staticmethod
+    def to_missing_frame(symbol, times, prices):
+        """
+        :return: DataFrame of the synthesized bars in the fields of insert, open/high/low/close as the fill price and 0 volume.
+        """
+        return pd.DataFrame({'symbol': symbol, 'tradeTime': times.astype('datetime64[ns]'), 'openPrice': prices,
+                             'highPrice': prices, 'lowPrice': prices, 'lastPrice': prices, 'volume': 0})
+
+    def fill_missing_minutes(self, symbols, from_date, to_date=None):
+        """
+        add the missing trading minutes of the symbols in one pass: the bars of the whole date range are loaded by one query,
+        reindexed against the trading minute grid, and only the synthesized bars are bulk inserted.
+        :return: dict of symbol -> count of the synthesized bars
+        """
+        if to_date is None:
+            to_date = from_date
+        grid = TradeTime.get_trade_minutes(from_date, to_date)
+        query = """select symbol, tradeTime, closePrice from equity_min where symbol in ({}) and tradeTime >= %s and tradeTime < %s order by symbol, tradeTime"""
+        arrays = self.select_arrays(query.format(','.join(['%s'] * len(symbols))),
+                                    list(symbols) + [from_date, to_date + datetime.timedelta(days=1)])
+        counts = dict(map(lambda x: (x, 0), symbols))
+        frames = []
+        for (symbol, rows) in split_by_key(arrays['symbol']):
+            (times, prices) = get_missing_minutes(arrays['tradeTime'][rows], arrays['closePrice'][rows], grid)
+            counts[symbol] = len(times)
+            frames.append(EquityMinDAO.to_missing_frame(symbol, times, prices))
+        if len(frames) > 0:
+            self.insert(pd.concat(frames, ignore_index=True))
+        return counts
+
     def add_missing_data(self, symbol='SVXY', validate_date=None):
         if validate_date is None:
             validate_date = TradeTime.get_latest_trade_date()
-        start_time = datetime.datetime.fromordinal(validate_date.toordinal())
-        end_time = start_time + datetime.timedelta(days=1)
-        rows = self.get_time_and_price(symbol, start_time, end_time)
-        j = 0
-        missing_records = []
-        for i, time in enumerate(TradeTime.get_all_trade_min(validate_date)):
-            if j >= len(rows) or rows[j][0] > time:
-                if j > 0:
-                    price = rows[j-1][1]
-                else:
-                    price = rows[0][1]
-                missing_records.append(Equity(symbol, time, price, price, price, price, 0, 0))
-            else:
-                j = j+1
-        if len(missing_records) > 0:
-            self.insert(missing_records)
-        return len(missing_records)
+        return self.fill_missing_minutes([symbol], validate_date)[symbol]
 
     def add_missing_data_in_real_time(self, symbol='SVXY', ):
         us_dt = datetime.datetime.now(tz=pytz.timezone('US/Eastern'))
@@ -83,25 +116,16 @@ class EquityMinDAO(BaseDAO):
                     default_end_time = datetime.datetime(now.year, now.month, now.day, 16, 0, 0)
                 end_time = min(now, default_end_time)
                 if end_time > start_time:
-                    minutes_count = range((end_time - start_time).seconds/60 + 1)
-                    trade_minutes = map(lambda x: start_time + datetime.timedelta(minutes=x), minutes_count)
-                    # print trade_minutes
-                    rows = self.get_time_and_price(symbol, start_time, end_time)
-                    # print rows
-                    j = 0
-                    missing_records = []
-                    for i, time in enumerate(trade_minutes):
-                        if rows[j][0] > time:
-                            if j > 0:
-                                price = rows[j - 1][1]
-                            else:
-                                price = rows[0][1]
-                            missing_records.append(Equity(symbol, time, price, price, price, price, 0, 0))
-                        else:
-                            j = j + 1
-                    if len(missing_records) > 0:
-                        self.insert(missing_records)
-                    return len(missing_records)
+                    arrays = self.select_arrays("""select tradeTime, closePrice from equity_min where tradeTime >= %s and tradeTime <= %s and symbol = %s order by tradeTime""",
+                                                (start_time, end_time, symbol))
+                    if len(arrays['tradeTime']) == 0:
+                        return 0
+                    # the minutes after the last bar are not filled, the bar of the current minute may be not arrived yet.
+                    grid = np.arange(np.datetime64(start_time, 'm'), arrays['tradeTime'][-1].astype('datetime64[m]') + 1)
+                    (times, prices) = get_missing_minutes(arrays['tradeTime'], arrays['closePrice'], grid)
+                    if len(times) > 0:
+                        self.insert(EquityMinDAO.to_missing_frame(symbol, times, prices))
+                    return len(times)
 
     def validate_integrity_for_min_data(self, symbol):
         print symbol
@@ -141,6 +165,7 @@ class EquityMinDAO(BaseDAO):
     def remove_market_open_records(self):
         sql = """delete from equity_min where tradetime like '%9:30:00'"""
         self.execute_query(sql)
+        self.update_coverage('equity_min')
 
 
 if __name__ == '__main__':
@@ -149,8 +174,5 @@ if __name__ == '__main__':
     # EquityMinDAO().add_missing_data_in_real_time('XIV')
     # print EquityMinDAO().save_to_csv()
     # print EquityMinDAO().validate_integrity_for_min_data('UBT')
-    # for trade_date in TradeTime.generate_dates(datetime.date(2009, 1, 30), TradeTime.get_latest_trade_date()):
-    #     print 'Add missing data for %s' % trade_date
-    #     EquityMinDAO().add_missing_data('VXX', trade_date)
-    for trade_date in TradeTime.generate_dates(datetime.date(2018, 5, 30), TradeTime.get_latest_trade_date()):
-        EquityMinDAO().add_missing_data('SPY', trade_date)
\ No newline at end of file
+    # print EquityMinDAO().fill_missing_minutes(['VXX'], datetime.date(2009, 1, 30), TradeTime.get_latest_trade_date())
+    print EquityMinDAO().fill_missing_minutes(['SPY'], datetime.date(2018, 5, 30), TradeTime.get_latest_trade_date())
\ No newline at end of file
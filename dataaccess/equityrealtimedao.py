@@ -1,7 +1,9 @@
 import datetime
 import os
 import pytz
+import numpy as np
 from utils.iohelper import write_to_file, ensure_dir_exists
+from utils.timeserieshelper import get_missing_minutes
 from common.pathmgr import PathMgr
 from common.tradetime import TradeTime
 from dataaccess.basedao import BaseDAO
@@ -13,9 +15,14 @@ class EquityRealTimeDAO(BaseDAO):
         BaseDAO.__init__(self)
 
     def insert(self, symbol, trade_time, price):
-        query_template = """insert into equity_realtime (symbol,tradeTime,price) values ('{}','{}',{})"""
-        query = BaseDAO.mysql_format(query_template, symbol, trade_time, price)
-        self.execute_query(query)
+        query = """insert into equity_realtime (symbol,tradeTime,price) values (%s,%s,%s)"""
+        self.execute(query, (symbol, trade_time, price))
+
+    def insert_records(self, records):
+        """
+        :param records: list of (symbol, tradeTime, price), written in batches on one connection.
+        """
+        return self.bulk_write('equity_realtime', ['symbol', 'tradeTime', 'price'], records)
 
     def get_time_and_price(self, symbol='XIV', start_time=datetime.datetime(1971, 1, 1, 0, 0, 0), end_time=datetime.datetime(9999, 1, 1, 0, 0, 0)):
         query = """select tradeTime, price from equity_realtime where tradeTime >= '{}' and tradeTime <= '{}' and symbol = '{}' order by tradeTime """.format(start_time, end_time, symbol)
@@ -49,36 +56,32 @@ class EquityRealTimeDAO(BaseDAO):
         return new_rows
 
     def get_nearest_price(self, missing_time, symbol='XIV'):
-        query = """select price from equity_realtime where symbol = '{}' and tradeTime <= '{}' order by tradeTime desc limit 1"""\
-            .format(symbol, missing_time)
-        rows = self.select(query)
-        return float(rows[0][0])
+        query = """select price from equity_realtime where symbol = %s and tradeTime <= %s order by tradeTime desc limit 1"""
+        return float(self.query_scalar(query, (symbol, missing_time)))
 
 
+    def fill_missing_minutes(self, symbol, start_time, end_time, grid, until_last_tick=False):
+        """
+        load the ticks between start_time and end_time once, and fill each minute of the grid without a tick
+        by the price of the nearest earlier tick (as get_nearest_price), or the first tick for the minutes before it.
+        :param until_last_tick: do not fill the minutes after the last tick
+        :return: count of the filled records
+        """
+        arrays = self.select_arrays("""select tradeTime, price from equity_realtime where tradeTime >= %s and tradeTime <= %s and symbol = %s order by tradeTime""",
+                                    (start_time, end_time, symbol))
+        if until_last_tick and len(arrays['tradeTime']) > 0:
+            grid = grid[grid <= arrays['tradeTime'][-1].astype('datetime64[m]')]
+        (times, prices) = get_missing_minutes(arrays['tradeTime'], arrays['price'], grid)
+        if len(times) > 0:
+            self.insert_records(map(lambda x, y: (symbol, x, y), times.tolist(), prices.tolist()))
+        return len(times)
+
     def add_missing_data(self, symbol='SVXY', validate_date=None):
         if validate_date is None:
             validate_date = TradeTime.get_latest_trade_date()
         start_time = datetime.datetime.fromordinal(validate_date.toordinal())
         end_time = start_time + datetime.timedelta(days=1)
-        rows = self.get_min_time_and_price(symbol, start_time, end_time)
-        j = 0
-        missing_records = []
-        for i, time in enumerate(TradeTime.get_all_trade_min(validate_date)):
-            # if i == 390:
-            #     print time
-            if j >= len(rows) or rows[j][0].minute > time.minute or rows[j][0].hour > time.hour:
-                if j > 0:
-                    # price = rows[j-1][1]
-                    price = self.get_nearest_price(time, symbol)
-                else:
-                    price = rows[0][1]
-                missing_records.append((symbol, time, price))
-            else:
-                j = j+1
-        if len(missing_records) > 0:
-            for record in missing_records:
-                self.insert(*record)
-        return len(missing_records)
+        return self.fill_missing_minutes(symbol, start_time, end_time, TradeTime.get_trade_minutes(validate_date, validate_date))
 
     def add_missing_data_in_real_time(self, symbol='SVXY', ):
         us_dt = datetime.datetime.now(tz=pytz.timezone('US/Eastern'))
@@ -93,31 +96,9 @@ class EquityRealTimeDAO(BaseDAO):
                     default_end_time = datetime.datetime(now.year, now.month, now.day, 16, 0, 0)
                 end_time = min(now, default_end_time)
                 if end_time > start_time:
-                    minutes_count = range((end_time - start_time).seconds/60 + 1)
-                    trade_minutes = map(lambda x: start_time + datetime.timedelta(minutes=x), minutes_count)
-                    # print trade_minutes
-                    rows = self.get_min_time_and_price(symbol, start_time, end_time)
-                    # print rows
-                    j = 0
-                    missing_records = []
-                    # self.logger.info('rows = %s, \n trade_minutes = %s' %(rows[-2:], trade_minutes[-2:]))
-                    for i, time in enumerate(trade_minutes):
-                        if j >= len(rows):
-                            break # rows length may less than trade_minutes for 1 elements.
-                        if rows[j][0].minute > time.minute or rows[j][0].hour > time.hour:
-                            if j > 0:
-                                # price = rows[j-1][1]
-                                price = self.get_nearest_price(time, symbol)
-                            else:
-                                price = rows[0][1]
-                            # self.logger.info('missing record: j = %s, time=%s'%(j, time))
-                            missing_records.append((symbol, time, price))
-                        else:
-                            j = j + 1
-                    if len(missing_records) > 0:
-                        for record in missing_records:
-                            self.insert(*record)
-                    return len(missing_records)
+                    grid = np.arange(np.datetime64(start_time, 'm'), np.datetime64(end_time, 'm') + 1)
+                    # the tick of the current minute may be not arrived yet.
+                    return self.fill_missing_minutes(symbol, start_time, end_time, grid, until_last_tick=True)
 
     def validate_integrity_for_real_time_data(self, symbol='SVXY', ):
         us_dt = datetime.datetime.now(tz=pytz.timezone('US/Eastern'))
@@ -1,4 +1,3 @@
-import pandas as pd
 from utils.logger import LoggerFactory
 from common.pathmgr import PathMgr
 from dataaccess.basedao import BaseDAO
@@ -15,24 +14,20 @@ class NYSECreditDAO(BaseDAO):
         query_template = """insert into nyse_credit (lastDate,the_year,the_month,margin_debt,cash_accounts,credit_balance) values
                          (str_to_date('{}', '%Y-%m-%d'),{},{},{},{},{})
                          on duplicate key update margin_debt = {}, cash_accounts = {}, credit_balance = {}"""
-        conn = BaseDAO.get_connection()
-        cursor = conn.cursor()
+        with BaseDAO.get_connection() as conn:
+            cursor = conn.cursor()
 
-        for credit in credits:
-            query = BaseDAO.mysql_format(query_template, credit.date_str, credit.year, credit.month, credit.margin_debt, credit.cash_accounts, credit.credit_balance, credit.margin_debt, credit.cash_accounts, credit.credit_balance)
-            # print query
-            self.execute_query(query, cursor)
-        conn.commit()
-        conn.close()
+            for credit in credits:
+                query = BaseDAO.mysql_format(query_template, credit.date_str, credit.year, credit.month, credit.margin_debt, credit.cash_accounts, credit.credit_balance, credit.margin_debt, credit.cash_accounts, credit.credit_balance)
+                # print query
+                self.execute_query(query, cursor)
+            conn.commit()
 
     def get_all_margin_debt(self, start_date_str='1993-01-01'):
-        query_template = """select {} from nyse_credit where lastDate >= str_to_date('{}', '%Y-%m-%d') order by lastDate"""
+        query_template = """select {} from nyse_credit where lastDate >= str_to_date(%s, '%Y-%m-%d') order by lastDate"""
         columns = ['lastDate', 'margin_debt']
-        query = BaseDAO.mysql_format(query_template, ', '.join(columns), start_date_str)
-        rows = self.select(query)
-        df = pd.DataFrame(rows)
-        df.columns = columns
-        return df
+        query = query_template.format(', '.join(columns))
+        return self.select_frame(query, (start_date_str,), columns)
 
 
 if __name__ == '__main__':
@@ -10,20 +10,20 @@ class OptionDAO(BaseDAO):
     def __init__(self):
         BaseDAO.__init__(self)
 
+    columns = ['underlingSymbol', 'tradeTime', 'symbol', 'expirationDate', 'the_date', 'daysToExpiration', 'optionType', 'strikePrice',
+               'askPrice', 'bidDate', 'bidPrice', 'openPrice', 'highPrice', 'lowPrice', 'lastPrice', 'priceChange', 'volatility',
+               'theoretical', 'delta', 'gamma', 'rho', 'theta', 'vega', 'openInterest', 'volume']
+    fields = columns[:4] + ['date'] + columns[5:]
+
     def insert(self, records):
-        query_template = """insert into option_data (underlingSymbol, tradeTime, symbol, expirationDate,the_date,daysToExpiration,optionType,strikePrice,askPrice,bidDate,bidPrice,openPrice,highPrice,lowPrice,lastPrice,priceChange,volatility,theoretical,delta,gamma,rho,theta,vega,openInterest,volume) values ('{}','{}','{}','{}','{}',{},'{}',{},{},'{}',{},{},{},{},{},{},{},{},{},{},{},{},{},{},{})"""
-        conn = BaseDAO.get_connection()
-        cursor = conn.cursor()
-        count = 0
-        for option in records:
-            query = BaseDAO.mysql_format(query_template, option.underlingSymbol, option.tradeTime, option.symbol,option.expirationDate,option.date,option.daysToExpiration,option.optionType,option.strikePrice,option.askPrice,option.bidDate,option.bidPrice,option.openPrice,option.highPrice,option.lowPrice,option.lastPrice,option.priceChange,option.volatility,option.theoretical,option.delta,option.gamma,option.rho,option.theta,option.vega,option.openInterest,option.volume)
-            self.execute_query(query, cursor)
-            count += 1
-            if count == 1000:
-                conn.commit()
-                count = 0
-        conn.commit()
-        conn.close()
+        return self.bulk_write('option_data', OptionDAO.columns, records, OptionDAO.fields)
+
+    def load(self, records):
+        """
+        fast path for the nightly option chains, load data local infile into a staging table then merge into option_data.
+        """
+        return self.bulk_load('option_data', OptionDAO.columns, records, OptionDAO.fields,
+                              date_columns=['tradeTime', 'expirationDate', 'the_date', 'bidDate'])
 
     def get_option_price_by_date(self, option_symbol, date_str, price_field='lastPrice', cursor=None):
         """
@@ -31,24 +31,18 @@ class OptionDAO(BaseDAO):
         :param option_symbol:
         :param date_str:
         :param price_field: lastprice(close price) in default
-        :param cursor:
+        :param cursor: not used, the pooled connection of current thread is shared.
         :return:
         """
-        query_template = """select {} from option_data where symbol = '{}' and tradeDate <= str_to_date('{}', '%Y-%m-%d') order by tradeDate desc limit 1"""
-        query = query_template.format(price_field, option_symbol, date_str)
-        rows = self.select(query, cursor)
-        if rows is None or len(rows) < 1:
-            return None
-        else:
-            return rows[0][0]
+        query = """select {} from option_data where symbol = %s and tradeDate <= %s order by tradeDate desc limit 1""".format(price_field)
+        return self.query_scalar(query, (option_symbol, date_str))
 
     def get_all_unexpired_dates(self, equity_symbol, from_date=None, cursor = None):
         from_date = from_date or TradeTime.get_latest_trade_date()
-        query_template = """select distinct(expirationDate) from  option_data 
-                                    where underlingSymbol = '{}' and expirationDate > str_to_date('{}', '%Y-%m-%d')
-                                    order by expirationDate"""
-        query = query_template.format(equity_symbol, from_date.strftime('%Y-%m-%d'))
-        rows = self.select(query, cursor)
+        query = """select distinct(expirationDate) from  option_data 
+                   where underlingSymbol = %s and expirationDate > %s
+                   order by expirationDate"""
+        rows = self.query(query, (equity_symbol, from_date))
         return map(lambda x: x[0], rows)
 
     def get_following_expirationDate(self, equity_symbol, from_date=None):
@@ -62,22 +56,17 @@ class OptionDAO(BaseDAO):
                     return d
 
     def get_strike_prices_by(self, equity_symbol, str_expirationDate):
-        query_template = """select distinct strikePrice from option_data where underlingsymbol = '{}'  and expirationDate = str_to_date('{}', '%Y-%m-%d') order by strikePrice"""
-        query = query_template.format(equity_symbol, str_expirationDate)
-        rows = self.select(query)
+        query = """select distinct strikePrice from option_data where underlingsymbol = %s  and expirationDate = %s order by strikePrice"""
+        rows = self.query(query, (equity_symbol, str_expirationDate))
         return map(lambda x: x[0], rows)
 
     def get_option_by(self, equity_symbol, str_expirationDate, strike_price, option_type):
-        query_template = """select symbol, tradetime, lastPrice, delta, gamma, vega, theta, rho from option_data where underlingsymbol = '{}' and expirationDate = str_to_date('{}', '%Y-%m-%d') and strikePrice = {} and optionType = '{}' order by tradeTime"""
-        query = query_template.format(equity_symbol, str_expirationDate, strike_price, option_type)
-        rows = self.select(query)
-        return rows
+        query = """select symbol, tradetime, lastPrice, delta, gamma, vega, theta, rho from option_data where underlingsymbol = %s and expirationDate = %s and strikePrice = %s and optionType = %s order by tradeTime"""
+        return self.query(query, (equity_symbol, str_expirationDate, strike_price, option_type))
 
     def get_option_by_symbol(self, option_symbol):
-        query_template = """select tradetime, lastPrice, delta, gamma, vega, theta, volatility from option_data where symbol = '{}' order by tradeTime"""
-        query = query_template.format(option_symbol)
-        rows = self.select(query)
-        return rows
+        query = """select tradetime, lastPrice, delta, gamma, vega, theta, volatility from option_data where symbol = %s order by tradeTime"""
+        return self.query(query, (option_symbol,))
 
     def get_china_option_by_symbol(self, option_symbol):
         underlying_symbol = option_symbol[0:6]
@@ -99,15 +88,8 @@ class OptionDAO(BaseDAO):
             return self.get_option_by_symbol(option_symbol)
 
     def get_delta_by_symbol_and_date(self, option_symbol, trade_time, cursor=None):
-        query_template = """select delta from option_data where symbol = '{}' and tradeTime = str_to_date('{}', '%Y-%m-%d') limit 1"""
-        query = query_template.format(option_symbol, trade_time)
-        rows = self.select(query, cursor)
-        #print query
-        #print rows
-        if len(rows) == 0:
-            return None
-        else:
-            return rows[0][0]
+        query = """select delta from option_data where symbol = %s and tradeTime = %s limit 1"""
+        return self.query_scalar(query, (option_symbol, trade_time))
 
     def find_symbol(self, equity_symbol, expiration_date, current_equity_price, imp_only = False, current_date=None, days_to_current_date = 30, option_type='Call', cursor = None):
         """
@@ -122,9 +104,8 @@ class OptionDAO(BaseDAO):
         :return: option symbol like SPY170915C00245000
         """
         current_date = current_date or  datetime.date.today()
-        query_template = """select distinct(strikeprice) as strikeprice, min(tradeTime) from  option_data where underlingSymbol = '{}'  and  expirationDate = str_to_date('{}', '%Y-%m-%d') and optionType = '{}' group by strikeprice order by min(tradeTime)"""
-        query = query_template.format(equity_symbol, expiration_date.strftime('%Y-%m-%d'), option_type)
-        rows = self.select(query, cursor)
+        query = """select distinct(strikeprice) as strikeprice, min(tradeTime) from  option_data where underlingSymbol = %s  and  expirationDate = %s and optionType = %s group by strikeprice order by min(tradeTime)"""
+        rows = self.query(query, (equity_symbol, expiration_date, option_type))
         # print query
         # print rows
         start_date = max(current_date - datetime.timedelta(days=days_to_current_date), rows[0][1])
@@ -151,10 +132,8 @@ class OptionDAO(BaseDAO):
             return '%s%s%s%08d' % (equity_symbol, expiration_date.strftime('%y%m%d'), option_type[0], strike_price * 1000)
 
     def get_implied_volatilities(self, option_symbol):
-        query_template = """select tradeTime, volatility from option_data where symbol = '{}'"""
-        query = query_template.format(option_symbol)
-        rows = self.select(query)
-        return rows
+        query = """select tradeTime, volatility from option_data where symbol = %s"""
+        return self.query(query, (option_symbol,))
 
     def get_china_implied_volatilities(self, option_symbol):
         underlying_symbol = option_symbol[0:6]
@@ -178,10 +157,8 @@ class OptionDAO(BaseDAO):
 
 
     def get_delta(self, option_symbol):
-        query_template = """select tradeTime, delta from option_data where symbol = '{}'"""
-        query = query_template.format(option_symbol)
-        rows = self.select(query)
-        return rows
+        query = """select tradeTime, delta from option_data where symbol = %s"""
+        return self.query(query, (option_symbol,))
 
     def get_corresponding_implied_volatilities(self, equity_symbol, current_equity_price):
         exp_date = self.get_following_expirationDate(equity_symbol) #get recent exp_date for this symbol
@@ -195,9 +172,31 @@ class OptionDAO(BaseDAO):
         rows = self.get_delta(option_symbol)
         return rows
 
-    def get_vix_options(self):
-        query = """select symbol, tradeTime, daysToExpiration, strikePrice, optiontype from option_data where underlingSymbol = '^VIX'"""
-        return self.select(query)
+    def get_option_chain_arrays(self, equity_symbol, trade_date=None):
+        """
+        :param trade_date: default as the last trade date of the options of the equity_symbol
+        :return: dict of the numpy arrays of the chain on the trade_date, as select_arrays.
+        """
+        if trade_date is None:
+            trade_date = self.query_scalar("""select max(tradeTime) from option_data where underlingSymbol = %s""", (equity_symbol,))
+        query = """select symbol, expirationDate, daysToExpiration, optionType, strikePrice, bidPrice, askPrice, lastPrice, volatility
+                   from option_data where underlingSymbol = %s and tradeTime = %s order by expirationDate, strikePrice"""
+        return self.select_arrays(query, (equity_symbol, trade_date))
+
+    def get_vix_options(self, chunk_size=1000):
+        """
+        :return: iterator of (symbol, tradeTime, daysToExpiration, strikePrice, optiontype, expirationDate), streamed by chunk_size rows.
+        """
+        query = """select symbol, tradeTime, daysToExpiration, strikePrice, optiontype, expirationDate from option_data where underlingSymbol = '^VIX'"""
+        return self.select_iter(query, chunk_size=chunk_size)
+
+    def save_vix_option_deltas(self, records):
+        """
+        :param records: (symbol, tradeTime, expirationDate, optiontype, delta) of the existing vix options,
+                        only the delta is updated on the key (symbol, tradeTime).
+        """
+        columns = ['underlingSymbol', 'symbol', 'tradeTime', 'expirationDate', 'optionType', 'delta']
+        return self.bulk_write('option_data', columns, map(lambda x: ('^VIX',) + tuple(x), records), update_columns=['delta'])
 
     def update_delta_for_vix_options(self, symbol, tradeTime, delta, cursor):
         query_template = """update option_data set delta = {} where underlingSymbol = '^VIX' and symbol = '{}' and tradeTime = '{}'"""
@@ -1,4 +1,3 @@
-import pandas as pd
 from dataaccess.basedao import BaseDAO
 from common.symbols import Symbols
 
@@ -12,28 +11,19 @@ class OptionSkewDAO(BaseDAO):
         columns = ['symbol', 'tradeTime', 'price', 'skew']
         query_template = """select {} from option_enough_liquidity_skew_view"""
         query = query_template.format(', '.join(columns))
-        rows = self.select(query)
-        df = pd.DataFrame(rows)
-        df.columns = columns
-        return df
+        return self.select_frame(query, columns=columns)
 
     def get_all_skew_weekly(self):
         columns = ['symbol', 'skew', 'balance_date']
         query_template = """select {} from option_skew_weekly_view"""
         query = query_template.format(', '.join(columns))
-        rows = self.select(query)
-        df = pd.DataFrame(rows)
-        df.columns = columns
-        return df
+        return self.select_frame(query, columns=columns)
 
     def select_by_symbol(self, symbol):
         columns = ['symbol', 'tradeTime', 'price', 'skew']
-        query_template = """select {} from option_enough_liquidity_skew_view where symbol = '{}'"""
-        query = query_template.format(', '.join(columns), symbol)
-        rows = self.select(query)
-        df = pd.DataFrame(rows)
-        df.columns = columns
-        return df
+        query_template = """select {} from option_enough_liquidity_skew_view where symbol = %s"""
+        query = query_template.format(', '.join(columns))
+        return self.select_frame(query, (symbol,), columns)
 
     def get_sorted_weekly_skew(self):
         df = self.get_all_skew_weekly()
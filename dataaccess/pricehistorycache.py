@@ -0,0 +1,149 @@
+import datetime
+import threading
+import numpy as np
+from dataaccess.equitydao import EquityDAO
+from dataaccess.yahooequitydao import YahooEquityDAO
+
+
+class PriceHistory(object):
+    """
+    the daily price series of one (symbol, field), kept as sorted numpy arrays of dates and values.
+    """
+
+    def __init__(self):
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        self.values = np.empty(0, dtype='float64')
+        self.refresh_time = None
+        # held while the series is loaded, the other symbols do not wait for it.
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.dates)
+
+    @staticmethod
+    def to_date64(the_date):
+        if isinstance(the_date, datetime.datetime):
+            the_date = the_date.date()
+        return np.datetime64(the_date, 'D')
+
+    def get_high_water_mark(self):
+        """
+        :return: the last date of the series, None if the series is empty.
+        """
+        if len(self.dates) == 0:
+            return None
+        return self.dates[-1].tolist()
+
+    def append(self, records):
+        """
+        append the (date, value) records sorted by date, the records on or before the high water mark
+        replace the stored values, since the last bar may be revised intraday.
+        :return: the count of appended records.
+        """
+        if not records:
+            return 0
+        dates = np.array(map(lambda x: PriceHistory.to_date64(x[0]), records), dtype='datetime64[D]')
+        values = np.array(map(lambda x: np.nan if x[1] is None else float(x[1]), records), dtype='float64')
+        if len(self.dates) > 0:
+            old = dates <= self.dates[-1]
+            indexes = np.searchsorted(self.dates, dates[old])
+            found = indexes < len(self.dates)
+            found[found] = self.dates[indexes[found]] == dates[old][found]
+            self.values[indexes[found]] = values[old][found]
+            dates = dates[~old]
+            values = values[~old]
+        self.dates = np.concatenate([self.dates, dates])
+        self.values = np.concatenate([self.values, values])
+        return len(dates)
+
+    def as_of(self, the_date, max_lag_days=None):
+        """
+        :param the_date: date or datetime
+        :param max_lag_days: None means no limit, otherwise return None if the nearest earlier bar is older than it.
+        :return: the value of the latest bar on or before the_date, None if not found.
+        """
+        date64 = PriceHistory.to_date64(the_date)
+        index = np.searchsorted(self.dates, date64, side='right') - 1
+        if index < 0:
+            return None
+        if max_lag_days is not None and (date64 - self.dates[index]).astype(int) > max_lag_days:
+            return None
+        return float(self.values[index])
+
+    def get_records(self, from_date=None):
+        """
+        :return: the [date, value] records from the from_date, in the format of the dao records.
+        """
+        dates = self.dates
+        values = self.values
+        if from_date is not None:
+            start = np.searchsorted(dates, PriceHistory.to_date64(from_date))
+            dates = dates[start:]
+            values = values[start:]
+        return map(list, zip(dates.tolist(), values.tolist()))
+
+
+class PriceHistoryCache(object):
+    """
+    in process cache of PriceHistory keyed by (source, symbol, field).
+    the first access loads the full series, after refresh_minutes only the rows from the high water mark are queried.
+    """
+
+    HISTORIES = {}
+
+    # guards HISTORIES only, the loads are under the lock of each PriceHistory.
+    lock = threading.Lock()
+
+    loaders = {'yahoo_equity': (lambda symbol, field, from_date: YahooEquityDAO().get_all_equity_price_by_symbol(symbol, from_date.strftime('%Y-%m-%d'), field), datetime.date(1993, 1, 1), 'adjClosePrice'),
+               'equity': (lambda symbol, field, from_date: EquityDAO().get_all_equity_price_by_symbol(symbol, from_date, field), datetime.date(2017, 7, 24), 'lastPrice'),
+               }
+
+    def __init__(self, source='yahoo_equity', refresh_minutes=60):
+        """
+        :param source: yahoo_equity or equity
+        :param refresh_minutes: the minutes before the cached series is extended from the db again.
+        """
+        (self.loader, self.start_date, self.default_field) = PriceHistoryCache.loaders[source]
+        self.source = source
+        self.refresh_minutes = refresh_minutes
+
+    def get_history(self, symbol, field=None):
+        field = field or self.default_field
+        key = (self.source, symbol, field)
+        with PriceHistoryCache.lock:
+            history = PriceHistoryCache.HISTORIES.get(key)
+            if history is None:
+                history = PriceHistoryCache.HISTORIES[key] = PriceHistory()
+        if self.is_expired(history):
+            with history.lock:
+                # checked again, another thread may have loaded it while waiting for the lock.
+                if self.is_expired(history):
+                    from_date = history.get_high_water_mark() or self.start_date
+                    records = self.loader(symbol, field, from_date)
+                    # a failed load (None) is retried by the next call.
+                    if records is not None:
+                        history.append(records)
+                        history.refresh_time = datetime.datetime.now()
+        return history
+
+    def is_expired(self, history):
+        return history.refresh_time is None or history.refresh_time + datetime.timedelta(minutes=self.refresh_minutes) <= datetime.datetime.now()
+
+    def get_price(self, symbol, the_date, field=None, max_lag_days=None):
+        return self.get_history(symbol, field).as_of(the_date, max_lag_days)
+
+    def get_records(self, symbol, from_date=None, field=None):
+        return self.get_history(symbol, field).get_records(from_date)
+
+    @staticmethod
+    def clear(source=None):
+        with PriceHistoryCache.lock:
+            for key in PriceHistoryCache.HISTORIES.keys():
+                if source is None or key[0] == source:
+                    PriceHistoryCache.HISTORIES.pop(key)
+
+
+if __name__ == '__main__':
+    cache = PriceHistoryCache()
+    print cache.get_price('SPY', datetime.date(2017, 9, 16))
+    print cache.get_records('QQQ', datetime.date(2017, 9, 1))
@@ -7,20 +7,16 @@ class ProcessDAO(BaseDAO):
         BaseDAO.__init__(self)
 
     def insert(self, process_type, start_time, processes_info):
-        sql_template = """insert into process (type, start_time, processes_info) values('{}', '{}', '{}')"""
-        sql = sql_template.format(process_type, start_time, processes_info.replace('\'', '\\\''))
-        self.execute_query(sql)
+        sql = """insert into process (type, start_time, processes_info) values(%s, %s, %s)"""
+        self.execute(sql, (process_type, start_time, processes_info))
 
     def update(self, process_type, start_time, processes_info):
-        sql_template = """update process set processes_info = '{}' where type = '{}' and start_time = '{}'"""
-        sql = sql_template.format(processes_info.replace('\'', '\\\''), process_type, start_time)
-        self.execute_query(sql)
+        sql = """update process set processes_info = %s where type = %s and start_time = %s"""
+        self.execute(sql, (processes_info, process_type, start_time))
 
     def get_latest_processes(self, process_type):
-        sql_template = """select processes_info from process where type = '{}' order by start_time desc limit 1"""
-        sql = sql_template.format(process_type)
-        rows = self.select(sql)
-        str_value = rows[0][0]
+        sql = """select processes_info from process where type = %s order by start_time desc limit 1"""
+        str_value = self.query_scalar(sql, (process_type,))
         return eval(str_value)
 
 
@@ -1,3 +1,4 @@
+import time
 import datetime
 from utils.logger import Logger
 from common.pathmgr import PathMgr
@@ -9,18 +10,31 @@ from dataaccess.vixdao import VIXDAO
 
 class RawToDB(object):
 
-    def __init__(self, daily_raw_path = None):
+    ROW_LOADER = 'row'
+    INFILE_LOADER = 'infile'
+
+    def __init__(self, daily_raw_path = None, loader = ROW_LOADER):
+        """
+        :param daily_raw_path:
+        :param loader: 'row' writes the options with multi-row inserts, 'infile' loads them by load data local infile.
+        """
         if daily_raw_path is None:
             daily_raw_path = PathMgr.get_raw_data_path(str(datetime.date.today()))
         self.logger = Logger(__name__, PathMgr.get_log_path())
+        self.loader = loader
         self.parser = RawDataParser(daily_raw_path)
         self.parser.load_all()
 
     def push_to_db(self):
         self.logger.info('Push equity data to db...')
         EquityDAO().insert(self.parser.equity_records)
-        self.logger.info('Push option data to db...')
-        OptionDAO().insert(self.parser.option_records)
+        self.logger.info('Push option data to db by %s loader...' % self.loader)
+        start = time.time()
+        if self.loader == RawToDB.INFILE_LOADER:
+            result = OptionDAO().load(self.parser.option_records)
+        else:
+            result = OptionDAO().insert(self.parser.option_records)
+        self.logger.info('Pushed %s option records in %.2f seconds: %s' % (len(self.parser.option_records), time.time() - start, result))
         self.logger.info('Push vix data to db...')
         VIXDAO().insert(self.parser.vix_records)
 
@@ -1,3 +1,4 @@
+import itertools
 import math
 import datetime
 import pandas as pd
@@ -13,19 +14,10 @@ class VIXDAO(BaseDAO):
         BaseDAO.__init__(self)
 
     def insert(self, records):
-        query_template = """insert into vix (symbol,lastPrice,priceChange,openPrice,highPrice,lowPrice,previousPrice,volume,tradeTime,dailyLastPrice,dailyPriceChange,dailyOpenPrice,dailyHighPrice,dailyLowPrice,dailyPreviousPrice,dailyVolume,dailyDate1dAgo) values ('{}',{},{},{},{},{},{},{},'{}',{},{},{},{},{},{},{},'{}')"""
-        conn = BaseDAO.get_connection()
-        cursor = conn.cursor()
-        count = 0
-        for vix in records:
-            query = BaseDAO.mysql_format(query_template, vix.symbol, vix.lastPrice, vix.priceChange, vix.openPrice, vix.highPrice, vix.lowPrice, vix.previousPrice, vix.volume, vix.tradeTime, vix.dailyLastPrice, vix.dailyPriceChange, vix.dailyOpenPrice, vix.dailyHighPrice, vix.dailyLowPrice, vix.dailyPreviousPrice, vix.dailyVolume, vix.dailyDate1dAgo)
-            self.execute_query(query, cursor)
-            count += 1
-            if count == 1000:
-                conn.commit()
-                count = 0
-        conn.commit()
-        conn.close()
+        columns = ['symbol', 'lastPrice', 'priceChange', 'openPrice', 'highPrice', 'lowPrice', 'previousPrice', 'volume', 'tradeTime',
+                   'dailyLastPrice', 'dailyPriceChange', 'dailyOpenPrice', 'dailyHighPrice', 'dailyLowPrice', 'dailyPreviousPrice',
+                   'dailyVolume', 'dailyDate1dAgo']
+        return self.bulk_write('vix', columns, records)
 
     def get_all_vix_date(self):
         query = """select distinct dailyDate1dAgo from vix order by dailyDate1dAgo"""
@@ -70,8 +62,7 @@ class VIXDAO(BaseDAO):
         query_template = """select {} from vix order by dailyDate1dAgo,symbol"""
         select_columns = ', '.join(columns)
         query = query_template.format(select_columns)
-        rows = self.select(query)
-        return rows
+        return self.select_iter(query)
 
     # not used...
     def get_grouped_all_vix(self):
@@ -95,7 +86,7 @@ class VIXDAO(BaseDAO):
         query = BaseDAO.mysql_format(query_template, symbol)
         rows = self.select(query)
         if remove_invalid_date:
-            rows = filter(lambda x: TradeTime.is_trade_day(x[0]), rows)
+            rows = list(itertools.compress(rows, TradeTime.is_trade_days(map(lambda x: x[0], rows))))
         return rows
 
     def get_vix_price_by_symbol_and_date(self, symbol, from_date=datetime.datetime(1993,1,1), to_date = None, remove_invalid_date = True):
@@ -104,7 +95,7 @@ class VIXDAO(BaseDAO):
         query = BaseDAO.mysql_format(query_template, symbol, from_date.strftime('%Y-%m-%d'), to_date.strftime('%Y-%m-%d') )
         rows = self.select(query)
         if remove_invalid_date:
-            rows = filter(lambda x: TradeTime.is_trade_day(x[0]), rows)
+            rows = list(itertools.compress(rows, TradeTime.is_trade_days(map(lambda x: x[0], rows))))
         return rows
 
     def get_following_vix(self, from_date = None, to_date = None):
@@ -0,0 +1,30 @@
+from dataaccess.basedao import BaseDAO
+
+
+class WatermarkDAO(BaseDAO):
+    """
+    the last minute of equity_min aggregated into the bars of each interval and symbol.
+    """
+
+    def __init__(self):
+        BaseDAO.__init__(self)
+
+    def get_watermarks(self, interval, symbols):
+        """
+        :param interval: minutes of the bars, or BarResampler.DAILY
+        :return: dict of symbol -> watermark datetime, the symbols never aggregated are absent.
+        """
+        query = """select symbol, watermark from aggregation_watermark where barInterval = %s and symbol in ({})"""
+        rows = self.query(query.format(','.join(['%s'] * len(symbols))), [str(interval)] + list(symbols))
+        return dict(rows or [])
+
+    def save_watermarks(self, interval, symbol_watermarks):
+        """
+        :param symbol_watermarks: dict of symbol -> watermark datetime
+        """
+        records = map(lambda x: (str(interval), x[0], x[1]), symbol_watermarks.items())
+        return self.bulk_write('aggregation_watermark', ['barInterval', 'symbol', 'watermark'], records, update_columns=['watermark'])
+
+
+if __name__ == '__main__':
+    print WatermarkDAO().get_watermarks(30, ['SPY', 'QQQ'])
@@ -2,38 +2,74 @@ import numpy as np
 import pandas as pd
 import datetime
 from dataaccess.basedao import BaseDAO
-from utils.maths import get_sharp_ratio
+from dataaccess.yahooequitystore import YahooEquityStore
+from dataaccess.yahooequityliquiditydao import YahooEquityLiquidityDAO
 from common.symbols import Symbols
 from common.pathmgr import PathMgr
 from common.tradetime import TradeTime
-from common.optioncalculater import OptionCalculater
+from common.equitypanel import EquityPanel
 
 
 class YahooEquityDAO(BaseDAO):
 
-    def __init__(self):
+    def __init__(self, use_store=False):
+        """
+        :param use_store: read the daily history from the local YahooEquityStore when the symbol is stored.
+        """
         BaseDAO.__init__(self)
+        self.use_store = use_store
+        self.store = YahooEquityStore()
+
+    def get_store_bars(self, symbol, price_field):
+        """
+        :return: (bars, fields) from the local store, None if the store is not used or can not serve the fields.
+        """
+        if not self.use_store:
+            return None
+        fields = map(YahooEquityStore.get_field, price_field.split(','))
+        if None in fields:
+            return None
+        bars = self.store.load(symbol)
+        if bars is None:
+            return None
+        return bars, fields
 
     def get_equity_price_by_date(self, symbol, date_str, price_field = 'closePrice', cursor=None):
         """
         :param symbol:
         :param date_str: the format is 'YYYY-mm-dd'
         :param price_field:
+        :param cursor: not used, the pooled connection of current thread is shared.
         :return: price
         """
-        query_template = """select {} from yahoo_equity where symbol = '{}' and tradeDate <= str_to_date('{}', '%Y-%m-%d') order by tradeDate desc limit 1"""
-        query = query_template.format(price_field, symbol, date_str)
-        rows = self.select(query, cursor)
-        if rows is None or len(rows) < 1:
-            return None
-        else:
-            return rows[0][0]
+        store_bars = self.get_store_bars(symbol, price_field)
+        if store_bars is not None:
+            (bars, fields) = store_bars
+            index = np.searchsorted(bars['tradeDate'], np.datetime64(date_str, 'D'), side='right') - 1
+            return None if index < 0 else bars[fields[0]][index]
+        query = """select {} from yahoo_equity where symbol = %s and tradeDate <= %s order by tradeDate desc limit 1""".format(price_field)
+        return self.query_scalar(query, (symbol, date_str))
 
     def get_all_equity_price_by_symbol(self, symbol, from_date_str='1993-01-01', price_field = 'adjClosePrice'):
-        query_template = """select tradeDate, {} from yahoo_equity where symbol = '{}' and tradeDate >= str_to_date('{}', '%Y-%m-%d') order by tradeDate"""
-        query = query_template.format(price_field, symbol, from_date_str)
-        rows = self.select(query)
-        return rows
+        store_bars = self.get_store_bars(symbol, price_field)
+        if store_bars is not None:
+            (bars, fields) = store_bars
+            bars = bars[bars['tradeDate'] >= np.datetime64(from_date_str, 'D')]
+            return zip(bars['tradeDate'].tolist(), *map(lambda x: bars[x].tolist(), fields))
+        query = """select tradeDate, {} from yahoo_equity where symbol = %s and tradeDate >= %s order by tradeDate""".format(price_field)
+        return self.query(query, (symbol, from_date_str))
+
+    def get_equity_price_frame(self, symbol, from_date_str='1993-01-01', price_field = 'adjClosePrice'):
+        """
+        the same records as get_all_equity_price_by_symbol, as a DataFrame of typed columns date (datetime64) and price (float64).
+        """
+        store_bars = self.get_store_bars(symbol, price_field)
+        if store_bars is not None:
+            (bars, fields) = store_bars
+            bars = bars[bars['tradeDate'] >= np.datetime64(from_date_str, 'D')]
+            return pd.DataFrame({'date': bars['tradeDate'], 'price': bars[fields[0]]}, columns=['date', 'price'])
+        query = """select tradeDate, {} from yahoo_equity where symbol = %s and tradeDate >= %s order by tradeDate""".format(price_field)
+        return self.select_frame(query, (symbol, from_date_str), ['date', 'price'])
 
     def get_equity_monthly_by_symbol(self, symbol, columns):
         """
@@ -41,31 +77,48 @@ class YahooEquityDAO(BaseDAO):
         :return: rows
         """
         columns_sql = ', '.join(columns)
-        query_template = """select {} from yahoo_equity_monthly_view where symbol = '{}'"""
-        query = query_template.format(columns_sql, symbol)
-        rows = self.select(query)
-        df = pd.DataFrame(rows)
-        df.columns = columns
-        return df
+        query = """select {} from yahoo_equity_monthly where symbol = %s order by lastDate""".format(columns_sql)
+        return self.select_frame(query, (symbol,), columns)
 
     def get_latest_price(self, symbol):
-        query_template = """select closePrice from yahoo_equity where symbol = '{}' order by tradeDate desc limit 1"""
-        query = query_template.format(symbol)
-        rows = self.select(query)
-        return rows[0][0]
+        query = """select closePrice from yahoo_equity where symbol = %s order by tradeDate desc limit 1"""
+        return self.query_scalar(query, (symbol,))
+
+    columns = ['symbol', 'tradeDate', 'openPrice', 'highPrice', 'lowPrice', 'closePrice', 'adjClosePrice', 'volume']
+    csv_fields = ['symbol', 'Date', 'Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+    @staticmethod
+    def get_trade_day_rows(symbol, df):
+        trade_day_p = df['Date'].map(lambda x: TradeTime.is_trade_day(datetime.datetime.strptime(x, '%Y-%m-%d')))
+        df = df[trade_day_p].copy()
+        df['symbol'] = symbol
+        return df
+
+    @staticmethod
+    def get_first_written_date(df, last_date, counts):
+        """
+        :param df: the written csv rows of one symbol
+        :param last_date: the last tradeDate of the symbol before the write, None if the symbol is new
+        :param counts: the counts of bulk_write
+        :return: the first date the period bars are rebuilt from, None if nothing changed.
+        the rows after last_date are always inserted, one affected row each. any other affected row is an updated row
+        (the adjusted history has changed) or a row inserted into a gap of the history, all the rows are rebuilt then.
+        """
+        if len(df) == 0 or counts['affected'] == 0:
+            return None
+        if last_date is None:
+            return df['Date'].min()
+        new_dates = df['Date'][df['Date'] > last_date.strftime('%Y-%m-%d')]
+        return new_dates.min() if len(new_dates) == counts['affected'] else df['Date'].min()
 
     def insert(self, symbol, df):
-        query_template = """insert into yahoo_equity (symbol,tradeDate,openPrice,highPrice,lowPrice,closePrice,adjClosePrice,volume) values ('{}','{}',{},{},{},{},{},{})"""
-        conn = BaseDAO.get_connection()
-        cursor = conn.cursor()
-
-        for index, row in df.iterrows():
-            if TradeTime.is_trade_day(datetime.datetime.strptime(row['Date'], '%Y-%m-%d')):
-                query = BaseDAO.mysql_format(query_template, symbol, row['Date'], row['Open'], row['High'],
-                                            row['Low'], row['Close'], row['Adj Close'], row['Volume'])
-                self.execute_query(query, cursor)
-        conn.commit()
-        conn.close()
+        df = YahooEquityDAO.get_trade_day_rows(symbol, df)
+        last_date = self.get_end_date_by_symbol(symbol)
+        counts = self.bulk_write('yahoo_equity', YahooEquityDAO.columns, df, YahooEquityDAO.csv_fields)
+        first_date = YahooEquityDAO.get_first_written_date(df, last_date, counts)
+        if first_date is not None:
+            self.update_period_bars({symbol: first_date})
+        return counts
 
     def insert_all(self):
         for symbol in Symbols.get_all_symbols():
@@ -75,33 +128,91 @@ class YahooEquityDAO(BaseDAO):
             self.insert(symbol, df)
 
     def save(self, symbol, df):
-        query_template = """insert into yahoo_equity (symbol,tradeDate,openPrice,highPrice,lowPrice,closePrice,adjClosePrice,volume) values 
-                           ('{}','{}',{},{},{},{},{},{}) on duplicate key update adjClosePrice = {}"""
-        conn = BaseDAO.get_connection()
-        cursor = conn.cursor()
-
-        for index, row in df.iterrows():
-            if TradeTime.is_trade_day(datetime.datetime.strptime(row['Date'], '%Y-%m-%d')):
-                query = BaseDAO.mysql_format(query_template, symbol, row['Date'], row['Open'], row['High'], row['Low'], row['Close'], row['Adj Close'], row['Volume'], row['Adj Close'])
-                #print query
-                self.execute_query(query, cursor)
-        conn.commit()
-        conn.close()
+        df = YahooEquityDAO.get_trade_day_rows(symbol, df)
+        last_date = self.get_end_date_by_symbol(symbol)
+        counts = self.bulk_write('yahoo_equity', YahooEquityDAO.columns, df, YahooEquityDAO.csv_fields, update_columns=['adjClosePrice'])
+        first_date = YahooEquityDAO.get_first_written_date(df, last_date, counts)
+        if first_date is not None:
+            self.update_period_bars({symbol: first_date})
+        return counts
 
     def save_from_equities(self, equities):
-        query_template = """insert into yahoo_equity (symbol,tradeDate,openPrice,highPrice,lowPrice,closePrice,adjClosePrice,volume) values 
-                                   ('{}','{}',{},{},{},{},{},{}) on duplicate key update 
-                                   openPrice={},highPrice={},lowPrice={},closePrice={},adjClosePrice={},volume={}"""
-        conn = BaseDAO.get_connection()
-        cursor = conn.cursor()
-
+        fields = ['symbol', 'tradeTime', 'openPrice', 'highPrice', 'lowPrice', 'lastPrice', 'lastPrice', 'volume']
+        counts = self.bulk_write('yahoo_equity', YahooEquityDAO.columns, equities, fields, update_columns=YahooEquityDAO.columns[2:])
+        symbol_dates = {}
         for equity in equities:
-            query = BaseDAO.mysql_format(query_template, equity.symbol, equity.tradeTime, equity.openPrice, equity.highPrice,
-                                         equity.lowPrice, equity.lastPrice, equity.lastPrice, equity.volume, equity.openPrice, equity.highPrice,
-                                         equity.lowPrice, equity.lastPrice, equity.lastPrice, equity.volume)
-            self.execute_query(query, cursor)
-        conn.commit()
-        conn.close()
+            symbol_dates[equity.symbol] = min(symbol_dates.get(equity.symbol, equity.tradeTime), equity.tradeTime)
+        self.update_period_bars(symbol_dates)
+        return counts
+
+    monthly_columns = ['symbol', 'tradeyear', 'trademonth', 'firstDate', 'lastDate', 'openPrice', 'highPrice', 'lowPrice', 'closePrice', 'adjClosePrice', 'volume']
+    weekly_columns = ['symbol', 'weekDate', 'firstDate', 'lastDate', 'openPrice', 'highPrice', 'lowPrice', 'closePrice', 'adjClosePrice', 'volume']
+
+    @staticmethod
+    def aggregate_period_bars(arrays, keys):
+        """
+        :param arrays: the daily columns of yahoo_equity, ordered by symbol and tradeDate
+        :param keys: the period of each daily bar, eg: datetime64[M] for month
+        :return: DataFrame with one bar per symbol and period
+        """
+        symbols = arrays['symbol']
+        boundaries = np.flatnonzero((symbols[1:] != symbols[:-1]) | (keys[1:] != keys[:-1])) + 1
+        starts = np.append(0, boundaries)
+        ends = np.append(boundaries, len(symbols)) - 1
+        volumes = arrays['volume']
+        return pd.DataFrame({'symbol': symbols[starts],
+                             'key': keys[starts],
+                             'firstDate': arrays['tradeDate'][starts],
+                             'lastDate': arrays['tradeDate'][ends],
+                             'openPrice': arrays['openPrice'][starts],
+                             'highPrice': np.fmax.reduceat(arrays['highPrice'], starts),
+                             'lowPrice': np.fmin.reduceat(arrays['lowPrice'], starts),
+                             'closePrice': arrays['closePrice'][ends],
+                             'adjClosePrice': arrays['adjClosePrice'][ends],
+                             'volume': np.add.reduceat(np.where(np.isnan(volumes), 0, volumes), starts)})
+
+    def update_period_bars(self, symbol_dates):
+        """
+        rebuild the rows of yahoo_equity_monthly and yahoo_equity_weekly for the months and weeks touched by the written daily bars.
+        :param symbol_dates: dict of symbol -> the first written trade date (date or 'YYYY-mm-dd')
+        """
+        if len(symbol_dates) == 0:
+            return
+        symbols = sorted(symbol_dates.keys())
+        first_dates = np.array(map(lambda x: np.datetime64(symbol_dates[x], 'D'), symbols))
+        month_starts = first_dates.astype('datetime64[M]').astype('datetime64[D]')
+        # 1970-01-01 is a thursday, the weeks start from monday.
+        week_starts = first_dates - (first_dates.astype(int) + 3) % 7
+        query = """select symbol, tradeDate, openPrice, highPrice, lowPrice, closePrice, adjClosePrice, volume from yahoo_equity
+                   where symbol in ({}) and tradeDate >= %s order by symbol, tradeDate"""
+        arrays = self.select_arrays(query.format(','.join(['%s'] * len(symbols))), symbols + [min(month_starts.min(), week_starts.min()).tolist()])
+        if len(arrays['symbol']) == 0:
+            return
+        indexes = np.searchsorted(np.array(symbols, dtype=object), arrays['symbol'])
+        dates = arrays['tradeDate']
+
+        kept = dates >= month_starts[indexes]
+        monthly_arrays = dict(map(lambda x: (x[0], x[1][kept]), arrays.items()))
+        df = YahooEquityDAO.aggregate_period_bars(monthly_arrays, monthly_arrays['tradeDate'].astype('datetime64[M]'))
+        months = df['key'].values.astype('datetime64[M]').astype(int)
+        df['tradeyear'] = months // 12 + 1970
+        df['trademonth'] = months % 12 + 1
+        self.bulk_write('yahoo_equity_monthly', YahooEquityDAO.monthly_columns, df, update_columns=YahooEquityDAO.monthly_columns[3:])
+
+        kept = dates >= week_starts[indexes]
+        weekly_arrays = dict(map(lambda x: (x[0], x[1][kept]), arrays.items()))
+        weekly_dates = weekly_arrays['tradeDate']
+        df = YahooEquityDAO.aggregate_period_bars(weekly_arrays, weekly_dates - (weekly_dates.astype(int) + 3) % 7)
+        df['weekDate'] = df['key']
+        self.bulk_write('yahoo_equity_weekly', YahooEquityDAO.weekly_columns, df, update_columns=YahooEquityDAO.weekly_columns[2:])
+
+    def rebuild_period_bars(self, symbols=None):
+        """
+        fill yahoo_equity_monthly and yahoo_equity_weekly from the whole history, one symbol at a time.
+        """
+        for symbol in symbols or self.get_coverage_symbols():
+            self.logger.info('rebuild monthly and weekly bars for %s...' % symbol)
+            self.update_period_bars({symbol: datetime.date(1900, 1, 1)})
 
 
     def save_all(self, symbols = Symbols.get_all_symbols()):
@@ -110,51 +221,61 @@ class YahooEquityDAO(BaseDAO):
             path = PathMgr.get_historical_etf_path(symbol)
             df = pd.read_csv(path)
             self.save(symbol, df)
+            trade_day_df = YahooEquityDAO.get_trade_day_rows(symbol, df)
+            self.store.merge(symbol, YahooEquityStore.from_csv_frame(trade_day_df), ['adjClosePrice'])
 
     def get_last_trade_day_symbols(self):
         date = TradeTime.get_latest_trade_date()
-        query = """select symbol from yahoo_equity where tradeDate = '{}'""".format(date)
-        rows = self.select(query)
+        query = """select symbol from symbol_coverage where tableName = 'yahoo_equity' and date(lastDate) = %s"""
+        rows = self.query(query, (date,))
         return map(lambda row: row[0], rows)
 
-    def get_start_date_by_symbol(self, symbol, cursor):
-        query = """select tradeDate from yahoo_equity where symbol = '{}' order by tradeDate limit 1 """.format(symbol)
-        rows = self.select(query, cursor)
-        return rows[0][0]
+    def get_start_date_by_symbol(self, symbol, cursor=None):
+        query = """select tradeDate from yahoo_equity where symbol = %s order by tradeDate limit 1 """
+        return self.query_scalar(query, (symbol,))
 
-    def get_end_date_by_symbol(self, symbol, cursor):
-        query = """select tradeDate from yahoo_equity where symbol = '{}' order by tradeDate desc limit 1 """.format(symbol)
-        rows = self.select(query, cursor)
-        return rows[0][0]
+    def get_end_date_by_symbol(self, symbol, cursor=None):
+        query = """select tradeDate from yahoo_equity where symbol = %s order by tradeDate desc limit 1 """
+        return self.query_scalar(query, (symbol,))
+
+    def get_coverage_symbols(self):
+        query = """select symbol from symbol_coverage where tableName = 'yahoo_equity' order by symbol"""
+        return map(lambda row: row[0], self.query(query))
+
+    def get_coverage(self, symbols):
+        """
+        :return: dict of symbol to (first date, last date, row count) from symbol_coverage, the symbols without records are missing.
+        """
+        if len(symbols) == 0:
+            return {}
+        query = """select symbol, date(firstDate), date(lastDate), rowCount from symbol_coverage where tableName = 'yahoo_equity' and symbol in ({})"""
+        rows = self.query(query.format(', '.join(['%s'] * len(symbols))), symbols)
+        return dict(map(lambda row: (row[0], tuple(row[1:])), rows))
 
     def get_start_end_date_by_symbols(self):
         reversed_yahoo_symbol_mapping = Symbols.get_reversed_yahoo_symbol_mapping()
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        symbols = Symbols.get_all_symbols()
+        coverage = self.get_coverage(symbols)
         records = []
-        for symbol in Symbols.get_all_symbols():
-            start_date = self.get_start_date_by_symbol(symbol, cursor)
-            end_date = self.get_end_date_by_symbol(symbol, cursor)
+        for symbol in symbols:
+            (start_date, end_date, count) = coverage.get(symbol, (None, None, 0))
             records.append([Symbols.get_mapped_symbol(symbol,reversed_yahoo_symbol_mapping), start_date, end_date])
-            records.sort()
-        conn.close()
+        records.sort()
         return records
 
     def get_missing_records_symbols(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        missing_symbols = []
         last_trade_date = TradeTime.get_latest_trade_date()
-        for symbol in Symbols.get_all_symbols():
-            end_date = self.get_end_date_by_symbol(symbol, cursor)
-            if end_date < last_trade_date:
-                missing_symbols.append(symbol)
-        conn.close()
-        return missing_symbols
+        symbols = Symbols.get_all_symbols()
+        coverage = self.get_coverage(symbols)
+        return filter(lambda x: x not in coverage or coverage[x][1] < last_trade_date, symbols)
 
     def filter_liquidity_symbols(self, current_date=None, window=30, count=50, ignore_symbols = ['BIL', 'IEF', 'XIV']):
         if current_date is None:
             current_date = TradeTime.get_latest_trade_date()
+        if window in YahooEquityLiquidityDAO.windows:
+            symbols = YahooEquityLiquidityDAO().get_liquidity_symbols(current_date, window, count, ignore_symbols)
+            if len(symbols) > 0:
+                return symbols
         from_date = TradeTime.get_from_date_by_window(window, current_date)
         ignore_symbols_sql = ','.join(map(lambda x: '\'%s\''%x, ignore_symbols))
         sql_template = """SELECT symbol, avg(adjClosePrice * volume) as liquidity FROM tradehero.yahoo_equity where tradeDate > '{}' and tradeDate <='{}'  and symbol not like '^%' and symbol not like '%.SS' and symbol not in ({}) group by symbol order by liquidity desc;"""
@@ -163,62 +284,88 @@ class YahooEquityDAO(BaseDAO):
         return map(lambda x: x[0], rows[:count])
 
     def get_monthly_diff_price_by_symbol(self, symbol, cursor = None, window = 36):
-        query_template = """select lastDate, adjClosePrice from yahoo_equity_monthly_view where symbol = '{}' order by lastDate desc limit {}"""
-        query = query_template.format(symbol, window)
-        rows = self.select(query, cursor)
+        query = """select lastDate, adjClosePrice from yahoo_equity_monthly where symbol = %s order by lastDate desc limit %s"""
+        rows = self.query(query, (symbol, window))
         a = np.array(map(lambda x: x[1], reversed(rows)))
         # ignore the last one because of the last price is current date rather than the end of month?
         # return np.diff(np.log(a))[:-1]
         return np.diff(np.log(a))
 
+    def get_equity_panel(self, symbols, from_date, end_date=datetime.date(9999, 12, 12)):
+        """
+        load adjClosePrice and volume of all the symbols in one pass into an aligned EquityPanel.
+        :param from_date: tradeDate >= from_date
+        :param end_date: tradeDate < end_date
+        """
+        if end_date is None:
+            end_date = datetime.date(9999, 12, 12)
+        if len(symbols) == 0:
+            return EquityPanel.from_columns([], [], [], [], [])
+        if self.use_store and all(map(self.store.exists, symbols)):
+            bars_list = map(self.store.load, symbols)
+            bars_list = map(lambda x: x[(x['tradeDate'] >= np.datetime64(from_date, 'D')) & (x['tradeDate'] < np.datetime64(end_date, 'D'))], bars_list)
+            symbol_column = np.concatenate(map(lambda x, y: np.repeat(np.array([x], dtype=object), len(y)), symbols, bars_list))
+            bars = np.concatenate(bars_list)
+            return EquityPanel.from_columns(symbols, symbol_column, bars['tradeDate'], bars['adjClosePrice'], bars['volume'])
+        query = """select symbol, tradeDate, adjClosePrice, volume from yahoo_equity where symbol in ({}) and tradeDate >= %s and tradeDate < %s"""
+        arrays = self.select_arrays(query.format(','.join(['%s'] * len(symbols))), list(symbols) + [from_date, end_date])
+        return EquityPanel.from_columns(symbols, arrays['symbol'], arrays['tradeDate'], arrays['adjClosePrice'], arrays['volume'])
+
+    @staticmethod
+    def get_window_range(window, end_date=None):
+        """
+        :return: (from_date, end_date) of the daily bars loaded for the last window trade dates before the end_date.
+        """
+        if end_date is None:
+            end_date = datetime.date(9999, 12, 12)
+        last_date = min(end_date - datetime.timedelta(days=1), datetime.date.today())
+        return TradeTime.get_from_date_by_window(window + 10, last_date), end_date
+
+    @staticmethod
+    def get_monthly_window_range(window, end_date=None):
+        """
+        :return: (from_date, end_date) of the daily bars loaded for the last window months before the end_date.
+        """
+        if end_date is None:
+            end_date = datetime.date(9999, 12, 12)
+        last_date = min(end_date, datetime.date.today())
+        return last_date - datetime.timedelta(days=31 * (window + 1)), end_date
+
+    def get_equity_panel_by_window(self, symbols, window, end_date=datetime.date(9999, 12, 12)):
+        """
+        :return: EquityPanel of the last window trade dates before the end_date.
+        """
+        (from_date, end_date) = YahooEquityDAO.get_window_range(window, end_date)
+        return self.get_equity_panel(symbols, from_date, end_date).tail(window)
+
+    def get_monthly_arrays(self, symbols, from_date, end_date):
+        """
+        :return: OrderedDict of symbol, lastDate and adjClosePrice arrays of yahoo_equity_monthly, lastDate >= from_date and < end_date.
+        """
+        query = """select symbol, lastDate, adjClosePrice from yahoo_equity_monthly where symbol in ({}) and lastDate >= %s and lastDate < %s"""
+        return self.select_arrays(query.format(','.join(['%s'] * len(symbols))), list(symbols) + [from_date, end_date])
+
+    def get_monthly_equity_panel(self, symbols, window=36, end_date=datetime.date(9999, 12, 12)):
+        """
+        :return: EquityPanel of the last window months with lastDate before the end_date, one row per month.
+        """
+        (from_date, end_date) = YahooEquityDAO.get_monthly_window_range(window, end_date)
+        if len(symbols) == 0:
+            return EquityPanel.from_columns([], [], [], [])
+        arrays = self.get_monthly_arrays(symbols, from_date, end_date)
+        return EquityPanel.from_monthly_columns(symbols, arrays['symbol'], arrays['lastDate'], arrays['adjClosePrice']).tail(window)
+
     def get_all_monthly_diff_price_by_symbols(self, symbols, window = 36, end_date = datetime.date(9999, 12, 12)):
-        query_template = """select symbol, lastDate, adjClosePrice from yahoo_equity_monthly_view where symbol in ({}) and lastDate < '{}' order by lastDate desc limit {}"""
-        symbols_sql = ','.join(map(lambda x: '\'%s\'' % x, symbols))
-        query = query_template.format(symbols_sql, end_date, window*len(symbols))
-        # print query
-        rows = self.select(query)
-        diffs = []
-        for symbol in symbols:
-            symbol_rows = filter(lambda x: x[0] == symbol, rows)
-            symbol_rows.sort(key=lambda x: x[1])
-            a = np.array(map(lambda x: x[2], symbol_rows))
-            diff = np.diff(a)
-            diffs.append(diff)
-        return diffs
+        diffs = self.get_monthly_equity_panel(symbols, window, end_date).get_price_changes()
+        return map(lambda i: diffs[:, i][~np.isnan(diffs[:, i])], range(len(symbols)))
 
     def get_symbol_volatilities(self, symbols, window=120, end_date=datetime.date(9999, 12, 12)):
-        query_template = """select symbol, tradeDate, adjClosePrice from yahoo_equity where symbol in ({}) and tradeDate < '{}' and adjClosePrice is not null order by tradeDate desc limit {}"""
-        symbols_sql = ','.join(map(lambda x: '\'%s\'' % x, symbols))
-        query = query_template.format(symbols_sql, end_date, window * len(symbols))
-        # print query
-        rows = self.select(query)
-        volatitilies = []
-        for symbol in symbols:
-            # print symbol
-            symbol_rows = filter(lambda x: x[0] == symbol, rows)
-            symbol_rows.sort(key=lambda x: x[1])
-            price_list = map(lambda x: x[2], symbol_rows)
-            # print price_list
-            volatitily = OptionCalculater.get_history_volatility2(price_list)
-            volatitilies.append([symbol, volatitily])
-        return volatitilies
+        panel = self.get_equity_panel_by_window(symbols, window, end_date)
+        return panel.to_records(panel.get_volatilities())
 
     def get_symbol_sharp_ratio(self, symbols, window=120, end_date=datetime.date(9999, 12, 12)):
-        query_template = """select symbol, tradeDate, adjClosePrice from yahoo_equity where symbol in ({}) and tradeDate < '{}' and adjClosePrice is not null order by tradeDate desc limit {}"""
-        symbols_sql = ','.join(map(lambda x: '\'%s\'' % x, symbols))
-        query = query_template.format(symbols_sql, end_date, window * len(symbols))
-        # print query
-        rows = self.select(query)
-        sharp_ratios = []
-        for symbol in symbols:
-            # print symbol
-            symbol_rows = filter(lambda x: x[0] == symbol, rows)
-            symbol_rows.sort(key=lambda x: x[1])
-            price_list = map(lambda x: x[2], symbol_rows)
-            # print price_list
-            sharp_ratio = get_sharp_ratio(price_list)
-            sharp_ratios.append([symbol, sharp_ratio])
-        return sharp_ratios
+        panel = self.get_equity_panel_by_window(symbols, window, end_date)
+        return panel.to_records(panel.get_sharp_ratios())
 
     def get_lack_of_liquity_symbols(self, window=100):
         from dateutil.relativedelta import relativedelta
@@ -256,6 +403,7 @@ if __name__ == '__main__':
     # YahooEquityDAO().save_all(['AAPL'])
     # print YahooEquityDAO().get_latest_price('SPY')
     # print YahooEquityDAO().get_equity_price_by_date('SPY', '2017-08-05')
+    # YahooEquityDAO().rebuild_period_bars()
     # print YahooEquityDAO().get_equity_monthly_by_symbol('SPY', ['symbol', 'lastdate', 'closeprice', 'adjcloseprice', 'tradeyear', 'trademonth'])
     # print YahooEquityDAO().get_all_equity_price_by_symbol('SPY', from_date_str='2017-08-01')
     # print YahooEquityDAO().get_last_trade_day_symbols()
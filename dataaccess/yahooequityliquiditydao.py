@@ -0,0 +1,46 @@
+import datetime
+from dataaccess.basedao import BaseDAO
+
+
+class YahooEquityLiquidityDAO(BaseDAO):
+    """
+    the rolling average dollar volume (adjClosePrice * volume) of the yahoo_equity symbols, one row per symbol and trade date,
+    maintained by AGGLiquidity.
+    """
+
+    windows = [30, 100, 200]
+    columns = ['symbol', 'tradeDate', 'liquidity30', 'liquidity100', 'liquidity200']
+
+    def __init__(self):
+        BaseDAO.__init__(self)
+
+    def save(self, records):
+        """
+        :param records: DataFrame or sequences in the order of columns
+        """
+        return self.bulk_write('yahoo_equity_liquidity', YahooEquityLiquidityDAO.columns, records, update_columns=YahooEquityLiquidityDAO.columns[2:])
+
+    def get_last_date(self):
+        return self.query_scalar("""select max(tradeDate) from yahoo_equity_liquidity""")
+
+    def get_liquidity_symbols(self, current_date, window=30, count=50, ignore_symbols=[]):
+        """
+        the most liquid symbols on the last trade date on or before the current_date, the index symbols (^) and
+        the shanghai symbols (.SS) are excluded as filter_liquidity_symbols does.
+        :param window: one of the windows
+        :return: symbols, empty if the table does not cover the current_date
+        """
+        if window not in YahooEquityLiquidityDAO.windows:
+            raise ValueError('window should be one of %s' % YahooEquityLiquidityDAO.windows)
+        query_template = """select symbol from yahoo_equity_liquidity
+                            where tradeDate = (select max(tradeDate) from yahoo_equity_liquidity where tradeDate <= %s)
+                            and liquidity{0} is not null and left(symbol, 1) <> '^' and right(symbol, 3) <> '.SS' {1}
+                            order by liquidity{0} desc limit %s"""
+        ignore_sql = 'and symbol not in ({})'.format(','.join(['%s'] * len(ignore_symbols))) if ignore_symbols else ''
+        query = query_template.format(window, ignore_sql)
+        rows = self.query(query, [current_date] + list(ignore_symbols) + [count])
+        return map(lambda x: x[0], rows or [])
+
+
+if __name__ == '__main__':
+    print YahooEquityLiquidityDAO().get_liquidity_symbols(datetime.date(2018, 1, 31))
@@ -0,0 +1,128 @@
+import os
+import numpy as np
+import pandas as pd
+from common.pathmgr import PathMgr
+
+
+class YahooEquityStore(object):
+    """
+    file backed copy of the yahoo_equity daily bars, one numpy structured array (.npy) per symbol,
+    sorted by tradeDate, so the research code can load the full history without a db connection.
+    """
+
+    columns = ['openPrice', 'highPrice', 'lowPrice', 'closePrice', 'adjClosePrice', 'volume']
+    dtype = np.dtype([('tradeDate', 'datetime64[D]')] + map(lambda x: (x, 'float64'), columns))
+    csv_columns = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def get_field(price_field):
+        """
+        map the yahoo_equity column name (case insensitive) to the column of the store, None if it is not stored.
+        """
+        field = price_field.strip().lower()
+        for column in YahooEquityStore.columns + ['tradeDate']:
+            if column.lower() == field:
+                return column
+        return None
+
+    def exists(self, symbol):
+        return os.path.exists(PathMgr.get_yahoo_equity_store_path(symbol))
+
+    def load(self, symbol):
+        """
+        :return: structured array of the symbol, None if the symbol is not in the store.
+        """
+        path = PathMgr.get_yahoo_equity_store_path(symbol)
+        if os.path.exists(path):
+            return np.load(path)
+        else:
+            return None
+
+    def load_many(self, symbols):
+        return dict(map(lambda x: (x, self.load(x)), symbols))
+
+    def get_last_date(self, symbol):
+        bars = self.load(symbol)
+        if bars is None or len(bars) == 0:
+            return None
+        else:
+            return bars['tradeDate'][-1].tolist()
+
+    def save(self, symbol, bars):
+        path = PathMgr.get_yahoo_equity_store_path(symbol)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, bars)
+        os.rename(tmp_path, path)
+
+    @staticmethod
+    def from_rows(rows):
+        """
+        :param rows: (tradeDate, openPrice, highPrice, lowPrice, closePrice, adjClosePrice, volume) records
+        """
+        bars = np.empty(len(rows), dtype=YahooEquityStore.dtype)
+        if len(rows) > 0:
+            values = zip(*rows)
+            bars['tradeDate'] = np.array(values[0], dtype='datetime64[D]')
+            for i, column in enumerate(YahooEquityStore.columns):
+                bars[column] = np.array(values[i + 1], dtype='float64')
+        return bars
+
+    @staticmethod
+    def from_csv_frame(df):
+        """
+        :param df: the yahoo csv DataFrame, with Date, Open, High, Low, Close, Adj Close, Volume columns.
+        """
+        bars = np.empty(len(df), dtype=YahooEquityStore.dtype)
+        bars['tradeDate'] = pd.to_datetime(df['Date']).values.astype('datetime64[D]')
+        for column, csv_column in zip(YahooEquityStore.columns, YahooEquityStore.csv_columns):
+            bars[column] = pd.to_numeric(df[csv_column], errors='coerce').values
+        return bars
+
+    def merge(self, symbol, new_bars, update_columns=None):
+        """
+        append the bars of new dates, and overwrite update_columns (all columns by default) for the existing dates,
+        which mirrors the upsert of yahoo_equity.
+        :return: count of appended bars
+        """
+        new_bars = np.sort(new_bars, order='tradeDate')
+        bars = self.load(symbol)
+        if bars is None:
+            self.save(symbol, new_bars)
+            return len(new_bars)
+        update_columns = update_columns or YahooEquityStore.columns
+        indexes = np.searchsorted(bars['tradeDate'], new_bars['tradeDate'])
+        exists_p = indexes < len(bars)
+        exists_p[exists_p] = bars['tradeDate'][indexes[exists_p]] == new_bars['tradeDate'][exists_p]
+        for column in update_columns:
+            bars[column][indexes[exists_p]] = new_bars[column][exists_p]
+        appended = new_bars[~exists_p]
+        if len(appended) > 0:
+            bars = np.sort(np.concatenate([bars, appended]), order='tradeDate')
+        self.save(symbol, bars)
+        return len(appended)
+
+    def sync_from_db(self, symbol, dao):
+        """
+        append the rows newer than the last date in the store, from yahoo_equity.
+        :param dao: YahooEquityDAO
+        :return: count of appended bars
+        """
+        last_date = self.get_last_date(symbol)
+        query = """select tradeDate, openPrice, highPrice, lowPrice, closePrice, adjClosePrice, volume from yahoo_equity where symbol = %s and tradeDate > %s order by tradeDate"""
+        rows = dao.query(query, (symbol, last_date or '1900-01-01'))
+        if rows is None or len(rows) == 0:
+            return 0
+        return self.merge(symbol, YahooEquityStore.from_rows(rows))
+
+
+if __name__ == '__main__':
+    from common.symbols import Symbols
+    from dataaccess.yahooequitydao import YahooEquityDAO
+    store = YahooEquityStore()
+    dao = YahooEquityDAO()
+    for symbol in Symbols.get_all_symbols():
+        print symbol, store.sync_from_db(symbol, dao)
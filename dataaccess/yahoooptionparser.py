@@ -1,4 +1,5 @@
 import datetime
+import itertools
 import json
 from utils.iohelper import get_sub_files, read_file_to_string
 from utils.stringhelper import string_fetch
@@ -64,29 +65,25 @@ class YahooOptionParser(object):
         OptionDAO().insert(YahooOptionParser.parse_raw_data())
 
     @staticmethod
-    def update_delta(risk_free_interest_rate=0.005):
+    def update_delta(risk_free_interest_rate=0.005, chunk_size=1000):
         date_price_records = VIXDAO().get_vix_price_by_symbol('VIY00')
         date_hv_lst = OptionCalculater.get_year_history_volatility_list(date_price_records)
         date_price_dic = list_to_hash(date_price_records)
         date_hv_dic = list_to_hash(date_hv_lst)
         option_dao = OptionDAO()
-        vix_option_records = option_dao.get_vix_options()
-        conn = BaseDAO.get_connection()
-        cursor = conn.cursor()
-        count = 0
-        for (symbol, trade_date, left_days, strike_price, option_type) in vix_option_records:
-            underlying_price = date_price_dic.get(trade_date)
-            sigma = date_hv_dic.get(trade_date)
-            if underlying_price is not None and sigma is not None:
-                delta = OptionCalculater.get_delta(underlying_price, strike_price, left_days, risk_free_interest_rate, sigma, option_type[0:1].lower())
-                option_dao.update_delta_for_vix_options(symbol, trade_date, delta, cursor)
-                count += 1
-                if count == 1000:
-                    conn.commit()
-                    count = 0
-        conn.commit()
-        conn.close()
-
+        vix_options = option_dao.get_vix_options(chunk_size)
+        # the greeks are computed and written per chunk of the stream, the table is never loaded at once.
+        while True:
+            chunk = list(itertools.islice(vix_options, chunk_size))
+            if len(chunk) == 0:
+                break
+            records = filter(lambda x: date_price_dic.get(x[1]) is not None and date_hv_dic.get(x[1]) is not None, chunk)
+            if len(records) == 0:
+                continue
+            (symbols, trade_dates, left_days, strike_prices, option_types, expiration_dates) = zip(*records)
+            deltas = OptionCalculater.get_greeks(map(date_price_dic.get, trade_dates), strike_prices, left_days, risk_free_interest_rate,
+                                                 map(date_hv_dic.get, trade_dates), map(lambda x: x[0:1].lower(), option_types))['delta']
+            option_dao.save_vix_option_deltas(zip(symbols, trade_dates, expiration_dates, option_types, deltas.tolist()))
 
 if __name__ == '__main__':
     #YahooOptionParser.save_to_db()
@@ -15,6 +15,7 @@ from dataaccess.yahooequitydao import YahooEquityDAO
 from dataaccess.nysecreditdao import NYSECreditDAO
 from dataaccess.yahoooptionparser import YahooOptionParser
 from aggregation.agg_spyvixhedge import AGGSPYVIXHedge
+from aggregation.agg_liquidity import AGGLiquidity
 from processman import ProcessMan
 from validation import Validator
 
@@ -50,6 +51,12 @@ def aggregation_for_spy_vix_hedge_table():
     logger.info('run aggregation completed.')
 
 
+def aggregation_for_liquidity_table():
+    logger.info('run liquidity aggregation...')
+    AGGLiquidity().save_to_db()
+    logger.info('run liquidity aggregation completed.')
+
+
 def data_validation():
     logger.info('run caa validation...')
     Validator.validate_caa_data()
@@ -95,6 +102,7 @@ def run():
                  process_for_yahoo_historical_data,
                  data_validation,
                  catch_up_missing_data,
+                 aggregation_for_liquidity_table,
                  backup_daily_data,
                  clean_obsoleted_data
                  ]
@@ -1,9 +1,10 @@
 import datetime
+import numpy as np
+import pandas as pd
 from utils.iohelper import read_file_to_string, write_to_file
 from utils.stringhelper import string_fetch
 from common.pathmgr import PathMgr
 from common.tradetime import TradeTime
-from entities.equity import Equity
 from dataaccess.equitymindao import EquityMinDAO
 from dataaccess.equityrealtimedao import EquityRealTimeDAO
 
@@ -19,9 +20,10 @@ class QuantopianLogParser(object):
         lines = map(lambda x: string_fetch(x, 'PRINT ', ''), filtered_lines)
         close_list_str = ','.join(lines)
         prices_list = map(float, close_list_str.split(','))
-        datetimes = TradeTime.generate_datetimes(date, date)
-        equities = map(lambda x, y: Equity(symbol, x, y, y, y, y), datetimes, prices_list)
-        EquityMinDAO().insert(equities)
+        minutes = TradeTime.get_trade_minutes(date, date, include_open=False)
+        df = pd.DataFrame({'symbol': symbol, 'tradeTime': minutes.astype('datetime64[ns]'), 'openPrice': prices_list,
+                           'highPrice': prices_list, 'lowPrice': prices_list, 'lastPrice': prices_list, 'volume': None})
+        EquityMinDAO().insert(df)
 
     def to_csv(self, symbol, date):
         file_name = '%s%s.log' % (symbol, date.strftime('%Y%m%d'))
@@ -33,8 +35,9 @@ class QuantopianLogParser(object):
         close_list_str = ','.join(lines)
         # print close_list_str
         prices_list = map(float, close_list_str.split(','))
-        datetimes = TradeTime.generate_datetimes(date, date)
-        new_lines = map(lambda x, y: '%s,%s'%(x, y), datetimes, prices_list)
+        minutes = TradeTime.get_trade_minutes(date, date, include_open=False)
+        times = np.core.defchararray.replace(minutes.astype('datetime64[s]').astype(str), 'T', ' ')
+        new_lines = map(lambda x, y: '%s,%s'%(x, y), times, prices_list)
         new_content = '\n'.join(new_lines)
         write_path = PathMgr.get_data_path('quantopian_daily_min/%s%s.csv' % (symbol, date.strftime('%Y%m%d')))
         write_to_file(write_path, new_content)
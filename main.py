@@ -16,6 +16,7 @@ from dataaccess.yahooequitydao import YahooEquityDAO
 from dataaccess.nysecreditdao import NYSECreditDAO
 from dataaccess.yahoooptionparser import YahooOptionParser
 from aggregation.agg_spyvixhedge import AGGSPYVIXHedge
+from aggregation.agg_liquidity import AGGLiquidity
 from processman import ProcessMan
 from validation import Validator
 from ingestion.cboescraper import CBOEScraper
@@ -96,6 +97,12 @@ def aggregation_for_spy_vix_hedge_table():
     logger.info('run aggregation completed.')
 
 
+def aggregation_for_liquidity_table():
+    logger.info('run liquidity aggregation...')
+    AGGLiquidity().save_to_db()
+    logger.info('run liquidity aggregation completed.')
+
+
 def data_validation():
     logger.info('run caa validation...')
     Validator.validate_caa_data()
@@ -147,6 +154,7 @@ def run():
                  process_for_ingesting_nyse_credit,
                  data_validation,
                  catch_up_missing_data,
+                 aggregation_for_liquidity_table,
                  # backup_daily_data,
                  # clean_obsoleted_data
                  ]
@@ -6,6 +6,8 @@ from common.pathmgr import PathMgr
 from ingestion.alphavantage import AlphaVantage
 from dataaccess. equitymindao import EquityMinDAO
 from common.tradetime import TradeTime
+from aggregation.agg30min import AGG30Min
+from aggregation.barresampler import BarResampler
 
 
 class MinDataCollector(object):
@@ -15,6 +17,8 @@ class MinDataCollector(object):
         self.alpha_vantage = AlphaVantage()
         self.equity_min_dao = EquityMinDAO()
         self.symbols = ['SVXY', 'SPY', 'SPX', 'VIX',  'UVXY',  'QQQ', 'QLD', 'SSO', 'TLT', 'UBT']
+        self.aggregate_seconds = 300
+        self.last_aggregate_time = None
 
     def collect_data(self):
         for symbol in self.symbols:
@@ -24,12 +28,25 @@ class MinDataCollector(object):
             self.equity_min_dao.insert(equities)
             time.sleep(1)
 
+    def aggregate_data(self):
+        """
+        roll the new minutes up into the 30 minutes and daily bars from the watermarks, at most once per aggregate_seconds.
+        """
+        now = datetime.datetime.now()
+        if self.last_aggregate_time is not None and (now - self.last_aggregate_time).total_seconds() < self.aggregate_seconds:
+            return
+        for interval in [30, BarResampler.DAILY]:
+            counts = AGG30Min.update_bars(self.symbols, interval)
+            self.logger.info('aggregate %s bars: %s' % (interval, counts))
+        self.last_aggregate_time = now
+
     def run(self):
         self.logger.info("start...")
         while True:
             if TradeTime.is_market_open() or datetime.datetime.now().minute == 0:
                 try:
                     self.collect_data()
+                    self.aggregate_data()
                 except Exception as e:
                     self.logger.error('Trace: ' + traceback.format_exc())
                     self.logger.error(str(e))
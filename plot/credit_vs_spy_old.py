@@ -85,11 +85,10 @@ def ingest_credit():
 def get_spy_price_list(date_str_list):
     price_list = []
     dao = YahooEquityDAO()
-    conn = BaseDAO.get_connection()
-    cursor = conn.cursor()
-    for date_str in date_str_list:
-        price_list.append(dao.get_equity_price_by_date('SPY', date_str, cursor = cursor))
-    conn.close
+    with BaseDAO.get_connection() as conn:
+        cursor = conn.cursor()
+        for date_str in date_str_list:
+            price_list.append(dao.get_equity_price_by_date('SPY', date_str, cursor = cursor))
     return price_list
 
 
@@ -1,6 +1,6 @@
 import datetime
 import pandas as pd
-from utils.indicator import MACD
+from utils.vectorindicator import VectorIndicator
 # from dataaccess.yahooequitydao import YahooEquityDAO
 from dataaccess.equity30mindao import Equity30MinDAO
 import matplotlib.pyplot as plt
@@ -9,10 +9,10 @@ import matplotlib.pyplot as plt
 def spy_vs_macd (start_time=datetime.datetime(2007, 1, 1, 0, 0), end_time = datetime.datetime(9999, 1, 1, 0, 0), window=26):
     spy_records = Equity30MinDAO().get_time_and_price('SPY', start_time, end_time)
     spy_prices = map(lambda x: x[1], spy_records)
-    macd_list = MACD.get_all_macd(spy_prices, s=7, l=19, m=26)
+    macd_bars = VectorIndicator.macd(spy_prices, s=7, l=19, m=26)['bar']
     dates = map(lambda x: x[0], spy_records)[window:]
     spy_values = map(lambda x: x[1], spy_records)[window:]
-    macd_bars = map(lambda x: x[-1], macd_list)[window:]
+    macd_bars = macd_bars[window:].tolist()
     macd_rates = map(lambda x, y: x*100/y, macd_bars, spy_values)
 
     fig, ax1 = plt.subplots()
@@ -1,6 +1,6 @@
 import datetime
 import pandas as pd
-from utils.indicator import MACD
+from utils.vectorindicator import VectorIndicator
 from dataaccess.yahooequitydao import YahooEquityDAO
 from dataaccess.vixdao import VIXDAO
 import matplotlib.pyplot as plt
@@ -12,8 +12,8 @@ def spy_vs_vix (from_date, ma_window_short=5, ma_window_long=21):
     dates = map(lambda x: x[0], spy_records)[ma_window_long:]
     spy_values = map(lambda x: x[1], spy_records)[ma_window_long:]
     vix_values = map(lambda x: x[1], vix_records)
-    vix_values_short = MACD.get_all_ema(vix_values, ma_window_short)[ma_window_long:]
-    vix_values_long = MACD.get_all_ema(vix_values, ma_window_long)[ma_window_long:]
+    vix_values_short = VectorIndicator.ema(vix_values, ma_window_short)[ma_window_long:].tolist()
+    vix_values_long = VectorIndicator.ema(vix_values, ma_window_long)[ma_window_long:].tolist()
     # vix_values1 = pd.Series(vix_values).rolling(window=ma_window_short).mean().tolist()[ma_window_long:]
     # vix_values_mean = pd.Series(vix_values).rolling(window=ma_window_long).mean().tolist()[ma_window_long:]
     value =25
@@ -3,6 +3,7 @@ import datetime
 import cStringIO
 import sys
 import numpy as np
+import pandas as pd
 from matplotlib.dates import AutoDateLocator, DateFormatter
 from utils.stringhelper import all_number_p
 from matplotlib.figure import Figure
@@ -25,6 +26,7 @@ from dataaccess.optionskewdao import OptionSkewDAO
 from dataaccess.processdao import ProcessDAO
 from dataaccess.equityrealtimedao import EquityRealTimeDAO
 from dataaccess.equitymindao import EquityMinDAO
+from dataaccess.pricehistorycache import PriceHistoryCache
 from research.optionbacktest import OptionBackTest
 from ingestion.yahooscraper import YahooScraper
 from ingestion.cboescraper import CBOEScraper
@@ -70,7 +72,7 @@ class Credit:
         #print credits_df
         #print spy_df
         credits_df = credits_df[credits_df.lastDate >= '2008-01-01']
-        spy_df = spy_df[spy_df.lastdate >= datetime.date(2008, 1, 1)]
+        spy_df = spy_df[spy_df.lastdate >= pd.Timestamp(2008, 1, 1)]
         dates = map(lambda x: datetime.datetime.strptime(x, '%Y-%m-%d'), credits_df['lastDate'])
         debt = credits_df['margin_debt']
         spy_prices = spy_df['adjcloseprice'][0:len(dates)]
@@ -264,7 +266,7 @@ class EquityPrices(object):
         except Exception:
             days = 63
         from_date = TradeTime.get_latest_trade_date() - datetime.timedelta(days)
-        equity_records = EquityDAO().get_all_equity_price_by_symbol(symbol, from_date)
+        equity_records = PriceHistoryCache('equity').get_records(symbol, from_date)
         if datetime.date.today() > TradeTime.get_latest_trade_date():
             new_spy_price = YahooScraper.get_data_by_symbol(symbol)
             equity_records.append([datetime.date.today(), new_spy_price])
@@ -295,10 +297,8 @@ class VIX3in1(object):
         vix_records = VIXDAO().get_vix_price_by_symbol_and_date('VIY00', from_date=from_date)
         dates = map(lambda x: x[0], vix_records)
         vix_prices = map(lambda x: x[1], vix_records)
-        vxv_records = YahooEquityDAO().get_all_equity_price_by_symbol('^VXV', from_date_str=from_date.strftime('%Y-%m-%d'))
-        vxmt_records = YahooEquityDAO().get_all_equity_price_by_symbol('^VXMT', from_date_str=from_date.strftime('%Y-%m-%d'))
-        vxv_prices = map(lambda x: x[1], vxv_records)
-        vxmt_prices = map(lambda x: x[1], vxmt_records)
+        vxv_prices = YahooEquityDAO().get_equity_price_frame('^VXV', from_date_str=from_date.strftime('%Y-%m-%d'))['price'].values
+        vxmt_prices = YahooEquityDAO().get_equity_price_frame('^VXMT', from_date_str=from_date.strftime('%Y-%m-%d'))['price'].values
         fig = Figure(figsize=[12, 8])
         ax = fig.add_axes([.1, .1, .8, .8])
         ax.plot(dates, vix_prices, label='vix')
@@ -364,7 +364,7 @@ class VolBase(object):
         #from_date_str = (datetime.date.today() - datetime.timedelta(150)).strftime('%Y-%m-%d')
         from_date = (datetime.date.today() - datetime.timedelta(150))
         #equity_records = YahooEquityDAO().get_all_equity_price_by_symbol(symbol, from_date_str)
-        equity_records = EquityDAO().get_all_equity_price_by_symbol(symbol, from_date)
+        equity_records = PriceHistoryCache('equity').get_records(symbol, from_date)
         current_quity_price = equity_records[-1][1]
         option_iv_records = OptionDAO().get_corresponding_implied_volatilities(symbol, current_quity_price)
         first_tradetime = option_iv_records[0][0]
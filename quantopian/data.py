@@ -1,4 +1,3 @@
-import pandas as pd
 import datetime
 from common.tradetime import TradeTime
 from dataaccess.yahooequitydao import YahooEquityDAO
@@ -15,10 +14,8 @@ class MyData(object):
             raise Exception('the field should be in %s...'%fields)
         price_field = MyData.fields_dic[field]
         from_date = TradeTime.get_latest_trade_date() - datetime.timedelta(window * 2)
-        rows = YahooEquityDAO().get_all_equity_price_by_symbol(symbol, from_date.strftime('%Y-%m-%d'), price_field)
-        df = pd.DataFrame(rows[-window:])
-        df.columns = ['date', 'price']
-        return df
+        df = YahooEquityDAO().get_equity_price_frame(symbol, from_date.strftime('%Y-%m-%d'), price_field)
+        return df[-window:].reset_index(drop=True)
 
 
 if __name__ == '__main__':
@@ -8,6 +8,7 @@ from entities.equity import Equity
 from ingestion.webscraper import YahooScraper, SINAScraper, CNBCScraper
 from common.tradetime import TradeTime
 from dataaccess.equityrealtimedao import EquityRealTimeDAO
+from utils.indicatorstate import IndicatorBook
 
 
 class RealTimeDataCollector(object):
@@ -15,6 +16,8 @@ class RealTimeDataCollector(object):
     def __init__(self):
         self.symbols = ['SVXY', 'SPY']  # , 'VIX', 'SVXY', 'UVXY']
         self.equity_realtime_dao = EquityRealTimeDAO()
+        # the indicators of the minute bars of the ticks, restored from the last run.
+        self.indicators = IndicatorBook.load(PathMgr.get_data_path('indicators/realtime_indicators.json'), self.symbols)
 
     @property
     def logger(self):
@@ -39,9 +42,16 @@ class RealTimeDataCollector(object):
         if price is not None:
             self.logger.info('save record into database...')
             self.equity_realtime_dao.insert(symbol, us_dt, price)
+            self.indicators.on_tick(symbol, us_dt, price)
         else:
             self.logger.info('ingest record failed at %s...' % us_dt)
 
+    def get_indicator_values(self, symbol):
+        """
+        :return: dict of indicator name -> latest value of the closed minute bars, without a db query.
+        """
+        return self.indicators.get_values(symbol)
+
     def run(self):
         self.logger.info("start...")
         while True:
@@ -53,6 +63,7 @@ class RealTimeDataCollector(object):
                         count = self.equity_realtime_dao.add_missing_data_in_real_time(symbol)
                         if count is not None and count > 0:
                             self.logger.info('Filled {} records...'.format(count))
+                    self.indicators.save()
                 except Exception as e:
                     self.logger.error('Trace: ' + traceback.format_exc())
                     self.logger.error(str(e))
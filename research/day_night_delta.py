@@ -8,7 +8,7 @@ class DayNightDelta(object):
         [self.dates, self.spy_prices, self.days_delta, self.night_delta] = self.load_spy_records()
 
     def load_spy_records(self):
-        rows = YahooEquityDAO().get_all_equity_price_by_symbol('SPY', from_date_str='1993-01-01', price_field='openPrice, closePrice')
+        rows = YahooEquityDAO(use_store=True).get_all_equity_price_by_symbol('SPY', from_date_str='1993-01-01', price_field='openPrice, closePrice')
         dates =map(lambda x:x[0],rows)
         spy_prices = map(lambda x: x[2], rows)
         days_delta = []
@@ -1,14 +1,14 @@
 import datetime
 import pandas as pd
-from utils.stringhelper import byteify
 from common.symbols import Symbols
 from dataaccess.yahooequitydao import YahooEquityDAO
+from research.walkforward import WalkForwardSelection
 
 
 class ETFSelection(object):
 
     def __init__(self):
-        self.yahoo_dao = YahooEquityDAO()
+        self.yahoo_dao = YahooEquityDAO(use_store=True)
         self.ignore_symbols = ['BIL', 'IEF', 'XIV', 'VIX', 'GLD', 'SLV', 'TLT', 'ZIV']
 
     @staticmethod
@@ -71,16 +71,8 @@ class ETFSelection(object):
             #symbols = self.get_low_volatility_symbols(current_date=current_date, liquidity_filter_count=liquidity_filter_count, vol_filter_count=second_filter_count)
         else:
             symbols = self.yahoo_dao.filter_liquidity_symbols(current_date=current_date, count=liquidity_filter_count, ignore_symbols=self.ignore_symbols)
-        diffs = self.yahoo_dao.get_all_monthly_diff_price_by_symbols(symbols, end_date=current_date)
-        df = None
-        for i in range(len(symbols)):
-            new_df = pd.DataFrame({symbols[i]: diffs[i]})
-            if df is None:
-                df = new_df
-            else:
-                df = df.join(new_df)
-        # print df
-        correlation_coefficient = df.corr()
+        panel = self.yahoo_dao.get_monthly_equity_panel(symbols, end_date=current_date)
+        correlation_coefficient = panel.get_correlation(panel.get_price_changes())
         return correlation_coefficient
 
     def get_low_corr_symbols(self, current_date=None, count=8, liquidity_filter_count=30, second_filter_count=30, second_filter_by=None):
@@ -99,29 +91,23 @@ class ETFSelection(object):
         dates = filter(lambda x: x > start_date, dates)
         return dates
 
-    def get_monthly_symbols(self, start_date=datetime.date(2011, 1, 1), liquidity_filter_count=50, second_filter_count=None, second_filter_by=None):
-        results = {}
-        for date in self.get_monthly_end_date(start_date):
-            symbols = self.get_low_corr_symbols(date, liquidity_filter_count=liquidity_filter_count, second_filter_count=second_filter_count)
-            results[date] = map(byteify, symbols)
-            # print date, results[date]
-        return results
-
-    def get_monthly_symbols_with_volatilities(self, start_date=datetime.date(2011, 1, 1), liquidity_filter_count=50, volatility_filter_count=None):
-        results = {}
-        for date in self.get_monthly_end_date(start_date):
-            symbols = self.get_low_corr_symbols(date, liquidity_filter_count=liquidity_filter_count, second_filter_count=volatility_filter_count, second_filter_by=self.get_low_volatility_symbols)
-            results[date] = map(byteify, symbols)
-            # print date, results[date]
-        return results
-
-    def get_monthly_symbols_with_sharp_ratio(self, start_date=datetime.date(2011, 1, 1), liquidity_filter_count=50, sharp_ratio_filter_count=None):
-        results = {}
-        for date in self.get_monthly_end_date(start_date):
-            symbols = self.get_low_corr_symbols(date, liquidity_filter_count=liquidity_filter_count, second_filter_count=sharp_ratio_filter_count, second_filter_by=self.get_high_sharp_ratio_symbols)
-            results[date] = map(byteify, symbols)
-            # print date, results[date]
-        return results
+    def get_monthly_symbols_by_walk_forward(self, start_date, liquidity_filter_count, second_filter_count, second_filter_by, processes=None):
+        dates = self.get_monthly_end_date(start_date)
+        if len(dates) == 0:
+            return {}
+        selection = WalkForwardSelection.load(dates, self.ignore_symbols, self.yahoo_dao)
+        return selection.run(dates, processes, liquidity_filter_count=liquidity_filter_count,
+                             second_filter_count=second_filter_count, second_filter_by=second_filter_by)
+
+    def get_monthly_symbols(self, start_date=datetime.date(2011, 1, 1), liquidity_filter_count=50, second_filter_count=None, second_filter_by=None, processes=None):
+        # second_filter_by was never passed to get_low_corr_symbols here, the symbols are filtered by liquidity only.
+        return self.get_monthly_symbols_by_walk_forward(start_date, liquidity_filter_count, second_filter_count, None, processes)
+
+    def get_monthly_symbols_with_volatilities(self, start_date=datetime.date(2011, 1, 1), liquidity_filter_count=50, volatility_filter_count=None, processes=None):
+        return self.get_monthly_symbols_by_walk_forward(start_date, liquidity_filter_count, volatility_filter_count, 'volatility', processes)
+
+    def get_monthly_symbols_with_sharp_ratio(self, start_date=datetime.date(2011, 1, 1), liquidity_filter_count=50, sharp_ratio_filter_count=None, processes=None):
+        return self.get_monthly_symbols_by_walk_forward(start_date, liquidity_filter_count, sharp_ratio_filter_count, 'sharp_ratio', processes)
 
     @staticmethod
     def get_symbols_mapping():
@@ -8,18 +8,17 @@ import matplotlib.pyplot as plt
 class PairTrading(object):
 
     def __init__(self):
-        self.yahoo_dao = YahooEquityDAO()
+        self.yahoo_dao = YahooEquityDAO(use_store=True)
 
     def show_ratio(self, equity1, equity2):
-        records1 = self.yahoo_dao.get_all_equity_price_by_symbol(equity1, from_date_str='2008-01-01')
-        records2 = self.yahoo_dao.get_all_equity_price_by_symbol(equity2, from_date_str='2008-01-01')
-        dates = map(lambda x: x[0], records1)
-        prices1 = map(lambda x: x[1], records1)
-        prices2 = map(lambda x: x[1], records2)
+        df1 = self.yahoo_dao.get_equity_price_frame(equity1, from_date_str='2008-01-01')
+        df2 = self.yahoo_dao.get_equity_price_frame(equity2, from_date_str='2008-01-01')
+        dates = df1['date'].values
+        prices1 = df1['price'].values
+        prices2 = df2['price'].values
         score, pvalue, _ = coint(prices1, prices2)
         print(pvalue)
-        ratios = map(lambda x, y: x/y, prices1, prices2)
-        # ratios = prices1/prices2
+        ratios = prices1/prices2
         fig, ax = plt.subplots()
         ax.plot(dates, ratios)
         plt.axhline(np.average(ratios))
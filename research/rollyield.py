@@ -1,5 +1,4 @@
 import datetime
-import pandas as pd
 import matplotlib.pyplot as plt
 from dataaccess.yahooequitydao import YahooEquityDAO
 from research.tradesimulation import TradeNode, TradeSimulation
@@ -8,13 +7,11 @@ from research.tradesimulation import TradeNode, TradeSimulation
 class RollYield(object):
 
     def __init__(self):
-        self.vix_records = YahooEquityDAO().get_all_equity_price_by_symbol('^VIX', from_date_str='2010-12-17')
-        self.vxv_records = YahooEquityDAO().get_all_equity_price_by_symbol('^VXV', from_date_str='2010-12-17')
-        self.dates = map(lambda x: x[0], self.vix_records)[7:]
-        vix_values = map(lambda x: x[1], self.vix_records)
-        self.vix_ma10 = pd.Series(vix_values).rolling(window=7).mean().tolist()[7:]
-        vxv_values = map(lambda x: x[1], self.vxv_records)
-        self.vxv_ma10 = pd.Series(vxv_values).rolling(window=7).mean().tolist()[7:]
+        vix_df = YahooEquityDAO(use_store=True).get_equity_price_frame('^VIX', from_date_str='2010-12-17')
+        vxv_df = YahooEquityDAO(use_store=True).get_equity_price_frame('^VXV', from_date_str='2010-12-17')
+        self.dates = map(lambda x: x.date(), vix_df['date'])[7:]
+        self.vix_ma10 = vix_df['price'].rolling(window=7).mean().tolist()[7:]
+        self.vxv_ma10 = vxv_df['price'].rolling(window=7).mean().tolist()[7:]
 
     def run(self):
         trade_nodes = []
@@ -1,9 +1,12 @@
 import math
 import datetime
+import numpy as np
+from utils import kernels
 from utils.cachehelper import CacheMan
 from common.tradetime import TradeTime
 from dataaccess.yahooequitydao import YahooEquityDAO
 from dataaccess.optiondao import OptionDAO
+from dataaccess.pricehistorycache import PriceHistoryCache
 
 
 class TradeNode(object):
@@ -20,14 +23,6 @@ class TradeNode(object):
 
 class DataProvider(object):
 
-    @staticmethod
-    def _get_equity_price_list_as_dic(symbol):
-        records = YahooEquityDAO().get_all_equity_price_by_symbol(symbol)
-        result = {}
-        for [d,v] in records:
-            result[int(d.strftime('%Y%m%d'))] = v
-        return result
-
     @staticmethod
     def _get_option_price_list_as_dic(option_symbol):
         records = OptionDAO().compatible_get_option_by_symbol(option_symbol)
@@ -39,8 +34,8 @@ class DataProvider(object):
         return result
 
     @staticmethod
-    def get_equity_price_records(symbol):
-        return CacheMan('yahoo_equity_price').get_with_cache(symbol, DataProvider._get_equity_price_list_as_dic)
+    def get_equity_price_history(symbol):
+        return PriceHistoryCache('yahoo_equity').get_history(symbol)
 
     @staticmethod
     def get_option_price_records(option_symbol):
@@ -60,8 +55,7 @@ class DataProvider(object):
     @staticmethod
     def get_price_by_date(symbol, the_date):
         if len(symbol) < 15:  # it's equity
-            records_dic = DataProvider.get_equity_price_records(symbol)
-            return DataProvider.find_price(records_dic, the_date)
+            return DataProvider.get_equity_price_history(symbol).as_of(the_date, max_lag_days=10)
         else:
             records_dic = DataProvider.get_option_price_records(symbol)
             return DataProvider.find_price(records_dic, the_date)
@@ -144,10 +138,55 @@ class TradeSimulation(object):
             total -= percentage
             yield new_percentage
 
+    @staticmethod
+    def simulate_with_kernel(trade_nodes, dates, init_cash=1000000, buy_tax=0.001, sell_tax=0.001):
+        """
+        simulate by kernels.portfolio_kernel, the prices of each bought symbol are read once per date from its first buy on,
+        the same prices Portfolio reads in the loop.
+        """
+        row_of_date = dict(map(lambda x: (x[1], x[0]), enumerate(dates)))
+        rows = map(lambda x: row_of_date.get(x.date), trade_nodes)
+        for i in range(len(rows)):
+            if rows[i] is None or (i > 0 and rows[i] < rows[i - 1]):
+                raise AssertionError('the trade date should be in dates ranges.')
+            if trade_nodes[i].action not in ('buy', 'sell'):
+                raise AssertionError('unknown trade action: %s.' % trade_nodes[i].action)
+        symbols = []
+        first_rows = {}
+        for (node, row) in zip(trade_nodes, rows):
+            if node.symbol not in first_rows:
+                symbols.append(node.symbol)
+                first_rows[node.symbol] = row if node.action == 'buy' else None
+            elif first_rows[node.symbol] is None and node.action == 'buy':
+                first_rows[node.symbol] = row
+        prices = np.full((len(dates), len(symbols)), np.nan)
+        for (column, symbol) in enumerate(symbols):
+            if first_rows[symbol] is not None:
+                for row in range(first_rows[symbol], len(dates)):
+                    price = DataProvider.get_price_by_date(symbol, dates[row])
+                    prices[row, column] = np.nan if price is None else price
+        column_of_symbol = dict(map(lambda x: (x[1], x[0]), enumerate(symbols)))
+        (returns, error, error_row, cash) = kernels.portfolio_kernel(
+            prices, np.array(rows, dtype='int64'), np.array(map(lambda x: column_of_symbol[x.symbol], trade_nodes), dtype='int64'),
+            np.array(map(lambda x: 1 if x.action == 'buy' else -1, trade_nodes), dtype='int64'),
+            np.array(map(lambda x: x.percentage, trade_nodes), dtype='float64'), float(init_cash), buy_tax, sell_tax)
+        for (date, value) in zip(dates[:error_row], returns[:error_row].tolist()):
+            yield [date, value]
+        if error == kernels.PORTFOLIO_NOT_ENOUGH_CASH:
+            raise Exception('Not enough cash, left cash:{}'.format(cash))
+        elif error == kernels.PORTFOLIO_NOT_ENOUGH_ASSET:
+            raise Exception('Not enough asset for to sell')
+        elif error == kernels.PORTFOLIO_MISSING_PRICE:
+            raise TypeError('no price on {}'.format(dates[error_row]))
+
     @staticmethod
     def simulate(trade_nodes, start_date, end_date = None):
         if end_date is None:
             end_date = TradeTime.get_latest_trade_date()
+        if kernels.NUMBA_AVAILABLE:
+            for item in TradeSimulation.simulate_with_kernel(trade_nodes, list(TradeSimulation.date_range(start_date, end_date))):
+                yield item
+            return
         portfolio = Portfolio()
         dates = list(TradeSimulation.date_range(start_date, end_date))
         #print trade_nodes
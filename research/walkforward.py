@@ -0,0 +1,139 @@
+import datetime
+import multiprocessing
+import numpy as np
+from utils.stringhelper import byteify
+from common.tradetime import TradeTime
+from common.equitypanel import EquityPanel
+from dataaccess.yahooequitydao import YahooEquityDAO
+
+
+def select_dates(args):
+    """
+    the task of one process in WalkForwardSelection.run, defined at module level to be picklable.
+    """
+    (selection, dates, kwargs) = args
+    return map(lambda x: (x, selection.select(x, **kwargs)), dates)
+
+
+class WalkForwardSelection(object):
+    """
+    the month end scans of ETFSelection over the daily panel and the monthly bars loaded once, instead of querying the db for each rebalance date.
+    the average dollar volume of any window is read from cumulative sums, volatility, sharp ratio and
+    correlation are computed on the slices of the panel the same way as the YahooEquityDAO methods do.
+    """
+
+    def __init__(self, panel, monthly_arrays, ignore_symbols=[]):
+        """
+        :param panel: EquityPanel of all the candidate symbols, with the volumes
+        :param monthly_arrays: symbol, lastDate and adjClosePrice arrays of yahoo_equity_monthly, as YahooEquityDAO.get_monthly_arrays
+        :param ignore_symbols: never selected by liquidity, the same as filter_liquidity_symbols
+        """
+        self.panel = panel
+        self.monthly_arrays = monthly_arrays
+        self.candidates = np.array(map(lambda x: not (x.startswith('^') or x.endswith('.SS') or x in ignore_symbols), panel.symbols))
+        dollar_volumes = panel.prices * panel.volumes
+        valid = ~np.isnan(dollar_volumes)
+        zeros = np.zeros((1, len(panel.symbols)))
+        self.dollar_volume_sums = np.vstack([zeros, np.cumsum(np.where(valid, dollar_volumes, 0), axis=0)])
+        self.dollar_volume_counts = np.vstack([zeros, np.cumsum(valid, axis=0)])
+
+    @staticmethod
+    def load(dates, ignore_symbols=[], yahoo_dao=None, corr_window=36, volatility_window=120):
+        """
+        load the panel covering all the windows of the rebalance dates in one pass.
+        """
+        yahoo_dao = yahoo_dao or YahooEquityDAO(use_store=True)
+        from_date = min(YahooEquityDAO.get_monthly_window_range(corr_window, min(dates))[0],
+                        YahooEquityDAO.get_window_range(volatility_window, min(dates))[0])
+        end_date = datetime.date.today() + datetime.timedelta(days=1)
+        symbols = yahoo_dao.get_coverage_symbols()
+        panel = yahoo_dao.get_equity_panel(symbols, from_date, end_date)
+        monthly_arrays = yahoo_dao.get_monthly_arrays(symbols, from_date, end_date)
+        return WalkForwardSelection(panel, monthly_arrays, ignore_symbols)
+
+    def get_liquidities(self, current_date, window=30):
+        """
+        :return: average dollar volume of each symbol for the dates > from_date and <= current_date, as filter_liquidity_symbols.
+        """
+        from_date = TradeTime.get_from_date_by_window(window, current_date)
+        start = np.searchsorted(self.panel.dates, np.datetime64(from_date, 'D'), side='right')
+        end = np.searchsorted(self.panel.dates, np.datetime64(current_date, 'D'), side='right')
+        counts = self.dollar_volume_counts[end] - self.dollar_volume_counts[start]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (self.dollar_volume_sums[end] - self.dollar_volume_sums[start]) / counts
+
+    def filter_liquidity_symbols(self, current_date=None, window=30, count=50):
+        if current_date is None:
+            current_date = TradeTime.get_latest_trade_date()
+        liquidities = self.get_liquidities(current_date, window)
+        columns = np.flatnonzero(self.candidates & ~np.isnan(liquidities))
+        columns = columns[np.argsort(-liquidities[columns], kind='mergesort')]
+        return map(lambda x: self.panel.symbols[x], columns[:count])
+
+    def get_low_volatility_symbols(self, current_date, window=120, liquidity_filter_count=50, my_filter_count=30):
+        # the liquidity filter of ETFSelection.get_low_volatility_symbols is on the latest trade date.
+        symbols = self.filter_liquidity_symbols(count=liquidity_filter_count)
+        (from_date, end_date) = YahooEquityDAO.get_window_range(window, current_date)
+        panel = self.panel.select(symbols).between(from_date, end_date).tail(window)
+        symbol_volatilities = panel.to_records(panel.get_volatilities())
+        symbol_volatilities.sort(key=lambda x: x[1])
+        return map(lambda x: x[0], symbol_volatilities[:my_filter_count])
+
+    def get_high_sharp_ratio_symbols(self, current_date, window=120, liquidity_filter_count=50, my_filter_count=30):
+        # the liquidity filter of ETFSelection.get_high_sharp_ratio_symbols is on the latest trade date.
+        symbols = self.filter_liquidity_symbols(count=liquidity_filter_count)
+        (from_date, end_date) = YahooEquityDAO.get_window_range(window, current_date)
+        panel = self.panel.select(symbols).between(from_date, end_date).tail(window)
+        symbol_sharp_ratio = panel.to_records(panel.get_sharp_ratios())
+        symbol_sharp_ratio.sort(key=lambda x: x[1], reverse=True)
+        return map(lambda x: x[0], symbol_sharp_ratio[:my_filter_count])
+
+    def get_low_corr_symbols(self, current_date, symbols, count=8, window=36):
+        (from_date, end_date) = YahooEquityDAO.get_monthly_window_range(window, current_date)
+        last_dates = self.monthly_arrays['lastDate']
+        kept = (last_dates >= np.datetime64(from_date, 'D')) & (last_dates < np.datetime64(end_date, 'D'))
+        panel = EquityPanel.from_monthly_columns(symbols, self.monthly_arrays['symbol'][kept], last_dates[kept],
+                                                 self.monthly_arrays['adjClosePrice'][kept]).tail(window)
+        df = panel.get_correlation(panel.get_price_changes())
+        corr_sum = df[df.columns].sum() - 1
+        records = map(lambda x, y: [x, y], corr_sum.index, corr_sum.tolist())
+        records = filter(lambda x: x[1] > 0, records)
+        records.sort(key=lambda x: x[1])
+        return map(lambda x: x[0], records[:count])
+
+    def select(self, current_date, count=8, liquidity_filter_count=50, second_filter_count=None, second_filter_by=None):
+        """
+        the symbols of ETFSelection.get_low_corr_symbols on the current_date.
+        :param second_filter_by: None, 'volatility' or 'sharp_ratio'
+        """
+        if second_filter_by == 'volatility':
+            symbols = self.get_low_volatility_symbols(current_date, liquidity_filter_count=liquidity_filter_count, my_filter_count=second_filter_count)
+        elif second_filter_by == 'sharp_ratio':
+            symbols = self.get_high_sharp_ratio_symbols(current_date, liquidity_filter_count=liquidity_filter_count, my_filter_count=second_filter_count)
+        else:
+            symbols = self.filter_liquidity_symbols(current_date, count=liquidity_filter_count)
+        return map(byteify, self.get_low_corr_symbols(current_date, symbols, count))
+
+    def run(self, dates, processes=None, **kwargs):
+        """
+        :param dates: the rebalance dates
+        :param processes: fan the dates out across a process pool of this size, None to run in the current process
+        :param kwargs: the arguments of select
+        :return: dict of date -> selected symbols
+        """
+        if processes is None or processes <= 1 or len(dates) <= 1:
+            return dict(select_dates((self, dates, kwargs)))
+        chunks = map(lambda i: dates[i::processes], range(processes))
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(select_dates, map(lambda x: (self, x, kwargs), chunks))
+        finally:
+            pool.close()
+            pool.join()
+        return dict([item for result in results for item in result])
+
+
+if __name__ == '__main__':
+    dates = [datetime.date(2017, 12, 29), datetime.date(2018, 1, 31)]
+    selection = WalkForwardSelection.load(dates, ['BIL', 'IEF', 'XIV', 'VIX', 'GLD', 'SLV', 'TLT', 'ZIV'])
+    print selection.run(dates, liquidity_filter_count=50, second_filter_count=35, second_filter_by='sharp_ratio')
@@ -18,6 +18,55 @@ create table yahoo_equity (
 );
 
 
+-- monthly and weekly bars of yahoo_equity, rebuilt by YahooEquityDAO for the periods touched by the written daily bars.
+-- they replace yahoo_equity_monthly_view, which is recomputed over the whole daily table by every query.
+drop table if exists yahoo_equity_monthly;
+create table yahoo_equity_monthly (
+    id int not null auto_increment primary key,
+    symbol varchar (32) not null,
+    tradeyear int not null,
+    trademonth int not null,
+    firstDate date not null,
+    lastDate date not null,
+    openPrice float null,
+    highPrice float null,
+	lowPrice float null,
+	closePrice float null,
+	adjClosePrice float null,
+	volume double null,
+	unique index yahoo_equity_monthly_index (symbol, tradeyear, trademonth),
+	index yahoo_equity_monthly_last_date_index (symbol, lastDate)
+);
+
+drop table if exists yahoo_equity_weekly;
+create table yahoo_equity_weekly (
+    id int not null auto_increment primary key,
+    symbol varchar (32) not null,
+    weekDate date not null,
+    firstDate date not null,
+    lastDate date not null,
+    openPrice float null,
+    highPrice float null,
+	lowPrice float null,
+	closePrice float null,
+	adjClosePrice float null,
+	volume double null,
+	unique index yahoo_equity_weekly_index (symbol, weekDate),
+	index yahoo_equity_weekly_last_date_index (symbol, lastDate)
+);
+
+-- rolling average dollar volume (adjClosePrice * volume) of yahoo_equity, for the liquidity rankings by date.
+drop table if exists yahoo_equity_liquidity;
+create table yahoo_equity_liquidity (
+    id int not null auto_increment primary key,
+    symbol varchar (32) not null,
+    tradeDate date not null,
+    liquidity30 double null,
+    liquidity100 double null,
+    liquidity200 double null,
+    unique index yahoo_equity_liquidity_index (tradeDate, symbol)
+);
+
 drop table if exists equity;
 create table equity (
     id int not null auto_increment primary key,
@@ -59,6 +108,21 @@ create table equity_30min (
 );
 
 
+-- daily bars rolled up from equity_min by AGG30Min, apart from the adjusted yahoo_equity.
+drop table if exists equity_daily;
+create table equity_daily (
+    id int not null auto_increment primary key,
+    symbol varchar (32) not null,
+    tradeDate date not null,
+    openPrice float null,
+    highPrice float null,
+	lowPrice float null,
+	closePrice float null,
+	volume float null,
+	unique index equity_daily_index (symbol, tradeDate)
+);
+
+
 drop table if exists equity_realtime;
 create table equity_realtime (
     id int not null auto_increment primary key,
@@ -70,6 +134,30 @@ create table equity_realtime (
 
 
 
+-- first date, last date and row count of the symbols in yahoo_equity, equity, equity_min and equity_30min, maintained by the bulk writers.
+drop table if exists symbol_coverage;
+create table symbol_coverage (
+    tableName varchar (32) not null,
+    symbol varchar (32) not null,
+    firstDate datetime not null,
+    lastDate datetime not null,
+    rowCount int not null,
+    updateTime timestamp not null default current_timestamp on update current_timestamp,
+    primary key (tableName, symbol)
+);
+
+
+-- the last minute of equity_min aggregated into the bars of each interval (30 or daily) and symbol, advanced by AGG30Min.update_bars.
+drop table if exists aggregation_watermark;
+create table aggregation_watermark (
+    barInterval varchar (16) not null,
+    symbol varchar (32) not null,
+    watermark datetime not null,
+    updateTime timestamp not null default current_timestamp on update current_timestamp,
+    primary key (barInterval, symbol)
+);
+
+
 drop table if exists option_data;
 create table option_data (
     id int not null auto_increment primary key,
@@ -18,10 +18,10 @@ class CAA(object):
         self.historical_prices = list(self.get_historical_prices())
 
     def get_historical_prices(self):
-        yahooEquityDAO = YahooEquityDAO()
+        yahooEquityDAO = YahooEquityDAO(use_store=True)
         for symbol in self.symbols:
-            rows = yahooEquityDAO.get_all_equity_price_by_symbol(symbol)
-            yield map(lambda x: x[1], rows)
+            df = yahooEquityDAO.get_equity_price_frame(symbol)
+            yield df['price'].values
 
     def get_prices_lists(self, days_ago):
         return map(lambda x: x[-days_ago-252:-days_ago], self.historical_prices)
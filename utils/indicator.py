@@ -1,3 +1,5 @@
+import numpy as np
+from utils.kernels import NUMBA_AVAILABLE, sar_kernel
 
 
 class MACD(object):
@@ -69,7 +71,8 @@ class RSI(object):
                 down_sum -= delta
         up_ave = up_sum*1.0 / count
         down_ave = down_sum * 1.0 / count
-        rsi = 100.0*up_sum/(up_sum + down_sum)
+        # the flat prices have neither up nor down, the rsi is neutral.
+        rsi = 100.0*up_sum/(up_sum + down_sum) if up_sum + down_sum > 0 else 50.0
         return up_ave, down_ave, rsi
 
     @staticmethod
@@ -83,7 +86,7 @@ class RSI(object):
         previous_up, previous_down, previous_rsi = rsi_obj
         new_up = up/time_period + previous_up*(time_period-1)/time_period
         new_down = down/time_period + previous_down * (time_period - 1) / time_period
-        rsi = 100 * new_up/(new_up + new_down)
+        rsi = 100 * new_up/(new_up + new_down) if new_up + new_down > 0 else 50.0
         return new_up, new_down, rsi
 
     @staticmethod
@@ -177,15 +180,18 @@ class SAR(object):
 
     @staticmethod
     def get_all_sar(high_pirce_list, low_price_list, bar_count=4, af0=0.02, iaf=0.02, max_af=0.2):
-        psar_list = SAR.get_initial_sar(high_pirce_list, low_price_list, bar_count, af0, iaf, max_af)
-        bull_sar = map(lambda x: [x[2], x[-1]], psar_list)
+        if NUMBA_AVAILABLE:
+            (bulls, sars) = sar_kernel(np.asarray(high_pirce_list, dtype='float64'), np.asarray(low_price_list, dtype='float64'),
+                                       bar_count, af0, iaf, max_af)
+            bull_sar = map(list, zip(bulls.tolist(), sars.tolist()))
+        else:
+            psar_list = SAR.get_initial_sar(high_pirce_list, low_price_list, bar_count, af0, iaf, max_af)
+            bull_sar = map(lambda x: [x[2], x[-1]], psar_list)
         for i in range(bar_count-1):
             bull_sar[i] = [None, None]
         return bull_sar
 
 
-
-
 if __name__ == '__main__':
     # print MACD.get_all_macd([106.1, 26.59, 55.09, 56.1, 34.44, 45.29, 41.92])
     # print MACD.get_all_ema([106.1, 26.59, 55.09, 56.1, 34.44, 45.29, 41.92], 3)
@@ -0,0 +1,253 @@
+import os
+import json
+import math
+from utils.stringhelper import byteify
+from utils.iohelper import ensure_parent_dir_exists
+from utils.indicator import MACD, RSI, SAR
+
+
+class IndicatorState(object):
+    """
+    the state of one indicator of one symbol, updated in O(1) per new bar by the one step functions of utils.indicator,
+    so the values are the same as the list functions over the whole history.
+    the subclasses implement update(price, high=None, low=None), returning the latest value, None before enough bars.
+    the state is plain json data in __dict__, to be saved and restored across restarts.
+    """
+
+    def to_dict(self):
+        return {'type': self.__class__.__name__, 'state': self.__dict__}
+
+    @staticmethod
+    def from_dict(obj):
+        cls = INDICATOR_TYPES[byteify(obj['type'])]
+        indicator = cls.__new__(cls)
+        indicator.__dict__.update(byteify(obj['state']))
+        return indicator
+
+
+class EMAState(IndicatorState):
+
+    def __init__(self, n):
+        self.n = n
+        self.value = None
+
+    def update(self, price, high=None, low=None):
+        self.value = MACD.ema(self.n, price, self.value)
+        return self.value
+
+
+class MACDState(IndicatorState):
+    """
+    value as MACD.get_new_macd: [ema_short, ema_long, dif, dea, bar]
+    """
+
+    def __init__(self, s=12, l=26, m=9):
+        self.s = s
+        self.l = l
+        self.m = m
+        self.value = None
+
+    def update(self, price, high=None, low=None):
+        (ema_short, ema_long, dea) = (None, None, None) if self.value is None else (self.value[0], self.value[1], self.value[3])
+        self.value = MACD.get_new_macd(ema_short, ema_long, dea, price, self.s, self.l, self.m)
+        return self.value
+
+
+class RSIState(IndicatorState):
+    """
+    the first time_period + 1 prices are kept to start from RSI.get_init_rsi, as RSI.get_rsi.
+    """
+
+    def __init__(self, time_period=14):
+        self.time_period = time_period
+        self.prices = []
+        self.rsi_object = None
+
+    def update(self, price, high=None, low=None):
+        if self.rsi_object is None:
+            self.prices.append(price)
+            if len(self.prices) <= self.time_period:
+                return None
+            self.rsi_object = list(RSI.get_init_rsi(self.prices))
+        else:
+            self.rsi_object = list(RSI.get_new_rsi(self.time_period, price, self.prices[-1], self.rsi_object))
+        self.prices = [price]
+        return self.rsi_object[-1]
+
+    @property
+    def value(self):
+        return None if self.rsi_object is None else self.rsi_object[-1]
+
+
+class SARState(IndicatorState):
+    """
+    value as SAR.get_all_sar: [bull_p, sar], None for the first bar_count - 1 bars.
+    """
+
+    def __init__(self, bar_count=4, af0=0.02, iaf=0.02, max_af=0.2):
+        self.bar_count = bar_count
+        self.af0 = af0
+        self.iaf = iaf
+        self.max_af = max_af
+        self.psar = None
+        self.count = 0
+
+    def update(self, price, high=None, low=None):
+        high = price if high is None else high
+        low = price if low is None else low
+        self.psar = list(SAR.get_new_sar(high, low, self.psar, self.bar_count, self.af0, self.iaf, self.max_af))
+        self.count += 1
+        return self.value
+
+    @property
+    def value(self):
+        if self.psar is None or self.count < self.bar_count:
+            return None
+        return [self.psar[2], self.psar[-1]]
+
+
+class RollingVolatilityState(IndicatorState):
+    """
+    annualized volatility of the last window prices, the same as OptionCalculater.get_year_history_volatility,
+    from the running sums of the log returns in a ring of window - 1 returns.
+    the sums are rebuilt once per round of the ring to drop the rounding.
+    """
+
+    def __init__(self, window=30):
+        self.window = window
+        self.last_price = None
+        self.returns = []
+        self.position = 0
+        self.sum = 0.0
+        self.square_sum = 0.0
+
+    def update(self, price, high=None, low=None):
+        if self.last_price is not None:
+            log_return = math.log(price / self.last_price)
+            self.sum += log_return
+            self.square_sum += log_return * log_return
+            if len(self.returns) < self.window - 1:
+                self.returns.append(log_return)
+            else:
+                removed = self.returns[self.position]
+                self.returns[self.position] = log_return
+                self.sum -= removed
+                self.square_sum -= removed * removed
+                self.position = (self.position + 1) % len(self.returns)
+                if self.position == 0:
+                    self.sum = math.fsum(self.returns)
+                    self.square_sum = math.fsum(map(lambda x: x * x, self.returns))
+        self.last_price = price
+        return self.value
+
+    @property
+    def value(self):
+        count = len(self.returns)
+        if count < self.window - 1 or count == 0:
+            return None
+        mean = self.sum / count
+        return math.sqrt(252 * max(self.square_sum / count - mean * mean, 0.0))
+
+
+INDICATOR_TYPES = dict(map(lambda x: (x.__name__, x), [EMAState, MACDState, RSIState, SARState, RollingVolatilityState]))
+
+
+class IndicatorSet(object):
+    """
+    the indicators of one symbol. the ticks are combined into minute bars, the indicators are updated when a bar is closed
+    by the first tick of the next minute.
+    """
+
+    @staticmethod
+    def get_default_indicators():
+        return {'ema12': EMAState(12), 'ema26': EMAState(26), 'macd': MACDState(), 'rsi14': RSIState(14),
+                'sar': SARState(), 'vol30': RollingVolatilityState(30)}
+
+    def __init__(self, indicators=None):
+        self.indicators = indicators or IndicatorSet.get_default_indicators()
+        self.bar = None
+
+    def update(self, price, high=None, low=None):
+        """
+        push a closed bar.
+        """
+        for indicator in self.indicators.values():
+            indicator.update(price, high, low)
+
+    def on_tick(self, trade_time, price):
+        """
+        :param trade_time: datetime of the tick
+        """
+        minute = trade_time.strftime('%Y-%m-%d %H:%M')
+        if self.bar is not None and self.bar[0] != minute:
+            # cleared before the update, a failed update never applies the same bar again on the next tick.
+            (bar, self.bar) = (self.bar, None)
+            self.update(bar[3], bar[1], bar[2])
+        if self.bar is None:
+            self.bar = [minute, price, price, price]
+        else:
+            self.bar = [minute, max(self.bar[1], price), min(self.bar[2], price), price]
+
+    def get_values(self):
+        """
+        :return: dict of indicator name -> latest value of the closed bars
+        """
+        return dict(map(lambda x: (x[0], x[1].value), self.indicators.items()))
+
+    def to_dict(self):
+        return {'bar': self.bar, 'indicators': dict(map(lambda x: (x[0], x[1].to_dict()), self.indicators.items()))}
+
+    @staticmethod
+    def from_dict(obj):
+        indicator_set = IndicatorSet(dict(map(lambda x: (byteify(x[0]), IndicatorState.from_dict(x[1])), obj['indicators'].items())))
+        indicator_set.bar = byteify(obj['bar'])
+        return indicator_set
+
+
+class IndicatorBook(object):
+    """
+    IndicatorSet of each symbol, saved to and restored from a json file.
+    """
+
+    def __init__(self, path, symbols=[]):
+        self.path = path
+        self.sets = dict(map(lambda x: (x, IndicatorSet()), symbols))
+
+    def get_set(self, symbol):
+        if symbol not in self.sets:
+            self.sets[symbol] = IndicatorSet()
+        return self.sets[symbol]
+
+    def on_tick(self, symbol, trade_time, price):
+        self.get_set(symbol).on_tick(trade_time, price)
+
+    def get_values(self, symbol):
+        return self.get_set(symbol).get_values()
+
+    def save(self):
+        ensure_parent_dir_exists(self.path)
+        content = json.dumps(dict(map(lambda x: (x[0], x[1].to_dict()), self.sets.items())))
+        # write then rename, a crash never leaves a half written file.
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(content)
+        os.rename(temp_path, self.path)
+
+    @staticmethod
+    def load(path, symbols=[]):
+        book = IndicatorBook(path, symbols)
+        if os.path.exists(path):
+            with open(path) as f:
+                obj = json.load(f)
+            for (symbol, set_obj) in obj.items():
+                book.sets[byteify(symbol)] = IndicatorSet.from_dict(set_obj)
+        return book
+
+
+if __name__ == '__main__':
+    import datetime
+    book = IndicatorBook('/tmp/indicators.json', ['SPY'])
+    start_time = datetime.datetime(2018, 6, 1, 9, 30)
+    for i, price in enumerate([270.1, 270.3, 269.8, 270.5, 271.0, 270.7, 270.9]):
+        book.on_tick('SPY', start_time + datetime.timedelta(minutes=i), price)
+    print book.get_values('SPY')
@@ -0,0 +1,177 @@
+import math
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# the kernels are compiled only when numba is installed, the callers keep their python loops otherwise.
+NUMBA_AVAILABLE = numba is not None
+
+
+def jit(function):
+    """
+    compile the function with numba.njit, or return it unchanged without numba.
+    """
+    if numba is None:
+        return function
+    return numba.njit(cache=True)(function)
+
+
+@jit
+def sar_kernel(highs, lows, bar_count, af0, iaf, max_af):
+    """
+    SAR.get_new_sar over the whole series, the windows of the last bar_count bars are read from the arrays in place
+    instead of the sliced lists.
+    :return: (bull_p array, sar array) of each bar
+    """
+    length = len(highs)
+    bulls = np.empty(length, dtype=np.bool_)
+    sars = np.empty(length, dtype=np.float64)
+    bull_p = True
+    af = iaf
+    sar = 0.0
+    for i in range(length):
+        if i == 0:
+            (bull_p, af, sar) = (True, iaf, lows[0])
+        elif i < bar_count:
+            sar = lows[0]
+            for k in range(1, i + 1):
+                sar = min(sar, lows[k])
+            (bull_p, af) = (True, af0)
+        else:
+            last_high = highs[i - bar_count]
+            last_low = lows[i - bar_count]
+            for k in range(i - bar_count + 1, i):
+                last_high = max(last_high, highs[k])
+                last_low = min(last_low, lows[k])
+            new_high = highs[i]
+            new_low = lows[i]
+            for k in range(i - bar_count + 1, i):
+                new_high = max(new_high, highs[k])
+                new_low = min(new_low, lows[k])
+            if bull_p:
+                new_sar = sar + af * (last_high - sar)
+                if new_low < new_sar:
+                    (bull_p, af, sar) = (False, af0, new_high)
+                else:
+                    if new_high > last_high:
+                        af = min(af + iaf, max_af)
+                    sar = new_sar
+            else:
+                new_sar = sar + af * (last_low - sar)
+                if new_high > new_sar:
+                    (bull_p, af, sar) = (True, af0, new_low)
+                else:
+                    if new_low < last_low:
+                        af = min(af + iaf, max_af)
+                    sar = new_sar
+        bulls[i] = bull_p
+        sars[i] = sar
+    return bulls, sars
+
+
+# the error codes of portfolio_kernel.
+PORTFOLIO_OK = 0
+PORTFOLIO_NOT_ENOUGH_CASH = 1
+PORTFOLIO_NOT_ENOUGH_ASSET = 2
+PORTFOLIO_MISSING_PRICE = 3
+
+
+@jit
+def portfolio_kernel(prices, action_rows, action_columns, action_codes, action_percentages, init_cash, buy_tax, sell_tax):
+    """
+    the day by day loop of TradeSimulation.simulate with the rules of Portfolio.buy and Portfolio.sell.
+    :param prices: dates x symbols matrix, nan where the price is unknown
+    :param action_rows: the date row of each trade, in ascending order
+    :param action_codes: 1 for buy, -1 for sell
+    :return: (returns of each date, error code, the row of the error, the cash at the error)
+    the returns are valid only for the rows before the row of the error.
+    """
+    (rows, columns) = prices.shape
+    returns = np.empty(rows, dtype=np.float64)
+    quantities = np.zeros(columns, dtype=np.float64)
+    held = np.zeros(columns, dtype=np.bool_)
+    cash = init_cash
+    j = 0
+    for i in range(rows):
+        while j < len(action_rows) and action_rows[j] == i:
+            column = action_columns[j]
+            price = prices[i, column]
+            if action_codes[j] == 1:
+                buy_cash = cash * action_percentages[j]
+                if cash < buy_cash:
+                    return returns, PORTFOLIO_NOT_ENOUGH_CASH, i, cash
+                if math.isnan(price):
+                    return returns, PORTFOLIO_MISSING_PRICE, i, cash
+                quantity = math.floor(buy_cash / (price * (1 + buy_tax)))
+                quantities[column] += quantity
+                held[column] = True
+                cash -= price * quantity * (1 + buy_tax)
+            elif held[column]:
+                quantity = quantities[column] * action_percentages[j]
+                if quantity > quantities[column]:
+                    return returns, PORTFOLIO_NOT_ENOUGH_ASSET, i, cash
+                if math.isnan(price):
+                    return returns, PORTFOLIO_MISSING_PRICE, i, cash
+                quantities[column] -= quantity
+                cash += price * quantity * (1 - sell_tax)
+            j += 1
+        total = cash
+        for k in range(columns):
+            if held[k]:
+                if math.isnan(prices[i, k]):
+                    return returns, PORTFOLIO_MISSING_PRICE, i, cash
+                total += quantities[k] * prices[i, k]
+        returns[i] = total / init_cash
+    return returns, PORTFOLIO_OK, rows, cash
+
+
+def _benchmark(length=100000, repeat=3):
+    """
+    time the python loops against the kernels (the first call of each kernel compiles it and is not timed).
+    """
+    import time
+    from utils.indicator import SAR
+    closes = 100 * np.exp(np.cumsum(np.random.normal(0, 0.01, length)))
+    highs = closes * (1 + np.abs(np.random.normal(0, 0.005, length)))
+    lows = closes * (1 - np.abs(np.random.normal(0, 0.005, length)))
+    high_list = highs.tolist()
+    low_list = lows.tolist()
+    print 'numba available: %s' % NUMBA_AVAILABLE
+    start = time.time()
+    expected = SAR.get_initial_sar(high_list, low_list)
+    loop_seconds = time.time() - start
+    sar_kernel(highs[:10], lows[:10], 4, 0.02, 0.02, 0.2)
+    start = time.time()
+    for i in range(repeat):
+        (bulls, sars) = sar_kernel(highs, lows, 4, 0.02, 0.02, 0.2)
+    kernel_seconds = (time.time() - start) / repeat
+    error = np.max(np.abs(sars - np.array(map(lambda x: x[-1], expected))))
+    print 'sar of %s bars: loop %.4fs, kernel %.4fs, max difference %s' % (length, loop_seconds, kernel_seconds, error)
+
+    symbols = 10
+    prices = 100 * np.exp(np.cumsum(np.random.normal(0, 0.01, (length, symbols)), axis=0))
+    action_rows = np.repeat(np.arange(0, length, 5), 2)
+    action_columns = np.random.randint(0, symbols, len(action_rows))
+    action_codes = np.tile([-1, 1], len(action_rows) / 2)
+    action_percentages = np.ones(len(action_rows))
+    args = (action_rows, action_columns, action_codes, action_percentages, 1000000.0, 0.001, 0.001)
+    portfolio_kernel(prices[:10], *args)
+    start = time.time()
+    for i in range(repeat):
+        portfolio_kernel(prices, *args)
+    kernel_seconds = (time.time() - start) / repeat
+    python_seconds = None
+    if NUMBA_AVAILABLE:
+        start = time.time()
+        portfolio_kernel.py_func(prices, *args)
+        python_seconds = time.time() - start
+    print 'portfolio of %s dates and %s trades: python %s, kernel %.4fs' % (length, len(action_rows), '%.4fs' % python_seconds if python_seconds else '-', kernel_seconds)
+
+
+if __name__ == '__main__':
+    print sar_kernel(np.array([31.1, 34.21, 37.63, 41.39, 40.1]), np.array([25.92, 34.21, 37.63, 41.39, 38.5]), 4, 0.02, 0.02, 0.2)
+    _benchmark()
@@ -0,0 +1,47 @@
+import numpy as np
+
+
+def get_missing_minutes(times, prices, grid):
+    """
+    find the minutes of the grid without a record, and the price to fill each of them:
+    the last price at or before the minute on the same day, or the first price of the day for the minutes before it.
+    :param times: sorted datetime64 array of the records of one symbol
+    :param prices: prices of the records
+    :param grid: sorted datetime64[m] array of the expected minutes
+    :return: (missing minutes as datetime64[s], fill prices), the minutes of the days without any record are not filled.
+    """
+    times = np.asarray(times, dtype='datetime64[s]')
+    prices = np.asarray(prices, dtype='float64')
+    grid = np.asarray(grid, dtype='datetime64[m]')
+    if len(times) == 0:
+        return np.array([], dtype='datetime64[s]'), np.array([], dtype='float64')
+    missing = grid[~np.in1d(grid, times.astype('datetime64[m]'))].astype('datetime64[s]')
+    days = times.astype('datetime64[D]')
+    missing_days = missing.astype('datetime64[D]')
+    previous = np.searchsorted(times, missing, side='right') - 1
+    previous_p = (previous >= 0) & (days[np.maximum(previous, 0)] == missing_days)
+    first = np.searchsorted(days, missing_days)
+    first_p = (first < len(times)) & (days[np.minimum(first, len(times) - 1)] == missing_days)
+    indexes = np.where(previous_p, previous, first)
+    filled_p = previous_p | first_p
+    return missing[filled_p], prices[indexes[filled_p]]
+
+
+def split_by_key(keys):
+    """
+    :param keys: array sorted (grouped) by key
+    :return: list of (key, slice) of each group
+    """
+    if len(keys) == 0:
+        return []
+    boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+    starts = np.append(0, boundaries)
+    ends = np.append(boundaries, len(keys))
+    return map(lambda x, y: (keys[x], slice(x, y)), starts, ends)
+
+
+if __name__ == '__main__':
+    times = np.array(['2018-01-19T09:31', '2018-01-19T09:33', '2018-01-22T09:30'], dtype='datetime64[s]')
+    grid = np.array(['2018-01-19T09:30', '2018-01-19T09:31', '2018-01-19T09:32', '2018-01-19T09:33', '2018-01-19T09:34',
+                     '2018-01-22T09:30', '2018-01-22T09:31'], dtype='datetime64[m]')
+    print get_missing_minutes(times, [1.0, 3.0, 5.0], grid)
@@ -0,0 +1,228 @@
+import math
+import numpy as np
+import pandas as pd
+
+
+class VectorIndicator(object):
+    """
+    numpy versions of the indicators in utils.indicator, on a series or on a dates x symbols matrix (one column per symbol).
+    the recursive definitions are kept: the ema starts from the first price, the rsi from the simple averages of the first
+    time_period changes. in a matrix each column starts from its first valid value, the rows before it are nan.
+    """
+
+    @staticmethod
+    def linear_filter(values, a, b, initial):
+        """
+        y[t] = a * y[t-1] + b * values[t] along axis 0, with y[-1] = initial, evaluated by blocks:
+        inside a block the recursion is the cumulative sum of the values scaled by the powers of a,
+        the blocks are short enough to keep the powers in the float range, and only the block ends are carried in a loop.
+        """
+        values = np.asarray(values, dtype='float64')
+        length = len(values)
+        result = np.empty(values.shape)
+        if length == 0:
+            return result
+        if a == 0:
+            result[:] = b * values
+            return result
+        block = max(1, min(length, int(300 / -math.log(a))))
+        powers = a ** np.arange(block, dtype='float64').reshape((block,) + (1,) * (values.ndim - 1))
+        carry = np.asarray(initial, dtype='float64')
+        for start in range(0, length, block):
+            chunk = values[start:start + block]
+            count = len(chunk)
+            scaled = np.cumsum(chunk / powers[:count], axis=0) * powers[:count]
+            result[start:start + count] = b * scaled + a * powers[:count] * carry
+            carry = result[start + count - 1]
+        return result
+
+    @staticmethod
+    def get_first_valid_rows(values):
+        """
+        :return: the row of the first valid value of each column (len(values) for the columns without a valid value)
+        """
+        valid = ~np.isnan(values)
+        return np.where(valid.any(axis=0), valid.argmax(axis=0), len(values))
+
+    @staticmethod
+    def wilder_average(values, n, starts):
+        """
+        y[t] = y[t-1] * (n - 1) / n + values[t] / n along axis 0 of a matrix, each column started at the row starts + n - 1
+        from the simple average of the n values from its row in starts.
+        :param starts: the first row of each column, eg: get_first_valid_rows
+        :return: (the sums of the first n values of each column, the averages, nan before the start of each column)
+        the sums are nan for the columns with less than n values from their start.
+        """
+        values = np.asarray(values, dtype='float64')
+        columns = np.arange(values.shape[1])
+        rows = np.minimum(starts + np.arange(n).reshape((-1, 1)), len(values) - 1)
+        enough = starts + n <= len(values)
+        sums = np.where(enough, values[rows, columns].sum(axis=0), np.nan)
+        # the rows up to the start are the initial average, which keeps it until the start.
+        row_indexes = np.arange(len(values)).reshape((-1, 1))
+        filled = np.where(row_indexes < starts + n, sums / n, values)
+        averages = VectorIndicator.linear_filter(filled, (n - 1.0) / n, 1.0 / n, sums / n)
+        averages[row_indexes < starts + n - 1] = np.nan
+        return sums, averages
+
+    @staticmethod
+    def ema(prices, n):
+        """
+        MACD.get_all_ema on an array.
+        """
+        prices = np.asarray(prices, dtype='float64')
+        if len(prices) == 0:
+            return prices.copy()
+        first_rows = VectorIndicator.get_first_valid_rows(prices)
+        columns = np.arange(prices[0].size)
+        firsts = prices.reshape(len(prices), -1)[np.minimum(first_rows, len(prices) - 1).ravel(), columns].reshape(prices.shape[1:])
+        # the leading nans are treated as the first valid price, which keeps it as the first ema.
+        leading = np.arange(len(prices)).reshape((-1,) + (1,) * (prices.ndim - 1)) < first_rows
+        filled = np.where(leading, firsts, prices)
+        result = VectorIndicator.linear_filter(filled, (n - 1.0) / (n + 1), 2.0 / (n + 1), firsts)
+        result[leading] = np.nan
+        return result
+
+    @staticmethod
+    def macd(prices, s=12, l=26, m=9):
+        """
+        MACD.get_all_macd on an array.
+        :return: dict of ema_short, ema_long, dif, dea and bar arrays
+        """
+        ema_short = VectorIndicator.ema(prices, s)
+        ema_long = VectorIndicator.ema(prices, l)
+        dif = ema_short - ema_long
+        dea = VectorIndicator.ema(dif, m)
+        return {'ema_short': ema_short, 'ema_long': ema_long, 'dif': dif, 'dea': dea, 'bar': (dif - dea) * 2}
+
+    @staticmethod
+    def rsi(prices, time_period):
+        """
+        RSI.get_rsi on an array, nan for the first time_period rows from the first valid price.
+        """
+        prices = np.asarray(prices, dtype='float64')
+        result = np.full(prices.shape, np.nan)
+        if len(prices) <= time_period:
+            return result
+        matrix = prices.reshape(len(prices), -1)
+        deltas = np.diff(matrix, axis=0)
+        with np.errstate(invalid='ignore'):
+            ups = np.where(deltas > 0, deltas, 0.0)
+            downs = np.where(deltas > 0, 0.0, -deltas)
+        # the change of row i is from the price of row i to row i + 1, so the changes start at the row of the first price.
+        starts = VectorIndicator.get_first_valid_rows(matrix)
+        (up_sum, up_aves) = VectorIndicator.wilder_average(ups, time_period, starts)
+        (down_sum, down_aves) = VectorIndicator.wilder_average(downs, time_period, starts)
+        values = result.reshape(len(prices), -1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # the flat prices have neither up nor down, the rsi is neutral as RSI.
+            totals = up_aves + down_aves
+            values[1:] = np.where(totals > 0, 100 * up_aves / totals, np.where(np.isnan(totals), np.nan, 50.0))
+            first_totals = up_sum + down_sum
+            first_rsi = np.where(first_totals > 0, 100.0 * up_sum / first_totals, np.where(np.isnan(first_totals), np.nan, 50.0))
+        columns = np.flatnonzero(starts + time_period < len(prices))
+        values[starts[columns] + time_period, columns] = first_rsi[columns]
+        return result
+
+    @staticmethod
+    def rolling(prices, window):
+        """
+        :return: pandas rolling window of the prices, the windows with a nan are nan.
+        """
+        prices = np.asarray(prices, dtype='float64')
+        return pd.DataFrame(prices.reshape(len(prices), -1)).rolling(window)
+
+    @staticmethod
+    def sma(prices, window):
+        """
+        :return: simple moving average of the last window prices, nan for the first window - 1 rows.
+        """
+        prices = np.asarray(prices, dtype='float64')
+        return VectorIndicator.rolling(prices, window).mean().values.reshape(prices.shape)
+
+    @staticmethod
+    def bollinger(prices, window=20, k=2.0):
+        """
+        :return: (middle, upper, lower) bands, the middle band is the sma and the width is k population std of the window.
+        """
+        prices = np.asarray(prices, dtype='float64')
+        middle = VectorIndicator.sma(prices, window)
+        std = VectorIndicator.rolling(prices, window).std(ddof=0).values.reshape(prices.shape)
+        return middle, middle + k * std, middle - k * std
+
+    @staticmethod
+    def atr(highs, lows, closes, n=14):
+        """
+        average true range with the smoothing of Wilder, started from the simple average of the first n true ranges,
+        nan for the first n - 1 rows from the first valid true range.
+        """
+        highs = np.asarray(highs, dtype='float64')
+        lows = np.asarray(lows, dtype='float64')
+        closes = np.asarray(closes, dtype='float64')
+        true_ranges = highs - lows
+        if len(closes) > 1:
+            previous_closes = closes[:-1]
+            # fmax skips the missing close before the first bar of a column, whose true range is the high - low as the first row.
+            true_ranges[1:] = np.fmax(true_ranges[1:], np.fmax(np.abs(highs[1:] - previous_closes), np.abs(lows[1:] - previous_closes)))
+        result = np.full(true_ranges.shape, np.nan)
+        if len(true_ranges) >= n:
+            matrix = true_ranges.reshape(len(true_ranges), -1)
+            result = VectorIndicator.wilder_average(matrix, n, VectorIndicator.get_first_valid_rows(matrix))[1].reshape(true_ranges.shape)
+        return result
+
+
+def _benchmark(length=100000, symbols=100):
+    import time
+    from utils.indicator import MACD, RSI
+    prices = 100 * np.exp(np.cumsum(np.random.normal(0, 0.001, length)))
+    price_list = prices.tolist()
+    for (name, loop, vector) in [('ema', lambda: MACD.get_all_ema(price_list, 26), lambda: VectorIndicator.ema(prices, 26)),
+                                 ('macd', lambda: MACD.get_all_macd(price_list), lambda: VectorIndicator.macd(prices)),
+                                 ('rsi', lambda: RSI.get_rsi(price_list, 14), lambda: VectorIndicator.rsi(prices, 14))]:
+        start = time.time()
+        expected = loop()
+        loop_seconds = time.time() - start
+        start = time.time()
+        result = vector()
+        vector_seconds = time.time() - start
+        if name == 'macd':
+            (expected, result) = (map(lambda x: x[-1], expected), result['bar'])
+        expected = np.array(expected, dtype='float64')
+        error = np.nanmax(np.abs(result - expected))
+        print '%s of %s prices: loop %.4fs, numpy %.4fs, max difference %s' % (name, length, loop_seconds, vector_seconds, error)
+    matrix = 100 * np.exp(np.cumsum(np.random.normal(0, 0.001, (length / 10, symbols)), axis=0))
+    start = time.time()
+    VectorIndicator.macd(matrix)
+    print 'macd of %s x %s matrix: %.4fs' % (matrix.shape[0], matrix.shape[1], time.time() - start)
+
+
+def _check_rsi(time_period=14, tolerance=1e-9):
+    """
+    compare VectorIndicator.rsi with RSI.get_rsi on a random series, on a matrix whose columns start at different rows
+    and on flat prices.
+    """
+    from utils.indicator import RSI
+    prices = 100 * np.exp(np.cumsum(np.random.normal(0, 0.01, (200, 6)), axis=0))
+    prices[:50, 1] = np.nan
+    prices[:190, 2] = np.nan
+    prices[:, 3] = np.nan
+    prices[:, 4] = 100.0
+    prices[:80, 5] = np.nan
+    prices[80:150, 5] = 100.0
+    result = VectorIndicator.rsi(prices, time_period)
+    for column in range(prices.shape[1]):
+        first_row = VectorIndicator.get_first_valid_rows(prices[:, column])
+        expected = np.array(RSI.get_rsi(prices[first_row:, column].tolist(), time_period), dtype='float64')
+        assert np.isnan(result[:first_row, column]).all(), 'rsi before the first price of column %s' % column
+        difference = np.abs(result[first_row:, column] - expected)
+        difference = difference[~np.isnan(difference)]
+        assert np.array_equal(np.isnan(result[first_row:, column]), np.isnan(expected)) and not (difference > tolerance).any(), \
+            'rsi of column %s differs by %s' % (column, difference.max() if len(difference) > 0 else None)
+    print 'rsi of %s columns matches RSI.get_rsi' % prices.shape[1]
+
+
+if __name__ == '__main__':
+    print VectorIndicator.ema([106.1, 26.59, 55.09, 56.1, 34.44, 45.29, 41.92], 3)
+    print VectorIndicator.rsi([106.1, 26.59, 55.09, 56.1, 34.44, 45.29, 41.92], 3)
+    _check_rsi()
+    _benchmark()